@@ -0,0 +1,255 @@
+"""
+Pipeline benchmark for the SDA library.
+
+Every scenario generates a synthetic source with benchmarks/generator.py and measures the phases of
+the integration: the schema inference, createHirarchy, the four phases of SDATransformation and the
+execution of the plan with the record engine and the pandas executor. The wall time is the minimum of
+--runs runs, as background load only ever slows a run down. The peak memory is measured with tracemalloc
+in a separate run, as tracing slows down the graph rewriting considerably.
+
+Wall times only compare between runs on the same host, so no baseline is stored in the repository:
+--output writes the results of a run, e.g. of the base revision, and --baseline compares a later run of
+the change against them. With --check the benchmark fails if a phase is more than --tolerance times and
+more than --slack milliseconds slower, or more than --tolerance times larger than in the baseline, and
+refuses baselines measured on another host or Python version. The wall time of single runs is too noisy
+to be checked, so --check requires at least MIN_CHECKED_RUNS runs.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--runs 3] [--scenario small] [--no-memory] [--output base.json]
+    python benchmarks/bench_pipeline.py --baseline base.json --check
+    python benchmarks/bench_pipeline.py --fields 12 --depth 3 --fanout 5 --records 1000 --groupSize 3
+    python benchmarks/bench_pipeline.py --planner native --fields 300 --groupSize 10
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import generate  # noqa: E402
+from sda import SDAIntegration, SDAPandasExecutor, SDARecordExecutor  # noqa: E402
+
+# Parameters of the generator per scenario
+SCENARIOS = {
+    "small": {"fields": 8, "depth": 2, "fanout": 3, "records": 1000, "groupSize": 3},
+    "nested": {"fields": 12, "depth": 4, "fanout": 3, "records": 1000, "groupSize": 3},
+    "fanout": {"fields": 8, "depth": 1, "fanout": 50, "records": 1000, "groupSize": 3},
+    "records": {"fields": 8, "depth": 2, "fanout": 3, "records": 20000, "groupSize": 3},
+}
+
+# Phases below this wall time are reported, but too noisy to be checked against the baseline
+MIN_CHECKED_SECONDS = 0.005
+
+# Minimal number of runs per scenario for --check, the minimum of fewer runs is dominated by noise
+MIN_CHECKED_RUNS = 3
+
+
+def get_phases(data, source_annotation, target_annotation, planner="regraph"):
+    """
+    Returns the phases of one integration as (name, callable) tuples, to be called in order.
+
+    Args:
+        data (list): Source records.
+        source_annotation (dict): Source annotations.
+        target_annotation (dict): Target annotations.
+        planner (str, optional): Planner of the integration. Defaults to "regraph".
+
+    Returns:
+        list: The phases of the integration.
+    """
+    import pandas as pd
+
+    integration = SDAIntegration(planner=planner)
+    graph = integration.hirarchicalGraph
+    transformation = integration.transformation
+    graph.addAnnotations(source_annotation)
+    graph.addTargetAnnotations(target_annotation)
+    state = {}
+
+    def select_columns():
+        selector = SDARecordExecutor(transformation.normalFormOperations, transformation.transformOperations)
+        paths = [column.split(".") for column in selector.get_select_columns()]
+        state["flatten_df"] = pd.DataFrame.from_records([selector.select_record(record, paths) for record in data])
+
+    def flatten_hierarchy():
+        graph.add_hom_S_M()
+        transformation.removeHirarchies(graph.hirarchie)
+
+    return [
+        ("readSource", lambda: graph.readSourceRecords(data)),
+        ("createHirarchy", graph.createHirarchy),
+        ("removeIrrelevantNodes", lambda: transformation.removeIrrelevantNodes(graph.hirarchie)),
+        ("removeHirarchies", flatten_hierarchy),
+        ("constructTargetHirarchies", lambda: transformation.constructTargetHirarchies(graph.hirarchie, graph.targetSemantic)),
+        ("add_flattening_operations", lambda: transformation.add_flattening_operations(graph.hirarchie)),
+        ("transformRecords", integration.transformRecords),
+        # Builds the selected columns as input of the pandas executor, not measured
+        (None, select_columns),
+        ("transformPandas", lambda: SDAPandasExecutor(
+            transformation.normalFormOperations, transformation.transformOperations
+        ).execute(state["flatten_df"])),
+    ]
+
+
+def run_scenario(parameters, memory=False, planner="regraph"):
+    """
+    Runs one integration of a generated source and measures every phase.
+
+    Args:
+        parameters (dict): Parameters of the generator.
+        memory (bool, optional): Measure the peak memory with tracemalloc instead of the wall time. Defaults to False.
+        planner (str, optional): Planner of the integration. Defaults to "regraph".
+
+    Returns:
+        dict: Elapsed seconds or peak bytes by phase name.
+    """
+    data, source_annotation, target_annotation = generate(**parameters)
+    results = {}
+    for name, phase in get_phases(data, source_annotation, target_annotation, planner):
+        if memory:
+            tracemalloc.start()
+            phase()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            start = time.perf_counter()
+            phase()
+            elapsed = time.perf_counter() - start
+        if name is not None:
+            results[name] = peak if memory else elapsed
+    return results
+
+
+def measure(parameters, runs, memory=True, planner="regraph"):
+    """
+    Measures all phases of a scenario.
+
+    Args:
+        parameters (dict): Parameters of the generator.
+        runs (int): Number of timed runs, the minimum is reported.
+        memory (bool, optional): Additionally measure the peak memory per phase. Defaults to True.
+        planner (str, optional): Planner of the integration. Defaults to "regraph".
+
+    Returns:
+        dict: {"seconds": value, "peakBytes": value} by phase name.
+    """
+    timings = [run_scenario(parameters, planner=planner) for _ in range(runs)]
+    peaks = run_scenario(parameters, memory=True, planner=planner) if memory else {}
+    return {
+        name: {"seconds": min(timing[name] for timing in timings), "peakBytes": peaks.get(name)}
+        for name in timings[0]
+    }
+
+
+def compare(name, result, baseline, tolerance, slack=0.0):
+    """
+    Prints the results of a scenario next to the baseline.
+
+    Args:
+        name (str): Name of the scenario.
+        result (dict): Measured phases of the scenario.
+        baseline (dict): Baseline phases of the scenario, empty if there is none.
+        tolerance (float): Maximal accepted ratio between result and baseline.
+        slack (float, optional): Accepted absolute slowdown in seconds, regardless of the ratio. Defaults to 0.
+
+    Returns:
+        list: Descriptions of the regressions.
+    """
+    regressions = []
+    print(name)
+    for phase, values in result.items():
+        base = baseline.get(phase, {})
+        line = "  %-27s %10.1f ms" % (phase, values["seconds"] * 1000)
+        if base.get("seconds"):
+            ratio = values["seconds"] / base["seconds"]
+            line += " (%5.2fx)" % ratio
+            slower = values["seconds"] - base["seconds"] > slack
+            if ratio > tolerance and slower and values["seconds"] >= MIN_CHECKED_SECONDS:
+                regressions.append("%s/%s: %.2fx time" % (name, phase, ratio))
+        if values["peakBytes"] is not None:
+            line += "   %10.1f KiB" % (values["peakBytes"] / 1024)
+            if base.get("peakBytes"):
+                ratio = values["peakBytes"] / base["peakBytes"]
+                line += " (%5.2fx)" % ratio
+                if ratio > tolerance:
+                    regressions.append("%s/%s: %.2fx peak memory" % (name, phase, ratio))
+        print(line)
+    return regressions
+
+
+def get_environment():
+    """
+    Returns the host and interpreter the results are measured on. Only results of the same environment are checked.
+
+    Returns:
+        dict: Host name, platform and Python version.
+    """
+    return {"host": platform.node(), "platform": platform.platform(), "python": platform.python_version()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmark for the SDA library.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of timed runs per scenario.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run, repeatable. Defaults to all.")
+    parser.add_argument("--fields", type=int, help="Run a custom scenario with this number of fields.")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--groupSize", type=int, default=3)
+    parser.add_argument("--planner", choices=["regraph", "native"], default="regraph", help="Planner of the integration.")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the peak memory measurement.")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Maximal accepted ratio to the baseline.")
+    parser.add_argument("--slack", type=float, default=20.0, help="Accepted absolute slowdown in milliseconds.")
+    parser.add_argument("--check", action="store_true", help="Fail if a phase regressed against the baseline.")
+    parser.add_argument("--output", help="Path of the JSON file to write the results to.")
+    parser.add_argument("--baseline", help="Results of an earlier run on the same host to compare against.")
+    args = parser.parse_args()
+    if args.check and args.runs < MIN_CHECKED_RUNS:
+        parser.error("--check requires at least %d runs" % MIN_CHECKED_RUNS)
+    if args.check and args.baseline is None:
+        parser.error("--check requires a --baseline measured on the same host")
+
+    if args.fields is not None:
+        scenarios = {"custom": {"fields": args.fields, "depth": args.depth, "fanout": args.fanout,
+                                "records": args.records, "groupSize": args.groupSize}}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+    if args.planner != "regraph":
+        # The baseline holds the results of every planner under its own scenario names
+        scenarios = {name + "/" + args.planner: parameters for name, parameters in scenarios.items()}
+
+    environment = get_environment()
+    baseline = {"scenarios": {}}
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if args.check and baseline.get("environment") != environment:
+            sys.exit("The baseline was measured in another environment: %s" % baseline.get("environment"))
+
+    results = {}
+    regressions = []
+    for name, parameters in scenarios.items():
+        results[name] = measure(parameters, args.runs, args.memory, args.planner)
+        base = baseline["scenarios"].get(name, {}) if baseline.get("parameters", {}).get(name) == parameters else {}
+        regressions.extend(compare(name, results[name], base, args.tolerance, args.slack / 1000))
+
+    for regression in regressions:
+        print("regression: " + regression)
+
+    if args.output is not None:
+        output = {"parameters": {name: scenarios[name] for name in results}, "scenarios": results, "environment": environment}
+        with open(args.output, "w") as output_file:
+            json.dump(output, output_file, indent=2, sort_keys=True)
+            output_file.write("\n")
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
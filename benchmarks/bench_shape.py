@@ -0,0 +1,171 @@
+"""
+Shape benchmark for the SDA library.
+
+Measures how the graph builders scale with extreme nesting depth and width: the schema inference, the
+source annotation graph, the pruned schema graph of the records and the transformation steps of the
+target annotation. Every scenario is run at growing sizes and the growth exponent between two sizes is
+reported next to the time per level or field, an exponent around 1 means linear scaling. Like timeit, the
+phases run with the garbage collector disabled, as its full collections otherwise dominate at these sizes.
+
+With --plan the hierarchy is additionally created and planned. Planning the single target struct of the
+wide scenario grows quadratically with its number of fields, so only the builder phases are checked.
+
+The deep scenarios nest far beyond the recursion limit, so every builder has to work without recursion.
+The node ids of the graphs are the full paths of the fields, so their total length grows quadratically with
+the depth: at a depth of 8000, the ids of the annotation graph add up to 160 MB. The builders concatenate
+every id once, but copying and hashing the ids lets the deep graph phases grow slightly faster than linear.
+
+Usage:
+    python benchmarks/bench_shape.py [--scenario deep-mixed] [--sizes 1000 5000] [--plan] [--check]
+"""
+import argparse
+import gc
+import math
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+
+from generator import generate_deep, generate_wide  # noqa: E402
+from sda import SDAIntegration  # noqa: E402
+
+# Generator and sizes per scenario
+SCENARIOS = {
+    "deep-struct": (lambda size: generate_deep(size, "struct"), [250, 1000, 4000]),
+    "deep-mixed": (lambda size: generate_deep(size, "mixed"), [250, 1000, 4000]),
+    "wide": (lambda size: generate_wide(size), [2000, 10000, 50000]),
+}
+
+# Phases below this wall time are reported, but too noisy to be checked
+MIN_CHECKED_SECONDS = 0.005
+
+# Phases expected to scale linearly
+CHECKED_PHASES = {"inferSchema", "annotationGraph", "schemaGraph", "transformationSteps"}
+
+
+def get_phases(data, source_annotation, target_annotation, plan=False, planner="native"):
+    """
+    Returns the phases of one integration as (name, callable) tuples, to be called in order.
+
+    Args:
+        data (list): Source records.
+        source_annotation (dict): Source annotations.
+        target_annotation (dict): Target annotations.
+        plan (bool, optional): Add the creation and planning of the hierarchy. Defaults to False.
+        planner (str, optional): Planner of the integration. Defaults to "native".
+
+    Returns:
+        list: The phases of the integration.
+    """
+    integration = SDAIntegration(planner=planner)
+    graph = integration.hirarchicalGraph
+    graph.addTargetAnnotations(target_annotation)
+    state = {}
+
+    def infer_schema():
+        state["schema"] = graph.infer_record_schema(data)
+
+    phases = [
+        ("inferSchema", infer_schema),
+        ("annotationGraph", lambda: graph.addAnnotations(source_annotation)),
+        ("schemaGraph", lambda: graph.readRecordSchema(state["schema"], annotation=source_annotation)),
+        ("transformationSteps", lambda: integration.transformation.get_transformation_steps(target_annotation)),
+    ]
+    if plan:
+        phases += [("createHirarchy", graph.createHirarchy), ("doTransformation", integration.doTransformation)]
+    return phases
+
+
+def measure(generate, size, runs, plan=False, planner="native"):
+    """
+    Measures all phases of a scenario at one size.
+
+    Args:
+        generate (callable): Generator of the scenario, called with the size.
+        size (int): Depth or width of the source.
+        runs (int): Number of timed runs, the median is reported.
+        plan (bool, optional): Add the creation and planning of the hierarchy. Defaults to False.
+        planner (str, optional): Planner of the integration. Defaults to "native".
+
+    Returns:
+        dict: Elapsed seconds by phase name.
+    """
+    data, source_annotation, target_annotation = generate(size)
+    timings = []
+    for _ in range(runs):
+        timing = {}
+        for name, phase in get_phases(data, source_annotation, target_annotation, plan, planner):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                phase()
+                timing[name] = time.perf_counter() - start
+            finally:
+                gc.enable()
+        timings.append(timing)
+    return {name: statistics.median(timing[name] for timing in timings) for name in timings[0]}
+
+
+def report(name, sizes, results, maxExponent):
+    """
+    Prints the time per level or field of every phase and the growth exponent to the previous size.
+
+    Args:
+        name (str): Name of the scenario.
+        sizes (list): Measured sizes, ascending.
+        results (list): Measured phases per size.
+        maxExponent (float): Maximal accepted growth exponent.
+
+    Returns:
+        list: Descriptions of the phases growing faster than accepted.
+    """
+    regressions = []
+    print(name)
+    for phase in results[0]:
+        line = "  %-22s" % phase
+        for index, size in enumerate(sizes):
+            seconds = results[index][phase]
+            line += "  %6d: %9.1f ms %6.2f us/n" % (size, seconds * 1000, seconds * 1e6 / size)
+            if index:
+                previous = results[index - 1][phase]
+                exponent = math.log(seconds / previous) / math.log(size / sizes[index - 1])
+                line += " ^%4.2f" % exponent
+                if phase in CHECKED_PHASES and exponent > maxExponent and seconds >= MIN_CHECKED_SECONDS:
+                    regressions.append("%s/%s: grows with exponent %.2f from %d to %d" % (
+                        name, phase, exponent, sizes[index - 1], size))
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shape benchmark for the SDA library.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of timed runs per size.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run, repeatable. Defaults to all.")
+    parser.add_argument("--sizes", type=int, nargs="+", help="Depths or widths to measure, instead of the defaults of the scenarios.")
+    parser.add_argument("--plan", action="store_true", help="Also create and plan the hierarchy.")
+    parser.add_argument("--planner", choices=["regraph", "native"], default="native", help="Planner of the integration.")
+    parser.add_argument("--maxExponent", type=float, default=1.5, help="Maximal accepted growth exponent.")
+    parser.add_argument("--check", action="store_true", help="Fail if a phase grows faster than --maxExponent.")
+    args = parser.parse_args()
+
+    regressions = []
+    for name in args.scenario or SCENARIOS:
+        generate, sizes = SCENARIOS[name]
+        sizes = sorted(args.sizes or sizes)
+        results = [measure(generate, size, args.runs, args.plan, args.planner) for size in sizes]
+        regressions += report(name, sizes, results, args.maxExponent)
+
+    if regressions:
+        print("\nSuperlinear phases:")
+        for regression in regressions:
+            print("  " + regression)
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark for the SDA library.
+
+Every stage is measured in a fresh interpreter, so the numbers include all imports that the stage
+triggers. With --check the benchmark fails if a stage loads one of the heavy dependencies that it
+is not supposed to need, which keeps `import sda` and the construction of SDAIntegration cheap.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--check]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["pyspark", "pandas", "matplotlib", "regraph"]
+
+# (name, statement, heavy modules the stage must not load)
+STAGES = [
+    ("import sda", "import sda", HEAVY_MODULES),
+    ("from sda import SDAIntegration", "from sda import SDAIntegration", HEAVY_MODULES),
+    ("SDAIntegration()", "from sda import SDAIntegration; SDAIntegration()", ["pyspark", "pandas"]),
+]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def run_stage(statement, root):
+    """
+    Runs one stage in a fresh interpreter.
+
+    Args:
+        statement (str): Python statement to measure.
+        root (str): Repository root, added to the PYTHONPATH.
+
+    Returns:
+        dict: Elapsed seconds and the heavy modules loaded by the statement.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    code = PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, "-c", code], env=env, cwd=root)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the SDA library.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters per stage.")
+    parser.add_argument("--check", action="store_true", help="Fail if a stage loads a forbidden module.")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    failed = False
+    for name, statement, forbidden in STAGES:
+        results = [run_stage(statement, root) for _ in range(args.runs)]
+        median = statistics.median(result["seconds"] for result in results)
+        loaded = results[-1]["loaded"]
+        print("%-35s %8.1f ms   loaded: %s" % (name, median * 1000, ", ".join(loaded) or "-"))
+        violations = [module for module in loaded if module in forbidden]
+        if violations:
+            print("    unexpected imports: %s" % ", ".join(violations))
+            failed = True
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Synthetic source data, source annotations and target annotations for the SDA benchmarks.
+
+The generated source has `fields` scalar fields spread over a chain of nested structs of the given
+depth, plus an array of `fanout` reading structs. Every fourth scalar field and one field of the
+readings are left unannotated, so the planner has irrelevant nodes to remove. The target regroups
+the annotated fields into structs of `groupSize` fields below one entity struct and nests the readings
+into a list.
+
+generate_deep() and generate_wide() generate the extreme shapes of benchmarks/bench_shape.py: a chain of
+`depth` nested structs, optionally alternating with single element arrays, and one flat struct of
+`width` fields.
+
+Usage:
+    python benchmarks/generator.py OUTPUT_DIR [--fields 20] [--depth 2] [--fanout 3] [--records 10]
+                                          [--groupSize 3]
+"""
+import argparse
+import json
+import os
+import random
+
+
+def get_path(index, depth):
+    """
+    Returns the struct path of a scalar field.
+
+    Args:
+        index (int): Index of the field.
+        depth (int): Nesting depth of the source.
+
+    Returns:
+        list: Names of the structs containing the field, outermost first.
+    """
+    level = index % (depth + 1)
+    return ["nested_%d" % level for level in range(1, level + 1)]
+
+
+def set_value(data, path, key, value):
+    """
+    Sets a value in a nested dict and creates the missing structs.
+
+    Args:
+        data (dict): The nested dict.
+        path (list): Names of the structs containing the value.
+        key (str): Key of the value.
+        value: The value.
+    """
+    for name in path:
+        data = data.setdefault(name, {})
+    data[key] = value
+
+
+def generate(fields=20, depth=2, fanout=3, records=10, groupSize=3, seed=0):
+    """
+    Generates a synthetic source with annotations.
+
+    Args:
+        fields (int, optional): Number of scalar source fields. Defaults to 20.
+        depth (int, optional): Nesting depth of the scalar fields. Defaults to 2.
+        fanout (int, optional): Number of elements of the readings array per record. Defaults to 3.
+        records (int, optional): Number of source records. Defaults to 10.
+        groupSize (int, optional): Number of fields per target struct. Defaults to 3.
+        seed (int, optional): Seed of the random values. Defaults to 0.
+
+    Returns:
+        tuple: (records, source_annotation, target_annotation)
+    """
+    rng = random.Random(seed)
+    source_annotation = {}
+    semantics = []
+    for index in range(fields):
+        if index % 4 != 3:
+            set_value(source_annotation, get_path(index, depth), "field_%d" % index, "F%d" % index)
+            semantics.append("F%d" % index)
+    source_annotation["readings"] = [{"time": "R_TIME", "value": "R_VALUE"}]
+
+    entity = {}
+    for start in range(0, len(semantics), groupSize):
+        group = semantics[start:start + groupSize]
+        entity["group_%d" % (start // groupSize)] = {"t_" + semantic[1:]: semantic for semantic in group}
+    target_annotation = {"entity": entity, "readings": [{"time": "R_TIME", "value": "R_VALUE"}]}
+
+    data = []
+    for _ in range(records):
+        record = {}
+        for index in range(fields):
+            if index % 3 == 0:
+                value = rng.randint(0, 10 ** 6)
+            elif index % 3 == 1:
+                value = rng.random()
+            else:
+                value = "value_%d" % rng.randint(0, 10 ** 6)
+            set_value(record, get_path(index, depth), "field_%d" % index, value)
+        record["readings"] = [
+            {"time": "2024-01-01T00:%02d" % (element % 60), "value": rng.random(), "unit": "celsius"}
+            for element in range(fanout)
+        ]
+        data.append(record)
+    return data, source_annotation, target_annotation
+
+
+def generate_deep(depth=100, kind="struct", records=1):
+    """
+    Generates a source of one chain of nested structs with one scalar field per level. With kind "mixed",
+    every second struct is wrapped into a single element array. The target renames the fields, but keeps
+    the nesting of the structs below one entity struct.
+
+    Args:
+        depth (int, optional): Number of nested levels. Defaults to 100.
+        kind (str, optional): "struct" or "mixed". Defaults to "struct".
+        records (int, optional): Number of source records. Defaults to 1.
+
+    Returns:
+        tuple: (records, source_annotation, target_annotation)
+    """
+    record = {"value_%d" % depth: depth}
+    source_annotation = {"value_%d" % depth: "V%d" % depth}
+    target = {"t_value_%d" % depth: "V%d" % depth}
+    # Built from the innermost level outwards, so the generator itself does not recurse
+    for level in range(depth - 1, -1, -1):
+        array = kind == "mixed" and level % 2 == 1
+        record = {"value_%d" % level: level, "nested_%d" % level: [record] if array else record}
+        source_annotation = {"value_%d" % level: "V%d" % level, "nested_%d" % level: [source_annotation] if array else source_annotation}
+        target = {"t_value_%d" % level: "V%d" % level, "t_nested_%d" % level: target}
+    # The records share the nested dicts, they are only read
+    return [record] * records, source_annotation, {"entity": target}
+
+
+def generate_wide(width=1000, records=1, seed=0):
+    """
+    Generates a flat source of `width` scalar fields, which the target renames into one entity struct.
+
+    Args:
+        width (int, optional): Number of scalar fields. Defaults to 1000.
+        records (int, optional): Number of source records. Defaults to 1.
+        seed (int, optional): Seed of the random values. Defaults to 0.
+
+    Returns:
+        tuple: (records, source_annotation, target_annotation)
+    """
+    rng = random.Random(seed)
+    source_annotation = {"field_%d" % index: "F%d" % index for index in range(width)}
+    target_annotation = {"entity": {"t_field_%d" % index: "F%d" % index for index in range(width)}}
+    data = [{"field_%d" % index: rng.randint(0, 10 ** 6) for index in range(width)} for _ in range(records)]
+    return data, source_annotation, target_annotation
+
+
+def write(outputDir, fields=20, depth=2, fanout=3, records=10, groupSize=3, seed=0):
+    """
+    Generates a synthetic source and writes source.json, source_annotation.json and target_annotation.json.
+
+    Args:
+        outputDir (str): Directory for the files.
+        fields (int, optional): Number of scalar source fields. Defaults to 20.
+        depth (int, optional): Nesting depth of the scalar fields. Defaults to 2.
+        fanout (int, optional): Number of elements of the readings array per record. Defaults to 3.
+        records (int, optional): Number of source records. Defaults to 10.
+        groupSize (int, optional): Number of fields per target struct. Defaults to 3.
+        seed (int, optional): Seed of the random values. Defaults to 0.
+
+    Returns:
+        tuple: Paths of the source, source annotation and target annotation files.
+    """
+    os.makedirs(outputDir, exist_ok=True)
+    data, source_annotation, target_annotation = generate(fields, depth, fanout, records, groupSize, seed)
+    paths = tuple(os.path.join(outputDir, name) for name in ("source.json", "source_annotation.json", "target_annotation.json"))
+    for path, content in zip(paths, (data, source_annotation, target_annotation)):
+        with open(path, "w") as output_file:
+            json.dump(content, output_file)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic SDA source with annotations.")
+    parser.add_argument("outputDir")
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=3)
+    parser.add_argument("--records", type=int, default=10)
+    parser.add_argument("--groupSize", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for path in write(args.outputDir, args.fields, args.depth, args.fanout, args.records, args.groupSize, args.seed):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
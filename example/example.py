@@ -1,13 +1,17 @@
 from sda.sdaintegration import SDAIntegration
-from regraph import plot_graph, plot_instance, plot_rule
 
 # Initialize the SDAIntegration object
+# Visualization is opt-in: pass a directory to render the hierarchy after each phase
+# into PNG files on a background worker, e.g. SDAIntegration(plotter="./example/plots")
 sda = SDAIntegration()
 
 # Load the source data and its annotations
 # @param source_path: Path to the source data file
 # @param source_annotation_path: Path to the source annotation file
 sda.loadSource("./example/testfiles/source.json", "./example/testfiles/source_annotation.json")
+# Small payloads can be processed in-process without starting a Spark session:
+# sda.loadSource("./example/testfiles/source.json", "./example/testfiles/source_annotation.json", engine="local")
+# ... and transformed to plain dicts after doTransformation() with sda.transformRecords()
 
 # Load the target annotation file
 # @param target_annotation_path: Path to the target annotation file
@@ -21,6 +25,13 @@ sda.doTransformation()
 # @param orient: Orientation of the JSON output (e.g., "records")
 sda.transform().to_json("./example/testfiles/target.json", orient="records")
 
+# For large sources the transformation can run distributed on the Spark cluster
+# without collecting the data to the driver
+# sda.transformSpark().write.json("./example/testfiles/target_spark")
+
+# Alternatively, stream the transformed records in bounded batches to a NDJSON file
+# sda.transformToSink("./example/testfiles/target.ndjson", batchSize=10000)
+
 # Uncomment the following section to display the operations for transformation
 # Show the operations to get the normal form
 # print("---- Operations to get Normal Form")
@@ -32,7 +43,10 @@ sda.transform().to_json("./example/testfiles/target.json", orient="records")
 # for op in sda.transformation.transformOperations:
 #     print(op)
 
-# Plot the executed transformation rules
+# Uncomment the following section to plot the executed transformation rules
 # @param rule: A rule executed during the transformation process
-for rule in sda.transformation.excecutedRules:
-    plot_rule(rule)
+# from sda.sdaplotter import SDAPlotter
+# plotter = SDAPlotter("./example/plots")
+# for rule in sda.transformation.excecutedRules:
+#     plotter.plot_rule(rule)
+# plotter.close()
@@ -1,4 +1,40 @@
-from .sdahierarchicalgraph import SDAHierarchicalGraph
-from .sdaintegration import SDAIntegration
-from .sdatransformation import SDATransformation
-from .sdatransformoperation import SDATransformOperation
\ No newline at end of file
+import importlib
+
+# The classes are imported on first access, so `import sda` does not load pyspark, pandas or regraph
+_exports = {
+    "SDAHierarchicalGraph": ".sdahierarchicalgraph",
+    "SDAIntegration": ".sdaintegration",
+    "SDAMultiTargetIntegration": ".sdamultitargetintegration",
+    "SDABatchIntegration": ".sdabatchintegration",
+    "SDABatchResult": ".sdabatchintegration",
+    "SDAService": ".sdaservice",
+    "SDAServiceError": ".sdaservice",
+    "SDATransformation": ".sdatransformation",
+    "SDATransformOperation": ".sdatransformoperation",
+    "SDANativeTransformation": ".sdanativetransformation",
+    "SDANativeHierarchy": ".sdanativehierarchy",
+    "SDASparkExecutor": ".sdasparkexecutor",
+    "SDAPandasExecutor": ".sdapandasexecutor",
+    "SDARecordExecutor": ".sdarecordexecutor",
+    "SDAArrowExecutor": ".sdaarrowexecutor",
+    "SDACodeGenerator": ".sdacodegenerator",
+    "SDAPlanCache": ".sdaplancache",
+    "SDATypingIndex": ".sdatypingindex",
+    "SDAPlotter": ".sdaplotter",
+    "SDAMetrics": ".sdametrics",
+    "SDAMetricsRecorder": ".sdametrics",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name in _exports:
+        value = getattr(importlib.import_module(_exports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,157 @@
+import time
+from .sdarecordexecutor import SDARecordExecutor
+
+
+class SDAArrowExecutor(SDARecordExecutor):
+    """
+    Executes the operations of an SDATransformation on Arrow arrays. The nested structures are built as Arrow
+    struct and list arrays from the buffers of the nested columns, without creating a Python object per value,
+    so the result stays columnar and can be written to Parquet or Arrow IPC files with proper nested types.
+    Requires pyarrow.
+
+    Attributes:
+        normalFormOperations (list): Operations selecting the fields of the normal form.
+        transformOperations (list): Operations transforming the normal form to the target.
+        metrics (SDAMetrics): Hook receiving the timing of every operation.
+    """
+
+    def execute(self, records):
+        """
+        Applies the normal form selection and the transformation operations to a list of records.
+
+        Args:
+            records (list): List of parsed JSON objects in the source structure.
+
+        Returns:
+            pyarrow.Table: Transformed data in the target structure.
+        """
+        import pyarrow as pa
+
+        paths = [column.split(".") for column in self.get_select_columns()]
+        columns = {}
+        for path in paths:
+            columns[path[-1]] = pa.array([self.get_value(record, path) for record in records])
+        return self.execute_table(pa.table(columns), len(records))
+
+    def execute_table(self, flatten_table, length=None):
+        """
+        Applies the transformation operations to a table of the normal form fields.
+
+        Args:
+            flatten_table (pyarrow.Table or pandas.DataFrame): Table with one column per normal form field.
+            length (int, optional): Number of rows, only required for tables without columns. Defaults to None.
+
+        Returns:
+            pyarrow.Table: Transformed data in the target structure.
+        """
+        import pyarrow as pa
+
+        if not isinstance(flatten_table, pa.Table):
+            flatten_table = pa.Table.from_pandas(flatten_table, preserve_index=False)
+        if length is None:
+            length = flatten_table.num_rows
+        columns = [(name, column.combine_chunks()) for name, column in zip(flatten_table.column_names, flatten_table.columns)]
+
+        for operation in self.transformOperations:
+            start = time.perf_counter()
+            if operation.action == "renameNode":
+                old_name = operation.field.split(".")[-1]
+                columns = [(operation.rename if name == old_name else name, array) for name, array in columns]
+            elif operation.action == "addHirarchy":
+                columns = self.set_array(columns, operation.field, self.create_struct_array, operation.connect, length)
+            elif operation.action == "nestList":
+                columns = self.set_array(columns, operation.field, self.create_list_array, operation.get_flatten_connect(), length)
+            self.metrics.on_operation(operation.action, operation.field, time.perf_counter() - start, length)
+
+        return pa.Table.from_arrays([array for _, array in columns], names=[name for name, _ in columns])
+
+    def set_array(self, columns, name, nest, connect, length):
+        """
+        Nests columns into a new or replaced column and removes them, like SDASparkExecutor.set_column().
+
+        Args:
+            columns (list): List of (name, pyarrow.Array) tuples.
+            name (str): Name of the new column.
+            nest (callable): Builds the new array from the names and arrays of the nested columns and the length.
+            connect (list): Names of the nested columns.
+            length (int): Number of rows.
+
+        Returns:
+            list: Updated list of (name, pyarrow.Array) tuples.
+        """
+        lookup = dict(columns)
+        array = nest(connect, [lookup[col] for col in connect], length)
+        if name in lookup:
+            columns = [(existing, array if existing == name else expr) for existing, expr in columns]
+        else:
+            columns = columns + [(name, array)]
+        return [(existing, expr) for existing, expr in columns if existing not in connect]
+
+    def create_struct_array(self, names, arrays, length):
+        """
+        Creates a struct array from the specified columns.
+
+        Args:
+            names (list): Names of the nested columns.
+            arrays (list): The nested arrays.
+            length (int): Number of rows.
+
+        Returns:
+            pyarrow.StructArray: One struct per row.
+        """
+        import pyarrow as pa
+
+        if not arrays:
+            return pa.array([{}] * length, type=pa.struct([]))
+        return pa.StructArray.from_arrays(arrays, names=names)
+
+    def create_list_array(self, names, arrays, length):
+        """
+        Creates a list array of structs per row from the specified array columns, like zip_records():
+        the lists of a row are zipped, scalar values are repeated for every element of the row.
+
+        Args:
+            names (list): Names of the nested columns.
+            arrays (list): The nested arrays.
+            length (int): Number of rows.
+
+        Returns:
+            pyarrow.ListArray: One list of structs per row.
+
+        Raises:
+            ValueError: If the arrays of a row differ in length.
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        # Number of elements per row, taken from the first list which is not null
+        lists = [pa.types.is_list(array.type) or pa.types.is_large_list(array.type) for array in arrays]
+        lengths = np.zeros(length, dtype=np.int64)
+        known = np.zeros(length, dtype=bool)
+        for array in [array for array, is_list in zip(arrays, lists) if is_list]:
+            array_lengths = pc.list_value_length(array).to_numpy(zero_copy_only=False)
+            valid = array.is_valid().to_numpy(zero_copy_only=False)
+            array_lengths = np.where(valid, array_lengths, 0).astype(np.int64)
+            if np.any(valid & known & (array_lengths != lengths)):
+                raise ValueError("All arrays must be of the same length")
+            lengths = np.where(known, lengths, array_lengths)
+            known |= valid
+
+        offsets = np.zeros(length + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        parents = np.repeat(np.arange(length), lengths)
+        positions = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths)
+
+        children = []
+        for array, is_list in zip(arrays, lists):
+            if is_list:
+                array_offsets = array.offsets.to_numpy(zero_copy_only=False)
+                valid = array.is_valid().to_numpy(zero_copy_only=False)
+                indices = pa.array(array_offsets[parents] + positions, mask=~valid[parents])
+                children.append(array.values.take(indices))
+            else:
+                children.append(array.take(pa.array(parents)))
+
+        struct = self.create_struct_array(names, children, int(offsets[-1]))
+        return pa.ListArray.from_arrays(pa.array(offsets.astype(np.int32)), struct)
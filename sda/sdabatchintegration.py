@@ -0,0 +1,283 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .sdahierarchicalgraph import SDAHierarchicalGraph
+from .sdaintegration import SDAIntegration
+from .sdametrics import SDAMetrics
+from .sdarecordexecutor import SDARecordExecutor
+
+
+class SDABatchResult:
+    """
+    Result of the integration of one source file in a batch.
+
+    Attributes:
+        source (str): Path of the source file.
+        output (str): Path of the written target file, None if the integration failed.
+        fingerprint (str): Fingerprint of the source schema, None if the schema could not be inferred.
+        records (int): Number of transformed records.
+        error (str): Error message if the integration failed, otherwise None.
+    """
+
+    def __init__(self, source, output=None, fingerprint=None, records=0, error=None):
+        """
+        Initializes the SDABatchResult.
+
+        Args:
+            source (str): Path of the source file.
+            output (str, optional): Path of the written target file. Defaults to None.
+            fingerprint (str, optional): Fingerprint of the source schema. Defaults to None.
+            records (int, optional): Number of transformed records. Defaults to 0.
+            error (str, optional): Error message if the integration failed. Defaults to None.
+        """
+        self.source = source
+        self.output = output
+        self.fingerprint = fingerprint
+        self.records = records
+        self.error = error
+
+    @property
+    def ok(self):
+        """
+        Returns True if the source file was integrated successfully.
+        """
+        return self.error is None
+
+    def __str__(self):
+        """
+        Returns a string representation of the SDABatchResult instance.
+        """
+        if self.ok:
+            return str(self.source) + " -> " + str(self.output) + " | " + str(self.records) + " records"
+        return str(self.source) + " | failed: " + str(self.error)
+
+
+def get_schema_fingerprint(schema):
+    """
+    Returns the fingerprint of an inferred record schema, the digest of its JSON representation as returned by
+    SDAHierarchicalGraph.get_schema_json().
+
+    Args:
+        schema (dict): Inferred record schema.
+
+    Returns:
+        str: Hex digest of the schema.
+    """
+    return hashlib.sha256(json.dumps(schema, separators=(",", ":"), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def infer_source_schema(source):
+    """
+    Infers the record schema of a source file. Runs in a worker process.
+
+    Args:
+        source (str): Path of the source file.
+
+    Returns:
+        tuple: (schema, error) where exactly one of both is None.
+    """
+    try:
+        graph = SDAHierarchicalGraph()
+        return graph.infer_record_schema(graph.read_records_json(source)), None
+    except Exception as e:
+        return None, "{}: {}".format(type(e).__name__, e)
+
+
+def transform_source(source, output, normalFormOperations, transformOperations):
+    """
+    Transforms a source file with a computed plan and writes the records as JSON array. Runs in a worker process.
+    The file is parsed again after infer_source_schema(): returning the records to the parent process and
+    sending them to a worker again would pickle them twice, which costs more than parsing the JSON file.
+
+    Args:
+        source (str): Path of the source file.
+        output (str): Path of the target file.
+        normalFormOperations (list): Operations selecting the fields of the normal form.
+        transformOperations (list): Operations transforming the normal form to the target.
+
+    Returns:
+        tuple: (records, error) where error is None on success.
+    """
+    try:
+        records = SDAHierarchicalGraph().read_records_json(source)
+        target = SDARecordExecutor(normalFormOperations, transformOperations).execute(records)
+        with open(output, "w") as output_file:
+            json.dump(target, output_file, separators=(",", ":"))
+        return len(target), None
+    except Exception as e:
+        return 0, "{}: {}".format(type(e).__name__, e)
+
+
+class SDABatchIntegration:
+    """
+    Integrates many source files that share the same source and target annotations.
+    The transformation is planned once per distinct source schema, and the files are parsed and
+    transformed in parallel by a pool of worker processes using the in-process record engine.
+
+    Attributes:
+        sourceAnnotation (dict): Source annotations shared by all source files.
+        targetAnnotation (dict): Target annotations shared by all source files.
+        processes (int): Number of worker processes, None for one per CPU.
+        planCache (SDAPlanCache): Optional persistent cache for the plans.
+        planner (str): Planner of the integrations, "regraph" or "native".
+        metrics (SDAMetrics): Hook receiving the timing of the batch phases and of the planning.
+        plans (dict): Computed plans by schema fingerprint, as (normalFormOperations, transformOperations) tuples,
+            or the exception raised while planning the schema.
+    """
+
+    def __init__(self, sourceAnnotationJsonPath, targetAnnotationJsonPath, processes=None, planCache=None, planner="regraph", metrics=None):
+        """
+        Initializes the SDABatchIntegration with the shared annotations.
+
+        Args:
+            sourceAnnotationJsonPath (str): Path to the JSON file containing source annotations.
+            targetAnnotationJsonPath (str): Path to the JSON file containing target annotations.
+            processes (int, optional): Number of worker processes. Defaults to None (one per CPU).
+            planCache (SDAPlanCache or str, optional): Persistent plan cache or its directory. Defaults to None.
+            planner (str, optional): "regraph" or "native", see SDAIntegration. Defaults to "regraph".
+            metrics (SDAMetrics, optional): Hook receiving the timing of the phases inferSchemas, planSchemas and
+                transformSources, and of the phases and rules of every planned schema. The operations executed by
+                the worker processes are not reported. Defaults to None (metrics are discarded).
+        """
+        with open(sourceAnnotationJsonPath) as annotation_file:
+            self.sourceAnnotation = json.load(annotation_file)
+        with open(targetAnnotationJsonPath) as annotation_file:
+            self.targetAnnotation = json.load(annotation_file)
+        self.processes = processes
+        self.planCache = planCache
+        self.planner = planner
+        self.metrics = metrics if metrics is not None else SDAMetrics()
+        self.plans = {}
+
+    def get_sources(self, sources):
+        """
+        Expands a glob pattern or a list of paths and patterns into a sorted list of source files.
+
+        Args:
+            sources (str or list): Glob pattern, or list of paths and glob patterns.
+
+        Returns:
+            list: List of source file paths.
+        """
+        if isinstance(sources, str):
+            sources = [sources]
+        paths = []
+        for source in sources:
+            matches = sorted(glob.glob(source))
+            paths.extend(matches if matches else [source])
+        return paths
+
+    def get_plan(self, schema):
+        """
+        Returns the plan for a source schema and plans the transformation on first use. A schema that fails
+        to plan is planned only once, later files with the same schema raise the same exception.
+
+        Args:
+            schema (dict): Inferred record schema of a source file.
+
+        Returns:
+            tuple: (fingerprint, normalFormOperations, transformOperations).
+
+        Raises:
+            Exception: The error raised while planning the schema.
+        """
+        fingerprint = get_schema_fingerprint(schema)
+        if fingerprint not in self.plans:
+            # The integration is only built for schemas that were not planned yet
+            try:
+                integration = SDAIntegration(planCache=self.planCache, metrics=self.metrics, planner=self.planner)
+                graph = integration.hirarchicalGraph
+                graph.addAnnotations(self.sourceAnnotation)
+                graph.addTargetAnnotations(self.targetAnnotation)
+                graph.readRecordSchema(schema, self.sourceAnnotation)
+                graph.createHirarchy()
+                integration.doTransformation()
+                self.plans[fingerprint] = (integration.transformation.normalFormOperations, integration.transformation.transformOperations)
+            except Exception as e:
+                self.plans[fingerprint] = e
+        plan = self.plans[fingerprint]
+        if isinstance(plan, Exception):
+            raise plan
+        return (fingerprint,) + plan
+
+    def get_outputs(self, paths, outputDir):
+        """
+        Returns the target file of every source file. The target files keep the paths of the source files relative
+        to their common directory, so source files with the same name in different directories do not overwrite
+        each other. Source files listed twice and target files overwriting a source file are reported as errors.
+
+        Args:
+            paths (list): Paths of the source files.
+            outputDir (str): Directory for the target files.
+
+        Returns:
+            list: (output, error) tuples per source file, where exactly one of both is None.
+        """
+        if not paths:
+            return []
+        sources = [os.path.realpath(path) for path in paths]
+        root = os.path.commonpath([os.path.dirname(source) for source in sources])
+        outputs = []
+        written = {}
+        for path, source in zip(paths, sources):
+            output = os.path.join(outputDir, os.path.relpath(source, root))
+            if os.path.realpath(output) in sources:
+                outputs.append((None, "Output {} would overwrite a source file".format(output)))
+            elif output in written:
+                outputs.append((None, "Output {} is already written for {}".format(output, written[output])))
+            else:
+                written[output] = path
+                outputs.append((output, None))
+        return outputs
+
+    def run(self, sources, outputDir):
+        """
+        Integrates all source files and writes one target JSON file per source file into the output directory.
+        Failures are reported per file and do not stop the batch. The worker processes start transforming
+        while the remaining schemas are planned, so the transformSources phase only covers the wait for the
+        transformations after the planning.
+
+        Args:
+            sources (str or list): Glob pattern, or list of paths and glob patterns of the source files.
+            outputDir (str): Directory for the target files, named after the source files, see get_outputs().
+
+        Returns:
+            list: One SDABatchResult per source file, in the order of the source files.
+        """
+        os.makedirs(outputDir, exist_ok=True)
+        paths = self.get_sources(sources)
+        results = [SDABatchResult(path) for path in paths]
+        outputs = self.get_outputs(paths, outputDir)
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            # Infer the source schemas in parallel
+            with self.metrics.phase("inferSchemas"):
+                schemas = list(pool.map(infer_source_schema, paths))
+
+            # Plan once per distinct schema
+            jobs = []
+            with self.metrics.phase("planSchemas"):
+                for result, (schema, error), (output, output_error) in zip(results, schemas, outputs):
+                    if output_error is not None or error is not None:
+                        result.error = output_error or error
+                        continue
+                    try:
+                        result.fingerprint, normalFormOperations, transformOperations = self.get_plan(schema)
+                    except Exception as e:
+                        result.fingerprint = get_schema_fingerprint(schema)
+                        result.error = "{}: {}".format(type(e).__name__, e)
+                        continue
+                    result.output = output
+                    os.makedirs(os.path.dirname(output), exist_ok=True)
+                    jobs.append((result, pool.submit(transform_source, result.source, result.output, normalFormOperations, transformOperations)))
+
+            # Collect the transformed files
+            with self.metrics.phase("transformSources"):
+                for result, job in jobs:
+                    result.records, result.error = job.result()
+                    if result.error is not None:
+                        result.output = None
+
+        return results
@@ -0,0 +1,266 @@
+GET_VALUE_CODE = '''
+def _resolve_path(value, path, start):
+    # Resolves the segments of a field path until an array is reached
+    for index in range(start, len(path)):
+        if isinstance(value, list):
+            return value, index
+        if not isinstance(value, dict):
+            return None, len(path)
+        value = value.get(path[index])
+    return value, len(path)
+
+
+def _get_value(value, path):
+    # Resolves a field path, a field of an array of structs yields the array of the field values
+    value, index = _resolve_path(value, path, 0)
+    if index == len(path):
+        return value
+    result = []
+    stack = [(iter(value), index, result)]
+    while stack:
+        items, index, values = stack[-1]
+        for item in items:
+            item, item_index = _resolve_path(item, path, index)
+            if item_index == len(path):
+                values.append(item)
+            else:
+                nested = []
+                values.append(nested)
+                stack.append((iter(item), item_index, nested))
+                break
+        else:
+            stack.pop()
+    return result
+'''
+
+ZIP_RECORDS_CODE = '''
+def _zip_records(columns, row):
+    # Combines the arrays of one row into a list of records, scalar values are repeated for every record
+    arrays = []
+    length = None
+    for value in row:
+        if hasattr(value, "tolist"):
+            value = value.tolist()
+        if isinstance(value, (list, tuple)):
+            if length is not None and len(value) != length:
+                raise ValueError("All arrays must be of the same length")
+            length = len(value)
+        arrays.append(value)
+    if length is None:
+        return []
+    arrays = [value if isinstance(value, (list, tuple)) else [value] * length for value in arrays]
+    return [dict(zip(columns, record)) for record in zip(*arrays)]
+'''
+
+
+class SDACodeGenerator:
+    """
+    Compiles the operations of an SDATransformation into the source code of a standalone transform function.
+    The operations are replayed once at compile time, like SDASparkExecutor.get_columns() does, so the generated
+    function only contains the data work: a single pass over the records building the target structure for
+    pandas, or a single select of column expressions for PySpark. It neither imports sda nor regraph.
+
+    Attributes:
+        normalFormOperations (list): Operations selecting the fields of the normal form.
+        transformOperations (list): Operations transforming the normal form to the target.
+    """
+
+    def __init__(self, normalFormOperations, transformOperations):
+        """
+        Initializes the SDACodeGenerator with the operations of a finished transformation.
+
+        Args:
+            normalFormOperations (list): List of `selectField` SDATransformOperations.
+            transformOperations (list): List of `renameNode`, `addHirarchy` and `nestList` SDATransformOperations.
+        """
+        self.normalFormOperations = normalFormOperations
+        self.transformOperations = transformOperations
+
+    def get_columns(self, select, nest_dict, nest_list):
+        """
+        Replays the operations on named expressions. The column naming and ordering follows the executors.
+
+        Args:
+            select (callable): Returns the expression of a normal form field from its split path.
+            nest_dict (callable): Returns the expression of a struct from the names and expressions of its fields.
+            nest_list (callable): Returns the expression of a list of records from the names and expressions
+                of its fields.
+
+        Returns:
+            list: List of (name, expression) tuples of the target columns.
+        """
+        columns = []
+        for operation in self.normalFormOperations:
+            path = operation.field.replace("root.", "").split(".")
+            columns.append((path[-1], select(path)))
+
+        for operation in self.transformOperations:
+            if operation.action == "renameNode":
+                old_name = operation.field.split(".")[-1]
+                columns = [(operation.rename if name == old_name else name, expr) for name, expr in columns]
+            elif operation.action == "addHirarchy":
+                columns = self.set_column(columns, operation.field, nest_dict, operation.connect)
+            elif operation.action == "nestList":
+                columns = self.set_column(columns, operation.field, nest_list, operation.get_flatten_connect())
+        return columns
+
+    def set_column(self, columns, name, nest, connect):
+        """
+        Nests columns into a new or replaced column and removes them, like SDASparkExecutor.set_column().
+
+        Args:
+            columns (list): List of (name, expression) tuples.
+            name (str): Name of the new column.
+            nest (callable): Returns the expression of the new column from the names and expressions of its fields.
+            connect (list): Names of the nested columns.
+
+        Returns:
+            list: Updated list of (name, expression) tuples.
+        """
+        lookup = dict(columns)
+        column = nest(connect, [lookup[col] for col in connect])
+        if name in lookup:
+            columns = [(existing, column if existing == name else expr) for existing, expr in columns]
+        else:
+            columns = columns + [(name, column)]
+        return [(existing, expr) for existing, expr in columns if existing not in connect]
+
+    def get_pandas_code(self, functionName="transform"):
+        """
+        Generates a module with a function transforming a list of parsed JSON objects to a pandas DataFrame
+        in the target structure, equivalent to SDAIntegration.transform() on local records.
+
+        Args:
+            functionName (str, optional): Name of the generated function. Defaults to "transform".
+
+        Returns:
+            str: Python source code.
+        """
+        return self.get_record_code(functionName, dataFrame=True)
+
+    def get_records_code(self, functionName="transform"):
+        """
+        Generates a module with a function transforming a list of parsed JSON objects to a list of dictionaries
+        in the target structure, equivalent to SDAIntegration.transformRecords(). The module has no imports.
+
+        Args:
+            functionName (str, optional): Name of the generated function. Defaults to "transform".
+
+        Returns:
+            str: Python source code.
+        """
+        return self.get_record_code(functionName, dataFrame=False)
+
+    def get_record_code(self, functionName, dataFrame):
+        """
+        Generates a module with a function building the target structure in a single pass over the records.
+
+        Args:
+            functionName (str): Name of the generated function.
+            dataFrame (bool): Return a pandas DataFrame instead of the list of dictionaries.
+
+        Returns:
+            str: Python source code.
+        """
+        def select(path):
+            if len(path) == 1:
+                return "record.get({!r})".format(path[0])
+            return "_get_value(record, {!r})".format(tuple(path))
+
+        def nest_dict(names, exprs):
+            return "{" + ", ".join("{!r}: {}".format(name, expr) for name, expr in zip(names, exprs)) + "}"
+
+        def nest_list(names, exprs):
+            return "_zip_records({!r}, ({},))".format(tuple(names), ", ".join(exprs))
+
+        columns = self.get_columns(select, nest_dict, nest_list)
+        row = nest_dict([name for name, _ in columns], [expr for _, expr in columns])
+
+        code = ["import pandas as pd", ""] if dataFrame else []
+        if any(len(operation.field.replace("root.", "").split(".")) > 1 for operation in self.normalFormOperations):
+            code.append(GET_VALUE_CODE)
+        if any(operation.action == "nestList" for operation in self.transformOperations):
+            code.append(ZIP_RECORDS_CODE)
+        if dataFrame:
+            code.extend([
+                "",
+                "def {}(records):".format(functionName),
+                '    """',
+                "    Transforms parsed JSON objects in the source structure to a pandas DataFrame in the target structure.",
+                '    """',
+                "    rows = [{} for record in records]".format(row),
+                "    return pd.DataFrame.from_records(rows, columns={!r})".format([name for name, _ in columns]),
+                "",
+            ])
+        else:
+            code.extend([
+                "",
+                "def {}(records):".format(functionName),
+                '    """',
+                "    Transforms parsed JSON objects in the source structure to dictionaries in the target structure.",
+                '    """',
+                "    return [{} for record in records]".format(row),
+                "",
+            ])
+        return "\n".join(code)
+
+    def get_spark_code(self, functionName="transform"):
+        """
+        Generates a module with a function transforming a Spark DataFrame of the source with a single select,
+        equivalent to SDAIntegration.transformSpark().
+
+        Args:
+            functionName (str, optional): Name of the generated function. Defaults to "transform".
+
+        Returns:
+            str: Python source code.
+        """
+        def select(path):
+            return "F.col({!r})".format(".".join(path))
+
+        def alias(names, exprs):
+            return ", ".join("{}.alias({!r})".format(expr, name) for name, expr in zip(names, exprs))
+
+        def nest_dict(names, exprs):
+            return "F.struct({})".format(alias(names, exprs))
+
+        def nest_list(names, exprs):
+            return "F.arrays_zip({})".format(alias(names, exprs))
+
+        columns = self.get_columns(select, nest_dict, nest_list)
+        return "\n".join([
+            "from pyspark.sql import functions as F",
+            "",
+            "",
+            "def {}(df):".format(functionName),
+            '    """',
+            "    Transforms a Spark DataFrame in the source structure to the target structure.",
+            '    """',
+            "    return df.select(",
+        ] + ["        {}.alias({!r}),".format(expr, name) for name, expr in columns] + [
+            "    )",
+            "",
+        ])
+
+    def get_function(self, flavor="pandas", functionName="transform"):
+        """
+        Compiles the generated code and returns the transform function.
+
+        Args:
+            flavor (str, optional): "pandas", "records" or "spark". Defaults to "pandas".
+            functionName (str, optional): Name of the generated function. Defaults to "transform".
+
+        Returns:
+            callable: The transform function.
+        """
+        if flavor == "pandas":
+            code = self.get_pandas_code(functionName)
+        elif flavor == "records":
+            code = self.get_records_code(functionName)
+        elif flavor == "spark":
+            code = self.get_spark_code(functionName)
+        else:
+            raise ValueError("Unknown flavor '{}'".format(flavor))
+        namespace = {}
+        exec(compile(code, "<sda {} transform>".format(flavor), "exec"), namespace)
+        return namespace[functionName]
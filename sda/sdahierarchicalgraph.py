@@ -1,10 +1,15 @@
-from pyspark import SparkConf, SparkContext
-from pyspark.sql import SparkSession
-from pyspark.sql.types import StructType, ArrayType
-import matplotlib.pyplot as plt
 import json
-from regraph import NXGraph, Rule, NXHierarchy
-from regraph import plot_graph, plot_instance, plot_rule
+import sys
+import threading
+
+# Default configuration of the Spark session created by SDAHierarchicalGraph.spark
+DEFAULT_SPARK_CONF = {
+    "spark.driver.bindAddress": "127.0.0.1",
+    "spark.driver.host": "localhost",
+}
+
+# Serializes the creation of the shared Spark session by concurrent integrations
+_spark_lock = threading.Lock()
 
 class SDAHierarchicalGraph:
     """
@@ -15,29 +20,64 @@ class SDAHierarchicalGraph:
         G (NXGraph): The schema graph.
         S (NXGraph): The annotation graph.
         M (NXGraph): The meta-model graph.
-        hirarchie (NXHierarchy): The hierarchical structure of graphs.
+        hirarchie (NXHierarchy or SDANativeHierarchy): The hierarchical structure of graphs.
+        planner (str): "regraph" to build the hierarchy with regraph, or "native" for the SDANativeHierarchy.
+        sourceSemantic (dict): Source annotations.
         targetSemantic (dict): Target annotations.
+        schema (StructType or dict): Schema of the source data frame, or the inferred schema of the
+            source records in the JSON format of Spark's StructType.
         source_df (DataFrame): Source data frame.
-        spark (SparkSession): Spark session for data operations.
+        source_records (list): Source records for the in-process engine.
+        spark (SparkSession): Spark session for data operations, created on first access.
+        sparkConf (dict): Configuration of the created Spark session, merged over DEFAULT_SPARK_CONF.
     """
 
-    def __init__(self):
+    def __init__(self, planner="regraph", spark=None, sparkConf=None):
         """
-        Initializes the SDAHierarchicalGraph class. Creates a Spark session and initializes graph attributes.
+        Initializes the SDAHierarchicalGraph class and its graph attributes.
+        The Spark session is created on first use.
+
+        Args:
+            planner (str, optional): "regraph" to build the hierarchy as regraph NXHierarchy, or "native" to build
+                the lightweight SDANativeHierarchy for the SDANativeTransformation. Defaults to "regraph".
+            spark (SparkSession, optional): Spark session to use, e.g. a tuned session shared by several
+                integrations. Defaults to None (the session of the process is created or reused on first use).
+            sparkConf (dict, optional): Configuration of the created Spark session, e.g. {"spark.driver.port": "7078"}.
+                Ignored if `spark` is given. Defaults to None.
         """
+        if planner not in ("regraph", "native"):
+            raise ValueError("Unknown planner '{}'".format(planner))
+        self.planner = planner
         self.G = None
         self.S = None
         self.M = self.get_meta_graph()
         self.hirarchie = None
+        self.sourceSemantic = None
         self.targetSemantic = None
+        self.schema = None
         self.source_df = None
-        self.spark = SparkSession \
-            .builder \
-            .config("spark.driver.bindAddress", "127.0.0.1") \
-            .config("spark.driver.host", "localhost") \
-            .config("spark.driver.port", "4040") \
-            .appName("sda") \
-            .getOrCreate()
+        self.source_records = None
+        self.sparkConf = sparkConf
+        self._spark = spark
+
+    @property
+    def spark(self):
+        """
+        Spark session for data operations, created on first access. Spark keeps one session per process,
+        so concurrent integrations share it; the creation is serialized, as the builder is not thread-safe.
+
+        Returns:
+            SparkSession: The Spark session.
+        """
+        if self._spark is None:
+            from pyspark.sql import SparkSession
+
+            with _spark_lock:
+                builder = SparkSession.builder.appName("sda")
+                for key, value in dict(DEFAULT_SPARK_CONF, **(self.sparkConf or {})).items():
+                    builder = builder.config(key, value)
+                self._spark = builder.getOrCreate()
+        return self._spark
 
     def addAnnotations(self, annotation):
         """
@@ -46,6 +86,7 @@ class SDAHierarchicalGraph:
         Args:
             annotation (dict): Annotations to be added.
         """
+        self.sourceSemantic = annotation
         self.S = self.get_annotation_graph(annotation)
 
     def loadSourceAnnotationsJSON(self, json_file_path):
@@ -66,21 +107,45 @@ class SDAHierarchicalGraph:
             json_file_path (str): Path to the JSON file containing target annotations.
         """
         annotation_file = open(json_file_path)
-        self.targetSemantic = json.load(annotation_file)
+        self.addTargetAnnotations(json.load(annotation_file))
+
+    def addTargetAnnotations(self, annotation):
+        """
+        Adds target annotations.
+
+        Args:
+            annotation (dict): Target annotations to be added.
+        """
+        self.targetSemantic = annotation
 
     def createHirarchy(self):
         """
         Creates a hierarchical structure by combining schema, annotations, and meta-model graphs.
         """
+        if self.planner == "native":
+            from .sdanativehierarchy import SDANativeHierarchy
+
+            # The native hierarchy copies only the nodes and edges, so the attributes need not be removed
+            self.hirarchie = SDANativeHierarchy()
+            self.hirarchie.add_graph("G", self.G, {"name": "Source Schema"})
+            self.hirarchie.add_graph("S", self.S, {"name": "Source Annotations"})
+            self.hirarchie.add_typing("G", "S", self.get_schema_annotation_mapping(self.G, self.S))
+            self.hirarchie.add_graph("M", self.M, {"name": "Meta Model"})
+            self.hirarchie.add_typing("G", "M", self.get_meta_mapping_G(self.G))
+            return
+
+        from regraph import NXHierarchy
+
+        # The graphs of the hierarchy are built from the nodes and edges only, the attributes stay in G, S and M
         self.hirarchie = NXHierarchy()
-        self.hirarchie.add_graph("G", self.remove_attributes(self.G), {"name": "Source Schema"})
+        self.hirarchie.add_graph_from_data("G", self.G.nodes(), self.G.edges(), {"name": "Source Schema"})
         # Add Source Semantic
-        self.hirarchie.add_graph("S", self.remove_attributes(self.S), {"name": "Source Annotations"})
+        self.hirarchie.add_graph_from_data("S", self.S.nodes(), self.S.edges(), {"name": "Source Annotations"})
         self.hirarchie.add_typing(
             "G", "S", self.get_schema_annotation_mapping(self.G, self.S)
         )
         # Add Meta Model
-        self.hirarchie.add_graph("M", self.remove_attributes(self.M), {"name": "Meta Model"})
+        self.hirarchie.add_graph_from_data("M", self.M.nodes(), self.M.edges(), {"name": "Meta Model"})
         self.hirarchie.add_typing(
             "G", "M", self.get_meta_mapping_G(self.G)
         )
@@ -92,18 +157,102 @@ class SDAHierarchicalGraph:
         Args:
             df (DataFrame): The source data frame.
         """
+        self.schema = df.schema
         self.G = self.get_schema_graph(df.schema)
 
-    def readSourceJSON(self, json_file_path):
+    def readSourceJSON(self, json_file_path, schema=None, samplingRatio=None, annotation=None):
         """
         Reads a JSON file, converts it to a data frame, and processes its schema.
+        By default Spark infers the schema with a full pass over the data. The cost of the inference
+        is bounded by sampling the records, or avoided by passing an explicit schema.
 
         Args:
             json_file_path (str): Path to the JSON file.
+            schema (StructType or str, optional): Explicit schema or DDL string. Skips the schema inference. Defaults to None.
+            samplingRatio (float, optional): Fraction of the records used for the schema inference. Fields that
+                only occur in records outside the sample are not read. Defaults to None (all records).
+            annotation (dict, optional): Source annotations. If given, the schema is pruned to the annotated paths
+                before the data is read, so Spark only deserializes the annotated fields. Defaults to None.
         """
-        self.source_df = self.spark.read.option("multiline", "true").json(json_file_path)
+        reader = self.spark.read.option("multiline", "true")
+        if samplingRatio is not None:
+            reader = reader.option("samplingRatio", samplingRatio)
+        if annotation is not None:
+            if schema is None:
+                schema = reader.json(json_file_path).schema
+            elif isinstance(schema, str):
+                schema = reader.schema(schema).json(json_file_path).schema
+            schema = self.prune_schema(schema, annotation)
+        if schema is not None:
+            reader = reader.schema(schema)
+        self.source_df = reader.json(json_file_path)
         self.readSourceDF(self.source_df)
 
+    def readSourceRecords(self, records, annotation=None):
+        """
+        Reads parsed JSON records for the in-process engine and converts their inferred schema to a graph.
+        No Spark session is required.
+
+        Args:
+            records (list): List of parsed JSON objects.
+            annotation (dict, optional): Source annotations. If given, the graph only covers the annotated paths,
+                as all other fields are removed by the transformation anyway. Defaults to None.
+        """
+        self.source_records = records
+        self.readRecordSchema(self.infer_record_schema(records), annotation)
+
+    def readRecordSchema(self, schema, annotation=None):
+        """
+        Converts an inferred record schema to a graph, e.g. to plan a transformation for records
+        that are only transformed later on.
+
+        Args:
+            schema (dict): Struct schema in the JSON format of Spark's StructType, as returned by `infer_record_schema`.
+            annotation (dict, optional): Source annotations to prune the graph to. Defaults to None.
+        """
+        self.schema = schema
+        self.G = self.get_record_schema_graph(schema, annotation=annotation)
+
+    def readSourceRecordsJSON(self, json_file_path, annotation=None):
+        """
+        Reads a JSON file with a single object, an array of objects, or one object per line
+        for the in-process engine.
+
+        Args:
+            json_file_path (str): Path to the JSON file.
+            annotation (dict, optional): Source annotations to prune the graph to. Defaults to None.
+        """
+        self.readSourceRecords(self.read_records_json(json_file_path), annotation)
+
+    def read_records_json(self, json_file_path):
+        """
+        Parses a JSON file with a single object, an array of objects, or one object per line.
+
+        Args:
+            json_file_path (str): Path to the JSON file.
+
+        Returns:
+            list: List of parsed JSON objects.
+        """
+        with open(json_file_path) as source_file:
+            content = source_file.read()
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = [json.loads(line) for line in content.splitlines() if line.strip()]
+        return data if isinstance(data, list) else [data]
+
+    def get_schema_json(self):
+        """
+        Returns the JSON representation of the source schema, as produced by Spark's `StructType.json()`.
+
+        Returns:
+            str: JSON representation of the schema.
+        """
+        if isinstance(self.schema, dict):
+            return json.dumps(self.schema, separators=(",", ":"), sort_keys=True)
+        return self.schema.json()
+
     def get_schema_graph(self, schema, parent="root", G=None, S=None):
         """
         Converts a schema into a graph structure.
@@ -117,24 +266,561 @@ class SDAHierarchicalGraph:
         Returns:
             NXGraph: Graph representation of the schema.
         """
+        from regraph import NXGraph
+
         if G is None:
             G = NXGraph()
             G.add_node('root', {"type": "root", "key_name": "root"})
+        self.add_schema_template(G, parent, self.get_schema_template(schema, self.get_schema_fields, {}))
+        return G
+
+    def get_schema_fields(self, schema, annotation=None):
+        """
+        Returns the fields of a Spark struct type for get_schema_template().
+
+        Args:
+            schema (StructType): Struct type.
+            annotation (dict, optional): Unused, Spark schemas are pruned before they are read. Defaults to None.
+
+        Returns:
+            list: (name, kind, data type, nullable, metadata, nested struct type or None) tuples.
+        """
+        from pyspark.sql.types import StructType, ArrayType
+
+        fields = []
         for field in schema.fields:
-            f_name = parent + "." + field.name
             if isinstance(field.dataType, StructType):
-                G.add_node(f_name, {"key_name": field.name, "type": 'struct', "dataType": field.dataType.simpleString(), "nullable": field.nullable, "metadata": field.metadata})
-                G.add_edge(parent, f_name)
-                self.get_schema_graph(field.dataType, f_name, G)
+                fields.append((field.name, 'struct', "struct", field.nullable, field.metadata, field.dataType))
             elif isinstance(field.dataType, ArrayType) and isinstance(field.dataType.elementType, StructType):
-                G.add_node(f_name, {"key_name": field.name, "type": 'array', "dataType": field.dataType.simpleString(), "nullable": field.nullable, "metadata": field.metadata})
-                G.add_edge(parent, f_name)
-                self.get_schema_graph(field.dataType.elementType, f_name, G)
+                fields.append((field.name, 'array', "array<struct>", field.nullable, field.metadata, field.dataType.elementType))
             else:
-                G.add_node(f_name, {"key_name": field.name, "type": 'field', "dataType": field.dataType.simpleString(), "nullable": field.nullable, "metadata": field.metadata})
+                fields.append((field.name, 'field', field.dataType.simpleString(), field.nullable, field.metadata, None))
+        return fields
+
+    def get_schema_template(self, schema, get_fields, templates, annotation=None):
+        """
+        Converts a struct type into a template of its nodes. Structurally identical struct types, e.g. the same
+        reading struct under many sibling keys, share one template: the key of a struct consists of its fields
+        and the identity of the templates of its nested structs, so it is computed in time proportional to the
+        number of fields. The template is instantiated for every occurrence by add_schema_template().
+        The nested structs are converted bottom-up with an explicit stack, so the depth of the schema is not
+        bounded by the recursion limit.
+
+        Args:
+            schema: Struct type, as accepted by `get_fields`.
+            get_fields (callable): Returns the fields of a struct type, see get_schema_fields().
+            templates (dict): Templates by key, shared by all structs of a schema.
+            annotation (dict, optional): Source annotations of the struct, the fields are pruned to the
+                annotated paths as in prune_schema(). Defaults to None (no pruning).
+
+        Returns:
+            tuple: The fields of the struct as (name, attrs, template of the nested struct or None) tuples.
+        """
+        # Every entry holds the fields of a struct and the fields converted so far
+        stack = [(get_fields(schema, annotation), annotation, [])]
+        while True:
+            struct_fields, struct_annotation, fields = stack[-1]
+            if len(fields) < len(struct_fields):
+                name, kind, dataType, nullable, metadata, nested = struct_fields[len(fields)]
+                if nested is None:
+                    fields.append((name, kind, dataType, nullable, metadata, None))
+                else:
+                    value = struct_annotation[name] if struct_annotation is not None else None
+                    if kind == 'struct':
+                        value = value if isinstance(value, dict) else None
+                    else:
+                        value = value[0] if isinstance(value, list) else None
+                    stack.append((get_fields(nested, value), value, []))
+                continue
+
+            stack.pop()
+            template = self.get_struct_template(fields, templates)
+            if not stack:
+                return template
+            parent_fields, _, converted = stack[-1]
+            name, kind, dataType, nullable, metadata, _ = parent_fields[len(converted)]
+            converted.append((name, kind, dataType, nullable, metadata, template))
+
+    def get_struct_template(self, fields, templates):
+        """
+        Returns the shared template of a struct whose nested structs are already converted.
+
+        Args:
+            fields (list): (name, kind, data type, nullable, metadata, template of the nested struct or None) tuples.
+            templates (dict): Templates by key, shared by all structs of a schema.
+
+        Returns:
+            tuple: The fields of the struct as (name, attrs, template of the nested struct or None) tuples.
+        """
+        key = tuple((name, kind, dataType, nullable, json.dumps(metadata, sort_keys=True) if metadata else None,
+                     id(nested) if nested is not None else None) for name, kind, dataType, nullable, metadata, nested in fields)
+        template = templates.get(key)
+        if template is None:
+            template = tuple((name, self.get_node_attrs(name, kind, dataType, nullable, metadata), nested)
+                             for name, kind, dataType, nullable, metadata, nested in fields)
+            templates[key] = template
+        return template
+
+    def add_schema_template(self, G, parent, template):
+        """
+        Adds the nodes of a struct template below a parent node, in the same depth-first order as the fields
+        of the schema. The nested structs are added with an explicit stack, and the id of every node is built
+        once from the id of its parent.
+
+        Args:
+            G (NXGraph): Graph to be modified.
+            parent (str): Id of the parent node.
+            template (tuple): Template of the struct, see get_schema_template().
+        """
+        stack = [(parent, parent + ".", iter(template))]
+        while stack:
+            parent, prefix, fields = stack[-1]
+            for name, attrs, nested in fields:
+                f_name = prefix + name
+                G.add_node(f_name, attrs)
                 G.add_edge(parent, f_name)
+                if nested is not None:
+                    stack.append((f_name, f_name + ".", iter(nested)))
+                    break
+            else:
+                stack.pop()
+
+    def get_node_attrs(self, key_name, type, dataType, nullable, metadata):
+        """
+        Creates the compact attributes of a schema node. regraph wraps every attribute in a set of its own, so
+        only the name, the kind and the data type are always stored: nullable is only stored if the field is
+        not nullable, the metadata only if it is not empty. The names, kinds and data types are interned, as they
+        repeat across the nodes, and structs and arrays of structs store their kind as data type instead of the type
+        string of all their fields, which are nodes of their own.
+
+        Args:
+            key_name (str): Name of the field.
+            type (str): "struct", "array" or "field".
+            dataType (str): Short type string of the field.
+            nullable (bool): Whether the field is nullable.
+            metadata (dict): Metadata of the field.
+
+        Returns:
+            dict: The node attributes.
+        """
+        attrs = {"key_name": sys.intern(key_name), "type": sys.intern(type), "dataType": sys.intern(dataType)}
+        if not nullable:
+            attrs["nullable"] = False
+        if metadata:
+            attrs["metadata"] = metadata
+        return attrs
+
+    def get_record_schema_graph(self, schema, parent="root", G=None, annotation=None):
+        """
+        Converts an inferred record schema into a graph structure, equal to the graph of `get_schema_graph`
+        for the corresponding Spark schema.
+
+        Args:
+            schema (dict): Struct schema in the JSON format of Spark's StructType.
+            parent (str): Parent node in the graph. Defaults to "root".
+            G (NXGraph): Graph to be modified. Defaults to None.
+            annotation (dict, optional): Source annotations. If given, the graph only covers the annotated
+                paths, like the graph of a pruned Spark schema. Defaults to None.
+
+        Returns:
+            NXGraph: Graph representation of the schema.
+        """
+        from regraph import NXGraph
+
+        if G is None:
+            G = NXGraph()
+            G.add_node('root', {"type": "root", "key_name": "root"})
+        self.add_schema_template(G, parent, self.get_schema_template(schema, self.get_record_schema_fields, {}, annotation))
         return G
 
+    def get_record_schema_fields(self, schema, annotation=None):
+        """
+        Returns the fields of an inferred struct type for get_schema_template().
+
+        Args:
+            schema (dict): Struct schema in the JSON format of Spark's StructType.
+            annotation (dict, optional): Source annotations of the struct. Fields which are not annotated are
+                skipped. Defaults to None (all fields).
+
+        Returns:
+            list: (name, kind, data type, nullable, metadata, nested struct schema or None) tuples.
+        """
+        fields = []
+        for field in schema["fields"]:
+            if annotation is not None and field["name"] not in annotation:
+                continue
+            data_type = field["type"]
+            if isinstance(data_type, dict) and data_type["type"] == "struct":
+                fields.append((field["name"], 'struct', "struct", field["nullable"], field["metadata"], data_type))
+            elif isinstance(data_type, dict) and data_type["type"] == "array" and isinstance(data_type["elementType"], dict) and data_type["elementType"]["type"] == "struct":
+                fields.append((field["name"], 'array', "array<struct>", field["nullable"], field["metadata"], data_type["elementType"]))
+            else:
+                fields.append((field["name"], 'field', self.get_simple_string(data_type), field["nullable"], field["metadata"], None))
+        return fields
+
+    def infer_record_schema(self, records):
+        """
+        Infers the schema of parsed JSON records the same way Spark infers the schema of a JSON source:
+        integers are longs, mixed numbers are doubles, other conflicts and nulls are strings and the fields
+        of structs are sorted by name.
+
+        Args:
+            records (list): List of parsed JSON objects.
+
+        Returns:
+            dict: Struct schema in the JSON format of Spark's StructType.
+        """
+        data_type = {"type": "struct", "fields": []}
+        for record in records:
+            data_type = self.merge_record_types(data_type, self.infer_record_type(record))
+        return self.finalize_record_type(data_type)
+
+    def infer_record_type(self, value):
+        """
+        Infers the type of a single JSON value. Nested values are inferred bottom-up with an explicit stack,
+        so the depth of the value is not bounded by the recursion limit.
+
+        Args:
+            value: Parsed JSON value.
+
+        Returns:
+            str or dict: Type in the JSON format of Spark's DataType, "null" for null values.
+        """
+        if not isinstance(value, (dict, list)):
+            return self.infer_scalar_type(value)
+
+        # Every entry holds the type of a struct or array, its fields, the iterator over its items and the key of the current item
+        stack = [self.get_type_frame(value)]
+        while True:
+            frame = stack[-1]
+            fields = frame[1]
+            for key, item in frame[2]:
+                if isinstance(item, (dict, list)):
+                    frame[3] = key
+                    stack.append(self.get_type_frame(item))
+                    break
+                if fields is not None:
+                    # Scalar fields of a struct, the most frequent case
+                    fields.append(self.get_record_field(key, self.infer_scalar_type(item)))
+                else:
+                    self.add_item_type(frame, key, self.infer_scalar_type(item))
+            else:
+                stack.pop()
+                if not stack:
+                    return frame[0]
+                self.add_item_type(stack[-1], stack[-1][3], frame[0])
+
+    def infer_scalar_type(self, value):
+        """
+        Infers the type of a JSON value which is neither an object nor an array.
+
+        Args:
+            value: Parsed JSON value.
+
+        Returns:
+            str: Type in the JSON format of Spark's DataType, "null" for null values.
+        """
+        if isinstance(value, bool):
+            return "boolean"
+        if isinstance(value, int):
+            return "long"
+        if isinstance(value, float):
+            return "double"
+        if value is None:
+            return "null"
+        return "string"
+
+    def get_type_frame(self, value):
+        """
+        Creates the stack entry of infer_record_type() for a JSON object or array.
+
+        Args:
+            value (dict or list): Parsed JSON object or array.
+
+        Returns:
+            list: The type without items, the fields of a struct type or None for an array type, the iterator over
+                the (key, item) tuples of the value and the key of the current item. Array items are keyed by index.
+        """
+        if isinstance(value, dict):
+            fields = []
+            return [{"type": "struct", "fields": fields}, fields, iter(sorted(value.items())), None]
+        return [{"type": "array", "elementType": "null", "containsNull": True}, None, enumerate(value), None]
+
+    def add_item_type(self, frame, key, data_type):
+        """
+        Adds the type of an item to the type of its struct or array: structs get a field, arrays merge the
+        type into their element type.
+
+        Args:
+            frame (list): Stack entry of infer_record_type(), see get_type_frame().
+            key (str or int): Field name of the item, unused index for array elements.
+            data_type (str or dict): Type of the item.
+        """
+        if frame[1] is not None:
+            frame[1].append(self.get_record_field(key, data_type))
+        else:
+            frame[0]["elementType"] = self.merge_record_types(frame[0]["elementType"], data_type)
+
+    def get_record_field(self, name, data_type):
+        """
+        Creates a struct field in the JSON format of Spark's StructField.
+
+        Args:
+            name (str): Field name.
+            data_type (str or dict): Field type.
+
+        Returns:
+            dict: The struct field.
+        """
+        return {"name": name, "type": data_type, "nullable": True, "metadata": {}}
+
+    def build_record_type(self, build, *args):
+        """
+        Builds a type in the JSON format of Spark's DataType top-down with an explicit stack, so the depth of
+        the type is not bounded by the recursion limit.
+
+        Args:
+            build (callable): Returns the type for the arguments with placeholders for its nested types, and an
+                iterator over (container, key, arguments) tuples of the nested types, or None if there are none.
+            *args: Arguments of `build` for the outermost type.
+
+        Returns:
+            str or dict: The built type.
+        """
+        data_type, nested = build(*args)
+        stack = [nested] if nested is not None else []
+        while stack:
+            for container, key, nested_args in stack[-1]:
+                container[key], nested = build(*nested_args)
+                if nested is not None:
+                    stack.append(nested)
+                    break
+            else:
+                stack.pop()
+        return data_type
+
+    def merge_record_types(self, left, right):
+        """
+        Merges two inferred types into a type compatible with both.
+
+        Args:
+            left (str or dict): First type.
+            right (str or dict): Second type.
+
+        Returns:
+            str or dict: The merged type.
+        """
+        try:
+            # Equal types are frequent, e.g. the types of array elements, and compared much faster than merged
+            if left == right:
+                return left
+        except RecursionError:
+            # Too deeply nested to be compared, the types are merged on the explicit stack instead
+            pass
+        return self.build_record_type(self.get_merged_type, left, right)
+
+    def get_merged_type(self, left, right):
+        """
+        Merges two types for build_record_type(). Nested types are compared by their kind only, as comparing
+        deeply nested types by value would be bounded by the recursion limit.
+
+        Args:
+            left (str or dict): First type.
+            right (str or dict): Second type.
+
+        Returns:
+            tuple: The merged type and the nested types to merge, see build_record_type().
+        """
+        if left is right:
+            return left, None
+        if isinstance(left, dict) and isinstance(right, dict) and left["type"] == right["type"]:
+            if left["type"] == "struct":
+                field_types = {field["name"]: field["type"] for field in left["fields"]}
+                nested_types = {}
+                for field in right["fields"]:
+                    left_type = field_types.get(field["name"], "null")
+                    if isinstance(left_type, dict) or isinstance(field["type"], dict):
+                        field_types[field["name"]] = None
+                        nested_types[field["name"]] = (left_type, field["type"])
+                    else:
+                        # Scalar types are merged right away instead of on the stack
+                        field_types[field["name"]] = self.merge_scalar_types(left_type, field["type"])
+                fields = [self.get_record_field(name, field_types[name]) for name in sorted(field_types)]
+                return {"type": "struct", "fields": fields}, iter([
+                    (field, "type", nested_types[field["name"]]) for field in fields if field["name"] in nested_types])
+            data_type = {"type": "array", "elementType": None, "containsNull": True}
+            return data_type, iter([(data_type, "elementType", (left["elementType"], right["elementType"]))])
+        return self.merge_scalar_types(left, right), None
+
+    def merge_scalar_types(self, left, right):
+        """
+        Merges two types which are not nested types of the same kind.
+
+        Args:
+            left (str or dict): First type.
+            right (str or dict): Second type.
+
+        Returns:
+            str or dict: The merged type.
+        """
+        if not isinstance(left, dict) and left == right:
+            return left
+        if left == "null":
+            return right
+        if right == "null":
+            return left
+        if left in ("long", "double") and right in ("long", "double"):
+            return "double"
+        return "string"
+
+    def finalize_record_type(self, data_type):
+        """
+        Replaces the types of fields that were only null with strings, as Spark does.
+
+        Args:
+            data_type (str or dict): Inferred type.
+
+        Returns:
+            str or dict: The finalized type.
+        """
+        return self.build_record_type(self.get_finalized_type, data_type)
+
+    def get_finalized_type(self, data_type):
+        """
+        Finalizes a type for build_record_type().
+
+        Args:
+            data_type (str or dict): Inferred type.
+
+        Returns:
+            tuple: The finalized type and its nested types to finalize, see build_record_type().
+        """
+        if data_type == "null":
+            return "string", None
+        if isinstance(data_type, dict) and data_type["type"] == "struct":
+            fields = []
+            nested = []
+            for original in data_type["fields"]:
+                if isinstance(original["type"], dict):
+                    fields.append(self.get_record_field(original["name"], None))
+                    nested.append((fields[-1], "type", (original["type"],)))
+                else:
+                    fields.append(self.get_record_field(original["name"], "string" if original["type"] == "null" else original["type"]))
+            return {"type": "struct", "fields": fields}, iter(nested)
+        if isinstance(data_type, dict) and data_type["type"] == "array":
+            finalized = {"type": "array", "elementType": None, "containsNull": True}
+            return finalized, iter([(finalized, "elementType", (data_type["elementType"],))])
+        return data_type, None
+
+    def get_simple_string(self, data_type):
+        """
+        Returns the short type string of a type, as produced by Spark's `DataType.simpleString()`.
+
+        Args:
+            data_type (str or dict): Type in the JSON format of Spark's DataType.
+
+        Returns:
+            str: The short type string.
+        """
+        if isinstance(data_type, dict):
+            if data_type["type"] == "struct":
+                return "struct<" + ",".join(field["name"] + ":" + self.get_simple_string(field["type"]) for field in data_type["fields"]) + ">"
+            return "array<" + self.get_simple_string(data_type["elementType"]) + ">"
+        return {"long": "bigint", "integer": "int", "short": "smallint", "byte": "tinyint"}.get(data_type, data_type)
+
+    def prune_schema(self, schema, annotation=None):
+        """
+        Prunes a schema to the paths covered by the source annotations. All other fields would be mapped
+        to "DELETE" and removed from the graph anyway, so they do not need to be read.
+
+        Args:
+            schema (StructType): Schema to prune.
+            annotation (dict, optional): Source annotations. Defaults to the loaded source annotations.
+
+        Returns:
+            StructType: Schema with the annotated fields only, keeping their data types.
+        """
+        from pyspark.sql.types import StructType, StructField, ArrayType
+
+        if annotation is None:
+            annotation = self.sourceSemantic
+        fields = []
+        for field in schema.fields:
+            if field.name not in annotation:
+                continue
+            value = annotation[field.name]
+            if isinstance(value, dict) and isinstance(field.dataType, StructType):
+                fields.append(StructField(field.name, self.prune_schema(field.dataType, value), field.nullable, field.metadata))
+            elif isinstance(value, list) and isinstance(field.dataType, ArrayType) and isinstance(field.dataType.elementType, StructType):
+                element_type = self.prune_schema(field.dataType.elementType, value[0])
+                fields.append(StructField(field.name, ArrayType(element_type, field.dataType.containsNull), field.nullable, field.metadata))
+            else:
+                fields.append(field)
+        return StructType(fields)
+
+    def get_annotation_schema(self, annotation=None, dataTypes=None):
+        """
+        Derives a Spark schema from source annotations, so only the annotated paths are read and no
+        schema inference is required. Annotated fields are read as strings unless a data type is given
+        for their annotation.
+
+        Args:
+            annotation (dict, optional): Source annotations. Defaults to the loaded source annotations.
+            dataTypes (dict, optional): Mapping of annotation names (e.g. "ZIP") to Spark DataTypes. Defaults to None.
+
+        Returns:
+            StructType: Schema covering exactly the annotated paths.
+        """
+        from pyspark.sql.types import StructType, StructField, ArrayType, StringType
+
+        if annotation is None:
+            annotation = self.sourceSemantic
+        if dataTypes is None:
+            dataTypes = {}
+        fields = []
+        for key, value in annotation.items():
+            if isinstance(value, dict):
+                fields.append(StructField(key, self.get_annotation_schema(value, dataTypes)))
+            elif isinstance(value, list):
+                fields.append(StructField(key, ArrayType(self.get_annotation_schema(value[0], dataTypes))))
+            else:
+                fields.append(StructField(key, dataTypes.get(value, StringType())))
+        return StructType(fields)
+
+    def get_annotation_record_schema(self, annotation=None):
+        """
+        Derives a record schema from source annotations without Spark, e.g. to plan a transformation before
+        any record is seen. Annotated fields are strings and the fields of structs are sorted by name, as
+        `infer_record_schema` does.
+
+        Args:
+            annotation (dict, optional): Source annotations. Defaults to the loaded source annotations.
+
+        Returns:
+            dict: Struct schema in the JSON format of Spark's StructType.
+        """
+        if annotation is None:
+            annotation = self.sourceSemantic
+        return self.build_record_type(self.get_annotation_type, annotation)
+
+    def get_annotation_type(self, annotation):
+        """
+        Derives the type of an annotation for build_record_type().
+
+        Args:
+            annotation (dict, list or str): Annotations of a struct, an array of structs or a field.
+
+        Returns:
+            tuple: The type and its nested types, see build_record_type().
+        """
+        if isinstance(annotation, dict):
+            fields = [self.get_record_field(key, None) for key in sorted(annotation)]
+            return {"type": "struct", "fields": fields}, iter([(field, "type", (annotation[field["name"]],)) for field in fields])
+        if isinstance(annotation, list):
+            data_type = {"type": "array", "elementType": None, "containsNull": True}
+            return data_type, iter([(data_type, "elementType", (annotation[0],))])
+        return "string", None
+
     def get_meta_graph(self):
         """
         Creates and returns the meta-model graph.
@@ -142,6 +828,8 @@ class SDAHierarchicalGraph:
         Returns:
             NXGraph: Meta-model graph.
         """
+        from regraph import NXGraph
+
         M = NXGraph()
         M.add_node('ROOT', {"type": "root", "key_name": "root"})
         M.add_node("STRUCT", {})
@@ -220,14 +908,7 @@ class SDAHierarchicalGraph:
             dict: A dictionary that maps the nodes of G to annotations, "root", or "DELETE".
         """
         mapping = {}        
-        annotations = {}    
-
-        for node in S.nodes(data=True):  
-            node_type, attrs = node
-            if "id" in attrs.keys():  
-                for x in attrs['id'].fset:
-                    node_id = x    
-                annotations[node_id] = node_type  
+        annotations = self.get_annotated_paths(S)
 
         for node in G.nodes(data=True):
             node_id, attrs = node  
@@ -241,10 +922,68 @@ class SDAHierarchicalGraph:
 
         return mapping
 
-    
+    def get_annotated_paths(self, S=None):
+        """
+        Returns the annotated paths of the source schema, which are the ids of the annotated nodes of the
+        schema graph.
+
+        Args:
+            S (NXGraph, optional): Annotation graph. Defaults to the annotation graph of the source annotations.
+
+        Returns:
+            dict: Mapping of the annotated paths to the nodes of the annotation graph.
+        """
+        if S is None:
+            S = self.S
+        annotations = {}
+        for node in S.nodes(data=True):
+            node_type, attrs = node
+            if "id" in attrs.keys():
+                for x in attrs['id'].fset:
+                    node_id = x
+                annotations[node_id] = node_type
+        return annotations
+
+    def get_node_kind(self, G, node):
+        """
+        Returns the kind of a schema node.
+
+        Args:
+            G (NXGraph): Schema graph.
+            node (str): Id of the node.
+
+        Returns:
+            str: "root", "struct", "array" or "field".
+        """
+        return list(G.get_node(node)['type'])[0]
+
+    def diff_schema_graph(self, previous, G=None):
+        """
+        Compares a schema graph with a previous version of it, e.g. after the schema of the source evolved.
+        Only the kinds of the nodes are compared, a changed data type of a field does not change the plan.
+
+        Args:
+            previous (NXGraph): Previous schema graph.
+            G (NXGraph, optional): Current schema graph. Defaults to the schema graph of the loaded source.
+
+        Returns:
+            tuple: The ids of the added and of the removed nodes. A node whose kind changed, e.g. a field that
+                became a struct, is in both.
+        """
+        if G is None:
+            G = self.G
+        nodes = set(G.nodes())
+        previous_nodes = set(previous.nodes())
+        changed = {node for node in nodes & previous_nodes
+                   if self.get_node_kind(G, node) != self.get_node_kind(previous, node)}
+        added = [node for node in G.nodes() if node not in previous_nodes or node in changed]
+        removed = [node for node in previous.nodes() if node not in nodes or node in changed]
+        return added, removed
+
     def get_annotation_graph(self, annotation, parent_id="root", parent="root", S=None):
         """
-        Converts annotations into a graph structure.
+        Converts annotations into a graph structure. The nested annotations are converted depth-first with an
+        explicit stack, so the depth of the annotations is not bounded by the recursion limit.
 
         Args:
             annotation (dict): Annotations to be converted.
@@ -255,34 +994,40 @@ class SDAHierarchicalGraph:
         Returns:
             NXGraph: Graph representation of the annotations.
         """
+        from regraph import NXGraph
+
         if S is None:
             S = NXGraph()
             S.add_node('root', {"type": "root", "key_name": "root"})
             S.add_node('DELETE')
             S.add_edge("root", "DELETE")
             S.add_edge("DELETE", "DELETE")
-        for key, value in annotation.items():
-            f_name = parent_id + "." + key
-            if isinstance(value, dict):
-                name = parent + ".DICT"
-                S.add_node(name, {"key_name": key, "id": f_name, "type": 'struct'})
-                S.add_edge(parent, name)
-                S.add_edge(name, "DELETE")
-                self.get_annotation_graph(value, f_name, name, S)
-            elif isinstance(value, list):
-                name = parent + ".LIST"
-                S.add_node(name, {"key_name": key, "id": f_name, "type": 'array'})
+        stack = [(parent_id + ".", parent, iter(annotation.items()))]
+        while stack:
+            prefix, parent, items = stack[-1]
+            for key, value in items:
+                f_name = prefix + key
+                key = sys.intern(key)
+                if isinstance(value, dict):
+                    name, kind, nested = parent + ".DICT", 'struct', value
+                elif isinstance(value, list):
+                    name, kind, nested = parent + ".LIST", 'array', value[0]
+                else:
+                    S.add_node(value, {"key_name": key, "id": f_name, "type": 'field'})
+                    S.add_edge(parent, value)
+                    continue
+                S.add_node(name, {"key_name": key, "id": f_name, "type": kind})
                 S.add_edge(parent, name)
                 S.add_edge(name, "DELETE")
-                self.get_annotation_graph(value[0], f_name, name, S)
+                stack.append((f_name + ".", name, iter(nested.items())))
+                break
             else:
-                S.add_node(value, {"key_name": key, "id": f_name, "type": 'field'})
-                S.add_edge(parent, value)
+                stack.pop()
         return S
 
     def remove_attributes(self, G):
         """
-        Removes attributes from all nodes in the graph.
+        Returns a copy of the graph without attributes. Only the nodes and edges are copied.
 
         Args:
             G (NXGraph): Graph whose node attributes are to be removed.
@@ -290,11 +1035,12 @@ class SDAHierarchicalGraph:
         Returns:
             NXGraph: Graph with attributes removed.
         """
-        G = NXGraph.copy(G)
-        for node in G.nodes(data=True):
-            node_id, attrs = node
-            G.update_node_attrs(node_id, {})
-        return G
+        from regraph import NXGraph
+
+        graph = NXGraph()
+        graph.add_nodes_from(G.nodes())
+        graph.add_edges_from(G.edges())
+        return graph
 
     def add_hom_S_M(self):
         """
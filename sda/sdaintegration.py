@@ -1,70 +1,228 @@
 import json
-import pandas as pd
+import time
 from .sdahierarchicalgraph import SDAHierarchicalGraph
 from .sdatransformation import SDATransformation
-from regraph import plot_graph, plot_instance, plot_rule
+from .sdanativetransformation import SDANativeTransformation
+from .sdasparkexecutor import SDASparkExecutor
+from .sdapandasexecutor import SDAPandasExecutor
+from .sdarecordexecutor import SDARecordExecutor
+from .sdaarrowexecutor import SDAArrowExecutor
+from .sdacodegenerator import SDACodeGenerator
+from .sdaplancache import SDAPlanCache
+from .sdaplotter import SDAPlotter
+from .sdametrics import SDAMetrics
 
 
 class SDAIntegration:
     """
     A class to handle the integration of source data and its transformation into a hierarchical graph,
     followed by further processing and manipulation.
+
+    An integration holds the state of one pipeline and is used by one thread at a time. Pipelines run
+    concurrently with one integration per thread; they can share a Spark session, a plan cache, a plotter
+    and a metrics hook.
     """
 
-    def __init__(self):
+    def __init__(self, planCache=None, plotter=None, metrics=None, planner="regraph", spark=None, sparkConf=None):
         """
         Initializes the SDAIntegration class by creating instances of SDAHierarchicalGraph
         and SDATransformation.
+
+        Args:
+            planCache (SDAPlanCache or str, optional): Cache for computed transformation plans, or the
+                directory of one. If set, doTransformation() reuses the operations of previous runs with
+                the same source schema and annotations. Defaults to None.
+            plotter (SDAPlotter or str, optional): Plotter for the hierarchy after each phase, or the directory
+                to render the plots into in the background. Defaults to None (no plots).
+            metrics (SDAMetrics, optional): Hook receiving the timing of the phases, rules and transform operations,
+                e.g. an SDAMetricsRecorder. Defaults to None (metrics are discarded).
+            planner (str, optional): "regraph" to plan with regraph's graph rewriting, or "native" to plan on the
+                lightweight SDANativeHierarchy, which yields the same operations much faster for wide schemas.
+                Defaults to "regraph".
+            spark (SparkSession, optional): Spark session to use, e.g. one tuned session shared by all integrations
+                of the process. Defaults to None (created on first use).
+            sparkConf (dict, optional): Configuration of the created Spark session, e.g. the driver port or
+                {"spark.scheduler.mode": "FAIR"} for concurrent jobs. Defaults to None.
         """
-        self.hirarchicalGraph = SDAHierarchicalGraph()
-        self.transformation = SDATransformation()
+        self.metrics = metrics if metrics is not None else SDAMetrics()
+        self.hirarchicalGraph = SDAHierarchicalGraph(planner=planner, spark=spark, sparkConf=sparkConf)
+        if planner == "native":
+            self.transformation = SDANativeTransformation(metrics=self.metrics)
+        else:
+            self.transformation = SDATransformation(metrics=self.metrics)
+        if isinstance(planCache, str):
+            planCache = SDAPlanCache(planCache)
+        self.planCache = planCache
+        if isinstance(plotter, str):
+            plotter = SDAPlotter(plotter)
+        self.plotter = plotter
+        self.planned = False
 
-    def loadSource(self, jsonSourcePath, sourceAnnotationJsonPath):
+    def loadSource(self, jsonSourcePath, sourceAnnotationJsonPath, engine="spark", schema=None, samplingRatio=None,
+                   schemaFromAnnotation=False, annotationTypes=None, pruneToAnnotation=True):
         """
         Loads the source JSON data and its annotations, constructs a hierarchical graph,
-        and visualizes the different parts of the hierarchy.
+        and visualizes the different parts of the hierarchy if a plotter is configured.
 
         Args:
             jsonSourcePath (str): Path to the JSON file containing the source data.
             sourceAnnotationJsonPath (str): Path to the JSON file containing source annotations.
+            engine (str, optional): "spark" to read the source with Spark, or "local" to parse it in-process
+                for small payloads without starting a Spark session. Defaults to "spark".
+            schema (StructType or str, optional): Explicit source schema, skips the schema inference of Spark. Defaults to None.
+            samplingRatio (float, optional): Fraction of the records Spark uses for the schema inference. Defaults to None.
+            schemaFromAnnotation (bool, optional): Derive the source schema from the source annotations instead of
+                inferring it. Defaults to False.
+            annotationTypes (dict, optional): Spark DataTypes of annotated fields for `schemaFromAnnotation`,
+                keyed by annotation name. Fields without a type are read as strings. Defaults to None.
+            pruneToAnnotation (bool, optional): Read only the annotated fields of the source with Spark. Unannotated
+                fields are not deserialized, as they are removed by the transformation anyway. With the local engine,
+                the schema graph only covers the annotated fields. Defaults to True.
         """
         # Construct Hierarchical Graph
-        self.hirarchicalGraph.readSourceJSON(jsonSourcePath)
         self.hirarchicalGraph.loadSourceAnnotationsJSON(sourceAnnotationJsonPath)
-        self.hirarchicalGraph.createHirarchy()
+        self.read_source(jsonSourcePath, engine, schema, samplingRatio, schemaFromAnnotation, annotationTypes, pruneToAnnotation)
+        with self.metrics.phase("createHirarchy"):
+            self.hirarchicalGraph.createHirarchy()
+        self.planned = False
 
         # Visualize the constructed hierarchy
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("G"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("S"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("M"))
+        self.plot_hierarchy("loadSource")
+
+    def read_source(self, jsonSourcePath, engine="spark", schema=None, samplingRatio=None, schemaFromAnnotation=False,
+                    annotationTypes=None, pruneToAnnotation=True):
+        """
+        Reads the source JSON data and its schema graph. The arguments are described in loadSource().
+        """
+        if engine not in ("local", "spark"):
+            raise ValueError("Unknown engine '{}'".format(engine))
+        annotation = self.hirarchicalGraph.sourceSemantic if pruneToAnnotation else None
+        with self.metrics.phase("readSource"):
+            if engine == "local":
+                self.hirarchicalGraph.readSourceRecordsJSON(jsonSourcePath, annotation=annotation)
+            else:
+                if schemaFromAnnotation:
+                    schema = self.hirarchicalGraph.get_annotation_schema(dataTypes=annotationTypes)
+                self.hirarchicalGraph.readSourceJSON(jsonSourcePath, schema=schema, samplingRatio=samplingRatio, annotation=annotation)
+
+    def updateSource(self, jsonSourcePath, engine="spark", schema=None, samplingRatio=None, schemaFromAnnotation=False,
+                     annotationTypes=None, pruneToAnnotation=True):
+        """
+        Reads a new version of the source JSON data with the loaded source annotations, e.g. after fields were
+        added to or removed from the source schema, and updates the transformation plan with updatePlan().
+        The arguments are described in loadSource().
+        """
+        previous = self.hirarchicalGraph.G
+        self.read_source(jsonSourcePath, engine, schema, samplingRatio, schemaFromAnnotation, annotationTypes, pruneToAnnotation)
+        self.updatePlan(previous)
+
+    def updatePlan(self, previousG):
+        """
+        Updates the transformation plan after the source schema changed from `previousG` to the loaded schema.
+        Only annotated fields are relevant for the plan, so a plan without annotated changes is kept as it is.
+        Added and removed annotated fields are applied to the planned hierarchy as delta: removed fields are
+        dropped together with the target structs containing them, added fields are selected and the
+        restoration steps without match are retried. If a node changed its kind, e.g. a field became a struct,
+        or the plan was loaded from the plan cache, the transformation is planned again from scratch.
+
+        Args:
+            previousG (NXGraph): Schema graph of the source the current plan was computed for.
+        """
+        with self.metrics.phase("updatePlan"):
+            graph = self.hirarchicalGraph
+            if not self.planned:
+                graph.createHirarchy()
+                return
+
+            annotations = graph.get_annotated_paths()
+            added, removed = graph.diff_schema_graph(previousG)
+            added = [node for node in added if node in annotations]
+            removed = [node for node in removed if node in annotations]
+
+            if (added or removed) and (set(added) & set(removed) or self.transformation.restorationSteps is None):
+                graph.createHirarchy()
+                self.transformation = type(self.transformation)(metrics=self.metrics)
+                self.planned = False
+            elif added or removed:
+                self.transformation.remove_source_fields(graph.hirarchie, [
+                    node for node in removed if graph.get_node_kind(previousG, node) == "field"])
+                self.transformation.add_source_fields(graph.hirarchie, [
+                    (node, annotations[node]) for node in added if graph.get_node_kind(graph.G, node) == "field"],
+                    list(graph.G.nodes()))
+
+        if not self.planned:
+            self.doTransformation()
+            return
+        plan_key = self.get_plan_key()
+        if plan_key is not None:
+            self.planCache.store(plan_key, self.transformation.normalFormOperations, self.transformation.transformOperations)
+        self.plot_hierarchy("updatePlan")
 
     def doTransformation(self):
         """
         Executes a series of transformations on the hierarchical graph, including
         removing irrelevant nodes, flattening the hierarchy, constructing target hierarchies,
-        and adding flattening operations. Visualizes the hierarchy at each step.
+        and adding flattening operations. Visualizes the hierarchy at each step if a plotter is configured.
+        If a plan cache is configured and holds a plan for the loaded schema and annotations,
+        the graph rewriting is skipped and the cached operations are used.
         """
+        plan_key = self.get_plan_key()
+        if plan_key is not None:
+            plan = self.planCache.load(plan_key)
+            if plan is not None:
+                self.transformation.normalFormOperations, self.transformation.transformOperations = plan
+                self.transformation.restorationSteps = None
+                self.planned = True
+                return
+
         # Remove Irrelevant Nodes
-        self.transformation.removeIrrelevantNodes(self.hirarchicalGraph.hirarchie)
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("G"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("S"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("M"))
+        with self.metrics.phase("removeIrrelevantNodes"):
+            self.transformation.removeIrrelevantNodes(self.hirarchicalGraph.hirarchie)
+        self.plot_hierarchy("removeIrrelevantNodes")
 
         # Flatten the Hierarchy
-        self.hirarchicalGraph.add_hom_S_M()
-        self.transformation.removeHirarchies(self.hirarchicalGraph.hirarchie)
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("G"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("S"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("M"))
+        with self.metrics.phase("removeHirarchies"):
+            self.hirarchicalGraph.add_hom_S_M()
+            self.transformation.removeHirarchies(self.hirarchicalGraph.hirarchie)
+        self.plot_hierarchy("removeHirarchies")
 
         # Construct Target Hierarchy
-        self.transformation.constructTargetHirarchies(self.hirarchicalGraph.hirarchie, self.hirarchicalGraph.targetSemantic)
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("G"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("S"))
-        plot_graph(self.hirarchicalGraph.hirarchie.get_graph("M"))
+        with self.metrics.phase("constructTargetHirarchies"):
+            self.transformation.constructTargetHirarchies(self.hirarchicalGraph.hirarchie, self.hirarchicalGraph.targetSemantic)
+        self.plot_hierarchy("constructTargetHirarchies")
 
         # Export FIELD IDs for SELECT
-        self.transformation.add_flattening_operations(self.hirarchicalGraph.hirarchie)
+        with self.metrics.phase("add_flattening_operations"):
+            self.transformation.add_flattening_operations(self.hirarchicalGraph.hirarchie)
+
+        if plan_key is not None:
+            self.planCache.store(plan_key, self.transformation.normalFormOperations, self.transformation.transformOperations)
+        self.planned = True
+
+    def get_plan_key(self):
+        """
+        Returns the key of the loaded schema and annotations in the plan cache.
+
+        Returns:
+            str: The key, or None if no plan cache is configured.
+        """
+        if self.planCache is None:
+            return None
+        return self.planCache.get_key(
+            self.hirarchicalGraph.get_schema_json(),
+            self.hirarchicalGraph.sourceSemantic,
+            self.hirarchicalGraph.targetSemantic
+        )
+
+    def plot_hierarchy(self, phase):
+        """
+        Plots the graphs of the hierarchy if a plotter is configured.
+
+        Args:
+            phase (str): Name of the current phase.
+        """
+        if self.plotter is not None:
+            self.plotter.plot_hierarchy(self.hirarchicalGraph.hirarchie, phase)
 
     def loadTargetAnnotation(self, targetAnnotationJsonPath):
         """
@@ -83,64 +241,240 @@ class SDAIntegration:
         Returns:
             pandas.DataFrame: Transformed and flattened data.
         """
-        columns_to_select = []
+        if self.hirarchicalGraph.source_df is None and self.hirarchicalGraph.source_records is not None:
+            import pandas as pd
+            return pd.DataFrame.from_records(self.transformRecords())
 
-        # Gather columns to select for flattening operations
-        for operation in self.transformation.normalFormOperations:
-            columns_to_select.append(operation.field.replace("root.", ""))
+        executor = SDAPandasExecutor(self.transformation.normalFormOperations, self.transformation.transformOperations, self.metrics)
 
         # Convert source DataFrame to pandas DataFrame
-        flatten_df = self.hirarchicalGraph.source_df.select(*columns_to_select)
+        start = time.perf_counter()
+        flatten_df = self.hirarchicalGraph.source_df.select(*executor.get_select_columns())
         flatten_df = flatten_df.toPandas()
-
-        # Helper functions for creating nested structures
-        def create_nested_dict(row, columns_to_nest):
-            """
-            Creates a nested dictionary from specified columns in a row.
-
-            Args:
-                row (pandas.Series): The row of the DataFrame.
-                columns_to_nest (list): List of column names to nest.
-
-            Returns:
-                dict: Nested dictionary.
-            """
-            nested_dict = {}
-            for col in columns_to_nest:
-                nested_dict[col] = row[col]
-            return nested_dict
-
-        def create_nested_list(row, columns_to_nest):
-            """
-            Creates a nested list from specified columns in a row.
-
-            Args:
-                row (pandas.Series): The row of the DataFrame.
-                columns_to_nest (list): List of column names to nest.
-
-            Returns:
-                list: Nested list of dictionaries.
-            """
-            nested_df = {}
-            for col in columns_to_nest:
-                nested_df[col] = row[col]
-            return pd.DataFrame(nested_df).to_dict(orient="records")
+        self.report_collect(flatten_df, start)
 
         # Apply transformations based on operations
-        for operation in self.transformation.transformOperations:
-            if operation.action == "renameNode":
-                flatten_df = flatten_df.rename(columns={operation.field.split(".")[-1]: operation.rename})
-            elif operation.action == "addHirarchy":
-                flatten_df[operation.field] = flatten_df.apply(create_nested_dict, axis=1, columns_to_nest=operation.connect)
-                flatten_df = flatten_df.drop(columns=operation.connect)
-            elif operation.action == "nestList":
-                flatten_df[operation.field] = flatten_df.apply(create_nested_list, axis=1, columns_to_nest=operation.get_flatten_connect())
-                flatten_df = flatten_df.drop(columns=operation.get_flatten_connect())
+        return executor.execute(flatten_df)
+
+    def transformRecords(self, records=None):
+        """
+        Applies the transformations in-process to plain dictionaries, without Spark or pandas.
+        Once planned, the integration can transform further documents of the same schema with low latency.
+
+        Args:
+            records (list, optional): Parsed JSON objects to transform. Defaults to the loaded source records.
+
+        Returns:
+            list: List of dictionaries in the target structure.
+        """
+        if records is None:
+            records = self.hirarchicalGraph.source_records
+        executor = SDARecordExecutor(self.transformation.normalFormOperations, self.transformation.transformOperations, self.metrics)
+        with self.metrics.phase("transformRecords"):
+            return executor.execute(records)
+
+    def transformBatches(self, batchSize=10000):
+        """
+        Applies the transformations to the source data in bounded batches. The selected columns are pulled
+        from Spark partition by partition, so only one batch of records is held on the driver at a time.
+
+        Args:
+            batchSize (int, optional): Maximal number of records per batch. Defaults to 10000.
+
+        Yields:
+            pandas.DataFrame: Transformed batch of data.
+        """
+        executor = SDAPandasExecutor(self.transformation.normalFormOperations, self.transformation.transformOperations, self.metrics)
+        for batch_df in self.collect_batches(executor.get_select_columns(), batchSize):
+            yield executor.execute(batch_df)
+
+    def collect_batches(self, columns, batchSize=10000):
+        """
+        Pulls the selected columns of the source data from Spark partition by partition in bounded batches.
+
+        Args:
+            columns (list): Column paths to select.
+            batchSize (int, optional): Maximal number of records per batch. Defaults to 10000.
+
+        Yields:
+            pandas.DataFrame: Batch of the selected columns.
+        """
+        import pandas as pd
+
+        selected_df = self.hirarchicalGraph.source_df.select(*columns)
+        columns = selected_df.columns
+
+        batch = []
+        start = time.perf_counter()
+        for row in selected_df.toLocalIterator():
+            batch.append(tuple(row))
+            if len(batch) >= batchSize:
+                batch_df = pd.DataFrame.from_records(batch, columns=columns)
+                self.report_collect(batch_df, start)
+                yield batch_df
+                batch = []
+                start = time.perf_counter()
+        if batch:
+            batch_df = pd.DataFrame.from_records(batch, columns=columns)
+            self.report_collect(batch_df, start)
+            yield batch_df
 
-        return flatten_df
+    def report_collect(self, flatten_df, start):
+        """
+        Reports collected source data to the metrics hook. The memory usage is only computed if the metrics are enabled.
+
+        Args:
+            flatten_df (pandas.DataFrame): The collected data.
+            start (float): time.perf_counter() value at the start of the collection.
+        """
+        seconds = time.perf_counter() - start
+        size = int(flatten_df.memory_usage(deep=True).sum()) if self.metrics.enabled else None
+        self.metrics.on_collect(len(flatten_df), size, seconds)
+
+    def transformStream(self, batchSize=10000):
+        """
+        Applies the transformations to the source data and yields the transformed records one by one.
+
+        Args:
+            batchSize (int, optional): Maximal number of records held in memory. Defaults to 10000.
+
+        Yields:
+            dict: Transformed record.
+        """
+        for batch_df in self.transformBatches(batchSize):
+            for record in batch_df.to_dict(orient="records"):
+                yield record
+
+    def transformToSink(self, sink, batchSize=10000):
+        """
+        Applies the transformations to the source data and writes the result incrementally.
+
+        Args:
+            sink (str, file-like or callable): Path of a NDJSON file to write, a writable text file object,
+                or a callback that is called with every transformed record.
+            batchSize (int, optional): Maximal number of records held in memory. Defaults to 10000.
 
-    def getPandasCode(self):
+        Returns:
+            int: Number of written records.
         """
-        Placeholder function for generating pandas code, if required.
+        if callable(sink):
+            count = 0
+            for record in self.transformStream(batchSize):
+                sink(record)
+                count += 1
+            return count
+
+        if isinstance(sink, str):
+            with open(sink, "w") as sink_file:
+                return self.transformToSink(sink_file, batchSize)
+
+        count = 0
+        for batch_df in self.transformBatches(batchSize):
+            lines = batch_df.to_json(orient="records", lines=True).rstrip("\n")
+            if lines:
+                sink.write(lines + "\n")
+            count += len(batch_df)
+        return count
+
+    def transformArrow(self):
+        """
+        Applies the transformations and returns the result as Arrow table. The nested structures are built as
+        Arrow struct and list arrays instead of Python dicts and lists, so the data stays columnar. Requires pyarrow.
+
+        Returns:
+            pyarrow.Table: Transformed data in the target structure.
+        """
+        executor = SDAArrowExecutor(self.transformation.normalFormOperations, self.transformation.transformOperations, self.metrics)
+        if self.hirarchicalGraph.source_df is None and self.hirarchicalGraph.source_records is not None:
+            return executor.execute(self.hirarchicalGraph.source_records)
+
+        start = time.perf_counter()
+        flatten_df = self.hirarchicalGraph.source_df.select(*executor.get_select_columns()).toPandas()
+        self.report_collect(flatten_df, start)
+        return executor.execute_table(flatten_df)
+
+    def transformToArrowFile(self, path, format="parquet", batchSize=10000):
+        """
+        Applies the transformations and writes the result to a Parquet or Arrow IPC file with nested types.
+        Spark sources are written batch by batch, so only one batch of records is held on the driver at a time.
+        Requires pyarrow.
+
+        Args:
+            path (str): Path of the file to write.
+            format (str, optional): "parquet" or "ipc". Defaults to "parquet".
+            batchSize (int, optional): Maximal number of records per batch. Defaults to 10000.
+
+        Returns:
+            int: Number of written records.
+        """
+        import pyarrow as pa
+
+        if format == "parquet":
+            import pyarrow.parquet as pq
+            open_writer = pq.ParquetWriter
+        elif format == "ipc":
+            open_writer = pa.ipc.new_file
+        else:
+            raise ValueError("Unknown format '{}'".format(format))
+
+        executor = SDAArrowExecutor(self.transformation.normalFormOperations, self.transformation.transformOperations, self.metrics)
+        if self.hirarchicalGraph.source_df is None and self.hirarchicalGraph.source_records is not None:
+            tables = [executor.execute(self.hirarchicalGraph.source_records)]
+        else:
+            tables = (executor.execute_table(batch_df) for batch_df in self.collect_batches(executor.get_select_columns(), batchSize))
+
+        writer = None
+        schema = None
+        count = 0
+        try:
+            for table in tables:
+                if writer is None:
+                    schema = table.schema
+                    writer = open_writer(path, schema)
+                elif table.schema != schema:
+                    # Values missing in a batch are inferred as null type
+                    table = table.cast(schema)
+                writer.write_table(table)
+                count += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+    def transformSpark(self):
+        """
+        Applies the transformation operations as native Spark column expressions. Unlike transform(),
+        the data is not collected to the driver, the result stays distributed on the cluster.
+
+        Returns:
+            pyspark.sql.DataFrame: Transformed data frame in the target structure.
+        """
+        executor = SDASparkExecutor(self.transformation.normalFormOperations, self.transformation.transformOperations)
+        return executor.execute(self.hirarchicalGraph.source_df)
+
+    def getPandasCode(self, functionName="transform"):
+        """
+        Generates the source code of a standalone function applying the planned transformation to a list of
+        parsed JSON objects and returning a pandas DataFrame. The function only depends on pandas, so it can be
+        imported by production jobs without planning the transformation again.
+
+        Args:
+            functionName (str, optional): Name of the generated function. Defaults to "transform".
+
+        Returns:
+            str: Python source code.
+        """
+        return SDACodeGenerator(self.transformation.normalFormOperations, self.transformation.transformOperations).get_pandas_code(functionName)
+
+    def getSparkCode(self, functionName="transform"):
+        """
+        Generates the source code of a standalone function applying the planned transformation to a Spark
+        DataFrame of the source with a single select, like transformSpark(). The function only depends on pyspark.
+
+        Args:
+            functionName (str, optional): Name of the generated function. Defaults to "transform".
+
+        Returns:
+            str: Python source code.
         """
-        pass
+        return SDACodeGenerator(self.transformation.normalFormOperations, self.transformation.transformOperations).get_spark_code(functionName)
@@ -0,0 +1,187 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# tracemalloc is global to the process, so only one phase at a time measures its allocations
+_trace_lock = threading.Lock()
+
+
+class SDAMetrics:
+    """
+    Hook receiving the metrics of an integration. The methods of this base class discard all metrics,
+    so an integration without a metrics backend only pays for a few timer calls. Subclass it and override
+    the on_* methods to export the metrics, or use SDAMetricsRecorder to keep them in memory.
+
+    Attributes:
+        enabled (bool): Whether the metrics are consumed. Metrics that are expensive to compute, like the
+            size of collected data, are only computed if enabled.
+        traceAllocations (bool): Whether the peak allocation of every phase is measured with tracemalloc.
+    """
+
+    enabled = False
+
+    def __init__(self, traceAllocations=False):
+        """
+        Initializes the SDAMetrics hook.
+
+        Args:
+            traceAllocations (bool, optional): Measure the peak allocation of every phase with tracemalloc.
+                Tracing slows down the planning considerably. Defaults to False.
+        """
+        self.traceAllocations = traceAllocations
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measures the wall time and, if enabled, the peak allocation of a phase and reports them to on_phase().
+        Allocations are only measured if tracemalloc is not already tracing, e.g. by an enclosing phase or by a
+        phase of a concurrent integration. The peak includes the allocations of concurrent threads.
+
+        Args:
+            name (str): Name of the phase.
+        """
+        traced = self.enabled and self.traceAllocations and _trace_lock.acquire(blocking=False)
+        if traced and tracemalloc.is_tracing():
+            _trace_lock.release()
+            traced = False
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                _trace_lock.release()
+            self.on_phase(name, seconds, peak)
+
+    def on_phase(self, name, seconds, peakBytes=None):
+        """
+        Called after a phase of the integration.
+
+        Args:
+            name (str): Name of the phase.
+            seconds (float): Wall time of the phase.
+            peakBytes (int, optional): Peak allocation of the phase, None if not traced.
+        """
+        pass
+
+    def on_rule(self, name, graph, matchSeconds, matches, rewrites, errors):
+        """
+        Called after a rule was matched and applied.
+
+        Args:
+            name (str): Name of the rule.
+            graph (str): Id of the graph the rule was matched in.
+            matchSeconds (float): Wall time of find_matching.
+            matches (int): Number of found instances.
+            rewrites (int): Number of accepted and rewritten instances.
+            errors (list): Messages of the failed rewrites.
+        """
+        pass
+
+    def on_operation(self, action, field, seconds, rows):
+        """
+        Called after a transform operation was executed on the data.
+
+        Args:
+            action (str): Action of the SDATransformOperation.
+            field (str): Field of the SDATransformOperation.
+            seconds (float): Wall time of the operation.
+            rows (int): Number of processed rows.
+        """
+        pass
+
+    def on_collect(self, rows, bytes, seconds):
+        """
+        Called after the selected source columns were collected to the driver.
+
+        Args:
+            rows (int): Number of collected rows.
+            bytes (int): Memory usage of the collected data, None if the metrics are not enabled.
+            seconds (float): Wall time of the collection.
+        """
+        pass
+
+
+class SDAMetricsRecorder(SDAMetrics):
+    """
+    Metrics hook that keeps all metrics in memory, e.g. to find the hot spots of an integration.
+
+    Attributes:
+        phases (list): One dict per phase.
+        rules (list): One dict per applied rule.
+        operations (list): One dict per executed transform operation.
+        collects (list): One dict per collection of source data.
+    """
+
+    enabled = True
+
+    def __init__(self, traceAllocations=False):
+        """
+        Initializes the SDAMetricsRecorder with empty metrics.
+
+        Args:
+            traceAllocations (bool, optional): Measure the peak allocation of every phase with tracemalloc. Defaults to False.
+        """
+        super().__init__(traceAllocations)
+        self.phases = []
+        self.rules = []
+        self.operations = []
+        self.collects = []
+
+    def on_phase(self, name, seconds, peakBytes=None):
+        self.phases.append({"name": name, "seconds": seconds, "peakBytes": peakBytes})
+
+    def on_rule(self, name, graph, matchSeconds, matches, rewrites, errors):
+        self.rules.append({
+            "name": name,
+            "graph": graph,
+            "matchSeconds": matchSeconds,
+            "matches": matches,
+            "rewrites": rewrites,
+            "failures": len(errors),
+            "errors": list(errors),
+        })
+
+    def on_operation(self, action, field, seconds, rows):
+        self.operations.append({"action": action, "field": field, "seconds": seconds, "rows": rows})
+
+    def on_collect(self, rows, bytes, seconds):
+        self.collects.append({"rows": rows, "bytes": bytes, "seconds": seconds})
+
+    def to_dict(self):
+        """
+        Returns all recorded metrics.
+
+        Returns:
+            dict: The recorded phases, rules, operations and collections.
+        """
+        return {"phases": self.phases, "rules": self.rules, "operations": self.operations, "collects": self.collects}
+
+    def __str__(self):
+        """
+        Returns a report of the recorded metrics, with the slowest rules and operations first.
+        """
+        lines = []
+        for phase in self.phases:
+            line = "phase %-30s %10.1f ms" % (phase["name"], phase["seconds"] * 1000)
+            if phase["peakBytes"] is not None:
+                line += " %10.1f KiB" % (phase["peakBytes"] / 1024)
+            lines.append(line)
+        for rule in sorted(self.rules, key=lambda rule: -rule["matchSeconds"]):
+            lines.append("rule  %-30s %10.1f ms  %d matches, %d rewrites, %d failures" % (
+                rule["name"], rule["matchSeconds"] * 1000, rule["matches"], rule["rewrites"], rule["failures"]))
+        for operation in sorted(self.operations, key=lambda operation: -operation["seconds"]):
+            lines.append("op    %-30s %10.1f ms  %d rows" % (
+                operation["action"] + " " + str(operation["field"]), operation["seconds"] * 1000, operation["rows"]))
+        for collect in self.collects:
+            line = "collect %-28s %10.1f ms  %d rows" % ("", collect["seconds"] * 1000, collect["rows"])
+            if collect["bytes"] is not None:
+                line += ", %.1f KiB" % (collect["bytes"] / 1024)
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,270 @@
+import json
+import os
+import time
+from .sdaintegration import SDAIntegration
+from .sdapandasexecutor import SDAPandasExecutor
+from .sdarecordexecutor import SDARecordExecutor
+from .sdaarrowexecutor import SDAArrowExecutor
+
+
+class SDAMultiTargetIntegration(SDAIntegration):
+    """
+    Integrates one source into several target structures, e.g. a dashboard, an archive and a partner export view.
+    Every target annotation is planned on its own hierarchy, but the execution shares one scan of the source:
+    the union of the fields selected by all plans is read and collected once, and every target is built from
+    the shared selection.
+
+    Attributes:
+        targets (dict): Target annotations by target name, in the order they were added.
+        plans (dict): Plans by target name, as (normalFormOperations, transformOperations) tuples.
+        rewritten (bool): Whether the hierarchy was rewritten by a planning since it was created.
+    """
+
+    def __init__(self, planCache=None, plotter=None, metrics=None, planner="regraph", spark=None, sparkConf=None):
+        """
+        Initializes the SDAMultiTargetIntegration without targets. The arguments are described in SDAIntegration.
+        """
+        super().__init__(planCache=planCache, plotter=plotter, metrics=metrics, planner=planner, spark=spark, sparkConf=sparkConf)
+        self.targets = {}
+        self.plans = {}
+        self.rewritten = False
+
+    def addTargetAnnotation(self, name, annotation):
+        """
+        Adds the annotations of a target.
+
+        Args:
+            name (str): Name of the target.
+            annotation (dict): Target annotations.
+        """
+        self.targets[name] = annotation
+
+    def loadTargetAnnotation(self, targetAnnotationJsonPath, name=None):
+        """
+        Loads the annotations of a target from a JSON file.
+
+        Args:
+            targetAnnotationJsonPath (str): Path to the JSON file containing target annotations.
+            name (str, optional): Name of the target. Defaults to the file name without extension.
+        """
+        if name is None:
+            name = os.path.splitext(os.path.basename(targetAnnotationJsonPath))[0]
+        with open(targetAnnotationJsonPath) as annotation_file:
+            self.addTargetAnnotation(name, json.load(annotation_file))
+
+    def doTransformation(self):
+        """
+        Plans the transformation of every target. The hierarchy is rewritten by the planning, so it is
+        created again from the source schema for every target once it was rewritten, also by a previous call.
+        """
+        self.plans = {}
+        for name, annotation in self.targets.items():
+            self.hirarchicalGraph.addTargetAnnotations(annotation)
+            if self.rewritten:
+                with self.metrics.phase("createHirarchy"):
+                    self.hirarchicalGraph.createHirarchy()
+                self.rewritten = False
+            self.transformation = type(self.transformation)(metrics=self.metrics)
+            self.planned = False
+            self.rewritten = True
+            super().doTransformation()
+            self.plans[name] = (self.transformation.normalFormOperations, self.transformation.transformOperations)
+
+    def updatePlan(self, previousG):
+        """
+        Plans all targets again for the loaded source schema, as the planned hierarchies of the targets are not kept.
+
+        Args:
+            previousG (NXGraph): Schema graph of the source the current plans were computed for.
+        """
+        with self.metrics.phase("updatePlan"):
+            self.hirarchicalGraph.createHirarchy()
+        self.rewritten = False
+        if self.plans:
+            self.doTransformation()
+
+    def selectTarget(self, name):
+        """
+        Selects the plan of a target for the methods of SDAIntegration working on a single plan,
+        e.g. transformSpark(), transformToArrowFile() or getPandasCode().
+
+        Args:
+            name (str): Name of the target.
+        """
+        self.hirarchicalGraph.addTargetAnnotations(self.targets[name])
+        self.transformation.normalFormOperations, self.transformation.transformOperations = self.plans[name]
+
+    def get_select_columns(self):
+        """
+        Returns the union of the column paths selected by the plans of all targets.
+
+        Returns:
+            list: Column paths without the leading "root.", in the order of their first selection.
+        """
+        columns = {}
+        for normalFormOperations, transformOperations in self.plans.values():
+            for column in SDAPandasExecutor(normalFormOperations, transformOperations).get_select_columns():
+                columns[column] = None
+        return list(columns)
+
+    def execute_target(self, name, flatten_df):
+        """
+        Applies the plan of a target to the shared selection.
+
+        Args:
+            name (str): Name of the target.
+            flatten_df (pandas.DataFrame): Shared selection with one column per selected path, named by the path.
+
+        Returns:
+            pandas.DataFrame: Transformed data of the target.
+        """
+        executor = SDAPandasExecutor(*self.plans[name], metrics=self.metrics)
+        columns = executor.get_select_columns()
+        target_df = flatten_df[columns]
+        target_df.columns = [column.split(".")[-1] for column in columns]
+        return executor.execute(target_df)
+
+    def transform(self):
+        """
+        Applies the transformations of all targets to the source data. The selected fields of all targets are
+        collected from Spark once.
+
+        Returns:
+            dict: Transformed and flattened pandas DataFrame by target name.
+        """
+        import pandas as pd
+
+        if self.hirarchicalGraph.source_df is None and self.hirarchicalGraph.source_records is not None:
+            return {name: pd.DataFrame.from_records(records) for name, records in self.transformRecords().items()}
+
+        columns = self.get_select_columns()
+        start = time.perf_counter()
+        flatten_df = self.hirarchicalGraph.source_df.select(*columns).toPandas()
+        self.report_collect(flatten_df, start)
+        flatten_df.columns = columns
+        return {name: self.execute_target(name, flatten_df) for name in self.plans}
+
+    def transformRecords(self, records=None):
+        """
+        Applies the transformations of all targets in-process to plain dictionaries. The fields of a record are
+        resolved once for all targets.
+
+        Args:
+            records (list, optional): Parsed JSON objects to transform. Defaults to the loaded source records.
+
+        Returns:
+            dict: List of dictionaries in the target structure by target name.
+        """
+        if records is None:
+            records = self.hirarchicalGraph.source_records
+        columns = self.get_select_columns()
+        paths = [column.split(".") for column in columns]
+        selector = SDARecordExecutor([], [])
+        executors = {name: SDARecordExecutor(*plan) for name, plan in self.plans.items()}
+        targets = {name: [(column, column.split(".")[-1]) for column in executor.get_select_columns()]
+                   for name, executor in executors.items()}
+
+        results = {name: [] for name in self.plans}
+        with self.metrics.phase("transformRecords"):
+            for record in records:
+                selected = {column: selector.get_value(record, path) for column, path in zip(columns, paths)}
+                for name, executor in executors.items():
+                    row = {field: selected[column] for column, field in targets[name]}
+                    results[name].append(executor.transform_record(row))
+        return results
+
+    def transformBatches(self, batchSize=10000):
+        """
+        Applies the transformations of all targets to the source data in bounded batches. Every batch of the
+        selected fields is pulled from Spark once and transformed for all targets.
+
+        Args:
+            batchSize (int, optional): Maximal number of records per batch. Defaults to 10000.
+
+        Yields:
+            dict: Transformed batch of data as pandas DataFrame by target name.
+        """
+        columns = self.get_select_columns()
+        for batch_df in self.collect_batches(columns, batchSize):
+            batch_df.columns = columns
+            yield {name: self.execute_target(name, batch_df) for name in self.plans}
+
+    def transformStream(self, batchSize=10000):
+        """
+        Applies the transformations of all targets to the source data and yields the transformed records one by one.
+
+        Args:
+            batchSize (int, optional): Maximal number of records held in memory per target. Defaults to 10000.
+
+        Yields:
+            tuple: Target name and transformed record.
+        """
+        for batch in self.transformBatches(batchSize):
+            for name, batch_df in batch.items():
+                for record in batch_df.to_dict(orient="records"):
+                    yield name, record
+
+    def transformToSink(self, sinks, batchSize=10000):
+        """
+        Applies the transformations of all targets to the source data and writes the results incrementally.
+
+        Args:
+            sinks (dict): Sink by target name, a path of a NDJSON file to write, a writable text file object,
+                or a callback that is called with every transformed record. Targets without sink are skipped.
+            batchSize (int, optional): Maximal number of records held in memory per target. Defaults to 10000.
+
+        Returns:
+            dict: Number of written records by target name.
+        """
+        files = {name: open(sink, "w") for name, sink in sinks.items() if isinstance(sink, str)}
+        counts = {name: 0 for name in sinks}
+        try:
+            for batch in self.transformBatches(batchSize):
+                for name, sink in sinks.items():
+                    batch_df = batch[name]
+                    if callable(sink):
+                        for record in batch_df.to_dict(orient="records"):
+                            sink(record)
+                    else:
+                        lines = batch_df.to_json(orient="records", lines=True).rstrip("\n")
+                        if lines:
+                            files.get(name, sink).write(lines + "\n")
+                    counts[name] += len(batch_df)
+        finally:
+            for sink_file in files.values():
+                sink_file.close()
+        return counts
+
+    def transformArrow(self):
+        """
+        Applies the transformations of all targets and returns the results as Arrow tables. The selected fields
+        are converted to Arrow arrays once for all targets. Requires pyarrow.
+
+        Returns:
+            dict: Transformed data as pyarrow.Table by target name.
+        """
+        import pyarrow as pa
+
+        columns = self.get_select_columns()
+        if self.hirarchicalGraph.source_df is None and self.hirarchicalGraph.source_records is not None:
+            records = self.hirarchicalGraph.source_records
+            length = len(records)
+            selector = SDARecordExecutor([], [])
+            arrays = {column: pa.array([selector.get_value(record, column.split(".")) for record in records])
+                      for column in columns}
+        else:
+            start = time.perf_counter()
+            flatten_df = self.hirarchicalGraph.source_df.select(*columns).toPandas()
+            self.report_collect(flatten_df, start)
+            flatten_df.columns = columns
+            length = len(flatten_df)
+            arrays = {column: pa.Array.from_pandas(flatten_df[column]) for column in columns}
+
+        tables = {}
+        for name, plan in self.plans.items():
+            executor = SDAArrowExecutor(*plan, metrics=self.metrics)
+            target_columns = executor.get_select_columns()
+            table = pa.Table.from_arrays([arrays[column] for column in target_columns],
+                                         names=[column.split(".")[-1] for column in target_columns])
+            tables[name] = executor.execute_table(table, length)
+        return tables
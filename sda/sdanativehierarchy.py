@@ -0,0 +1,381 @@
+class SDANativeNode:
+    """
+    Node of an SDANativeGraph with its adjacency. The neighbours are kept in dicts, which are ordered sets.
+
+    Attributes:
+        id (str): Id of the node.
+        successors (dict): Ids of the successors, mapped to None.
+        predecessors (dict): Ids of the predecessors, mapped to None.
+    """
+
+    __slots__ = ("id", "successors", "predecessors")
+
+    def __init__(self, node_id):
+        """
+        Initializes the SDANativeNode without neighbours.
+
+        Args:
+            node_id (str): Id of the node.
+        """
+        self.id = node_id
+        self.successors = {}
+        self.predecessors = {}
+
+
+class SDANativeGraph:
+    """
+    Compact directed graph without attributes, offering the subset of the NXGraph API the planner needs.
+
+    Attributes:
+        node_map (dict): Mapping of node ids to SDANativeNode objects, in insertion order.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty SDANativeGraph.
+        """
+        self.node_map = {}
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Copies the nodes and edges of a graph, e.g. an NXGraph. Attributes are not copied.
+
+        Args:
+            graph: Graph offering nodes() and edges().
+
+        Returns:
+            SDANativeGraph: The copied graph.
+        """
+        native = cls()
+        for node in graph.nodes():
+            native.add_node(node)
+        for u, v in graph.edges():
+            native.add_edge(u, v)
+        return native
+
+    def nodes(self):
+        """
+        Returns the ids of all nodes in insertion order.
+        """
+        return list(self.node_map)
+
+    def edges(self):
+        """
+        Returns all edges as (source, target) tuples.
+        """
+        return [(node.id, successor) for node in self.node_map.values() for successor in node.successors]
+
+    def successors(self, node_id):
+        """
+        Returns the ids of the successors of a node.
+        """
+        return list(self.node_map[node_id].successors)
+
+    def predecessors(self, node_id):
+        """
+        Returns the ids of the predecessors of a node.
+        """
+        return list(self.node_map[node_id].predecessors)
+
+    def exists_edge(self, u, v):
+        """
+        Returns True if the edge from u to v exists.
+        """
+        return u in self.node_map and v in self.node_map[u].successors
+
+    def generate_new_node_id(self, basename):
+        """
+        Generates an unused node id the same way regraph does: the base name, or the base name with the
+        first free suffix "_1", "_2", ...
+
+        Args:
+            basename (str): Preferred id of the node.
+
+        Returns:
+            str: Unused node id.
+        """
+        node_id = basename
+        i = 1
+        while node_id in self.node_map:
+            node_id = "{}_{}".format(basename, i)
+            i += 1
+        return node_id
+
+    def add_node(self, node_id):
+        """
+        Adds a node if it does not exist yet.
+
+        Args:
+            node_id (str): Id of the node.
+
+        Returns:
+            str: Id of the node.
+        """
+        if node_id not in self.node_map:
+            self.node_map[node_id] = SDANativeNode(node_id)
+        return node_id
+
+    def remove_node(self, node_id):
+        """
+        Removes a node and its incident edges.
+
+        Args:
+            node_id (str): Id of the node.
+        """
+        node = self.node_map.pop(node_id)
+        for successor in node.successors:
+            if successor != node_id:
+                del self.node_map[successor].predecessors[node_id]
+        for predecessor in node.predecessors:
+            if predecessor != node_id:
+                del self.node_map[predecessor].successors[node_id]
+
+    def add_edge(self, u, v):
+        """
+        Adds the edge from u to v if it does not exist yet.
+        """
+        self.node_map[u].successors[v] = None
+        self.node_map[v].predecessors[u] = None
+
+    def remove_edge(self, u, v):
+        """
+        Removes the edge from u to v.
+        """
+        del self.node_map[u].successors[v]
+        del self.node_map[v].predecessors[u]
+
+    def to_nxgraph(self):
+        """
+        Converts the graph to an NXGraph, e.g. for plotting.
+
+        Returns:
+            NXGraph: Graph with the same nodes and edges.
+        """
+        from regraph import NXGraph
+
+        graph = NXGraph()
+        graph.add_nodes_from(self.nodes())
+        graph.add_edges_from(self.edges())
+        return graph
+
+
+class SDANativeHierarchy:
+    """
+    Lightweight replacement of regraph's NXHierarchy for the planner. It implements exactly the rewrites
+    of SDATransformation, adding and removing nodes and edges, and propagates them along the typings
+    like regraph: removed nodes are removed from the graphs typed by them, added nodes and edges are added
+    to the typing graphs. Besides the typings, reverse typings are kept, so the nodes of a type are found
+    without matching patterns.
+
+    Attributes:
+        graphs (dict): Mapping of graph ids to SDANativeGraph objects.
+        attrs (dict): Attributes of the graphs by graph id.
+        typings (dict): Mapping of (graph id, typing graph id) to a dict of node -> type.
+        typed_nodes (dict): Mapping of (graph id, typing graph id) to a dict of type -> dict of typed nodes.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty SDANativeHierarchy.
+        """
+        self.graphs = {}
+        self.attrs = {}
+        self.typings = {}
+        self.typed_nodes = {}
+
+    def add_graph(self, graph_id, graph, attrs=None):
+        """
+        Adds a graph to the hierarchy.
+
+        Args:
+            graph_id (str): Id of the graph.
+            graph: Graph offering nodes() and edges(), copied into an SDANativeGraph.
+            attrs (dict, optional): Attributes of the graph. Defaults to None.
+        """
+        self.graphs[graph_id] = SDANativeGraph.from_graph(graph)
+        self.attrs[graph_id] = attrs or {}
+
+    def add_typing(self, graph_id, typing_graph, mapping):
+        """
+        Adds a typing of a graph by another graph.
+
+        Args:
+            graph_id (str): Id of the typed graph.
+            typing_graph (str): Id of the typing graph.
+            mapping (dict): Mapping of the nodes of the typed graph to nodes of the typing graph.
+
+        Raises:
+            ValueError: If the mapping is not a homomorphism.
+        """
+        graph = self.graphs[graph_id]
+        target = self.graphs[typing_graph]
+        for node, node_type in mapping.items():
+            if node not in graph.node_map or node_type not in target.node_map:
+                raise ValueError("Invalid typing of '{}' by '{}' in the typing {} -> {}".format(node, node_type, graph_id, typing_graph))
+        for u, v in graph.edges():
+            if u in mapping and v in mapping and not target.exists_edge(mapping[u], mapping[v]):
+                raise ValueError("Edge ('{}', '{}') is not preserved by the typing {} -> {}".format(u, v, graph_id, typing_graph))
+
+        self.typings[(graph_id, typing_graph)] = {}
+        self.typed_nodes[(graph_id, typing_graph)] = {}
+        for node, node_type in mapping.items():
+            self.set_type(graph_id, typing_graph, node, node_type)
+
+    def get_graph(self, graph_id):
+        """
+        Returns a graph of the hierarchy.
+        """
+        return self.graphs[graph_id]
+
+    def get_typing(self, graph_id, typing_graph):
+        """
+        Returns the typing of a graph by another graph as dict of node -> type.
+        """
+        return self.typings[(graph_id, typing_graph)]
+
+    def successors(self, graph_id):
+        """
+        Returns the ids of the graphs typing a graph.
+        """
+        return [typing_graph for source, typing_graph in self.typings if source == graph_id]
+
+    def predecessors(self, graph_id):
+        """
+        Returns the ids of the graphs typed by a graph.
+        """
+        return [source for source, typing_graph in self.typings if typing_graph == graph_id]
+
+    def descendants(self, graph_id):
+        """
+        Returns the ids of all graphs reachable by typings, in breadth-first order.
+        """
+        order = []
+        queue = self.successors(graph_id)
+        while queue:
+            successor = queue.pop(0)
+            if successor not in order:
+                order.append(successor)
+                queue.extend(self.successors(successor))
+        return order
+
+    def node_type(self, graph_id, typing_graph, node):
+        """
+        Returns the type of a node, or None if the node is not typed.
+        """
+        return self.typings[(graph_id, typing_graph)].get(node)
+
+    def get_typed_nodes(self, graph_id, typing_graph, node_type):
+        """
+        Returns the nodes of a graph with the given type.
+
+        Args:
+            graph_id (str): Id of the typed graph.
+            typing_graph (str): Id of the typing graph.
+            node_type (str): Node of the typing graph.
+
+        Returns:
+            list: Ids of the typed nodes, in the order they were typed.
+        """
+        return list(self.typed_nodes[(graph_id, typing_graph)].get(node_type, ()))
+
+    def set_type(self, graph_id, typing_graph, node, node_type):
+        """
+        Types a node of a graph and updates the reverse typing.
+        """
+        key = (graph_id, typing_graph)
+        self.unset_type(graph_id, typing_graph, node)
+        self.typings[key][node] = node_type
+        self.typed_nodes[key].setdefault(node_type, {})[node] = None
+
+    def unset_type(self, graph_id, typing_graph, node):
+        """
+        Removes the typing of a node of a graph.
+        """
+        key = (graph_id, typing_graph)
+        node_type = self.typings[key].pop(node, None)
+        if node_type is not None:
+            nodes = self.typed_nodes[key][node_type]
+            del nodes[node]
+            if not nodes:
+                del self.typed_nodes[key][node_type]
+
+    def add_node(self, graph_id, basename, types=None):
+        """
+        Adds a node to a graph. In every descendant graph without a given type, a new node is added as well,
+        like regraph does for untyped nodes added by a rule.
+
+        Args:
+            graph_id (str): Id of the graph.
+            basename (str): Preferred id of the node, made unique with generate_new_node_id.
+            types (dict, optional): Type of the new node per descendant graph id. Defaults to None.
+
+        Returns:
+            str: Id of the added node.
+        """
+        types = types or {}
+        images = {}
+        for descendant in self.descendants(graph_id):
+            if descendant in types:
+                images[descendant] = types[descendant]
+            else:
+                graph = self.graphs[descendant]
+                images[descendant] = graph.add_node(graph.generate_new_node_id(basename))
+        graph = self.graphs[graph_id]
+        images[graph_id] = graph.add_node(graph.generate_new_node_id(basename))
+
+        for source, typing_graph in self.typings:
+            if source in images and typing_graph in images:
+                self.set_type(source, typing_graph, images[source], images[typing_graph])
+        return images[graph_id]
+
+    def remove_node(self, graph_id, node):
+        """
+        Removes a node from a graph, and all nodes typed by it from the graphs typed by the graph.
+
+        Args:
+            graph_id (str): Id of the graph.
+            node (str): Id of the node.
+        """
+        for predecessor in self.predecessors(graph_id):
+            for typed_node in self.get_typed_nodes(predecessor, graph_id, node):
+                self.remove_node(predecessor, typed_node)
+        for typing_graph in self.successors(graph_id):
+            self.unset_type(graph_id, typing_graph, node)
+        self.graphs[graph_id].remove_node(node)
+
+    def add_edge(self, graph_id, u, v):
+        """
+        Adds an edge to a graph and the edge between the types of its nodes to the typing graphs.
+
+        Args:
+            graph_id (str): Id of the graph.
+            u (str): Source node of the edge.
+            v (str): Target node of the edge.
+        """
+        graph = self.graphs[graph_id]
+        if graph.exists_edge(u, v):
+            return
+        graph.add_edge(u, v)
+        for typing_graph in self.successors(graph_id):
+            typing = self.typings[(graph_id, typing_graph)]
+            if u in typing and v in typing:
+                self.add_edge(typing_graph, typing[u], typing[v])
+
+    def remove_edge(self, graph_id, u, v):
+        """
+        Removes an edge from a graph, and the edges typed by it from the graphs typed by the graph.
+
+        Args:
+            graph_id (str): Id of the graph.
+            u (str): Source node of the edge.
+            v (str): Target node of the edge.
+        """
+        for predecessor in self.predecessors(graph_id):
+            graph = self.graphs[predecessor]
+            targets = self.get_typed_nodes(predecessor, graph_id, v)
+            for source in self.get_typed_nodes(predecessor, graph_id, u):
+                for target in targets:
+                    if graph.exists_edge(source, target):
+                        self.remove_edge(predecessor, source, target)
+        self.graphs[graph_id].remove_edge(u, v)
@@ -0,0 +1,228 @@
+import time
+from .sdatransformation import SDATransformation
+from .sdatransformoperation import SDATransformOperation
+
+
+class SDANativeTransformation(SDATransformation):
+    """
+    Plans the transformation on an SDANativeHierarchy. The phases apply the same rewrites as SDATransformation,
+    but instead of matching rule patterns with regraph, the matched nodes are looked up in the typings of the
+    hierarchy. The resulting operations are identical.
+    """
+
+    def removeIrrelevantNodes(self, hirarchy):
+        """
+        Removes the DELETE annotation and all schema nodes annotated with it.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy to transform.
+        """
+        start = time.perf_counter()
+        found = "DELETE" in hirarchy.get_graph("S").node_map
+        match_seconds = time.perf_counter() - start
+        if found:
+            hirarchy.remove_node("S", "DELETE")
+        self.metrics.on_rule("removeIrrelevantNodes", "S", match_seconds, int(found), int(found), [])
+
+    def removeHirarchies(self, hirarchy):
+        """
+        Removes the Structs and Lists and connects the root with all fields.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy to transform.
+        """
+        # Remove Structs and Lists
+        meta = hirarchy.get_graph("M")
+        for node in ("STRUCT", "ARRAY"):
+            if node in meta.node_map:
+                hirarchy.remove_node("M", node)
+        self.metrics.on_rule("removeStructsAndLists", "M", 0.0, 1, 1, [])
+
+        # Add Connection between Root and Fields
+        start = time.perf_counter()
+        roots = hirarchy.get_typed_nodes("G", "M", "ROOT")
+        fields = hirarchy.get_typed_nodes("G", "M", "FIELD")
+        match_seconds = time.perf_counter() - start
+        for root in roots:
+            for field in fields:
+                hirarchy.add_edge("G", root, field)
+        self.metrics.on_rule("connectRootFields", "G", match_seconds, len(roots) * len(fields), len(roots) * len(fields), [])
+
+    def constructTargetHirarchies(self, hirarchy, targetS):
+        """
+        Constructs the target hierarchies based on the provided target annotations.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy to transform.
+            targetS (dict): The target annotations to guide the transformation.
+        """
+        # Restore Nestable Schema
+        struct = hirarchy.add_node("M", "STRUCT")
+        hirarchy.add_edge("M", struct, struct)
+        hirarchy.add_edge("M", "ROOT", struct)
+        self.metrics.on_rule("restoreNestableSchema", "M", 0.0, 1, 1, [])
+
+        # Execute restoration steps
+        self.add_target_hirarchies(hirarchy, targetS)
+        return None
+
+    def add_hirarchies(self, batch, hirarchy, index=None):
+        """
+        Adds the hierarchies of a batch of restoration steps one after another, as the native hierarchy
+        propagates every rewrite in time proportional to the rewritten nodes.
+
+        Args:
+            batch (list): Restoration steps (struct name, mapping, type).
+            hirarchy (SDANativeHierarchy): The hierarchy to transform.
+            index: Unused, the native hierarchy keeps its own typing index.
+
+        Returns:
+            list: The instance of every step, None for the steps without match.
+        """
+        return [self.add_hirarchy(struct_name, mapping, type, hirarchy) for struct_name, mapping, type in batch]
+
+    def add_hirarchy(self, struct_name, mapping, type, hirarchy, index=None):
+        """
+        Adds a new struct below the common parent of the fields annotated as in the mapping, and moves the
+        fields into it. As every annotation types at most one schema node, there is at most one match.
+
+        Args:
+            struct_name (str): Name of the new struct.
+            mapping (dict): Mapping of the target field names to their annotations.
+            type (str): Type of the new hierarchy ("dict" or "list").
+            hirarchy (SDANativeHierarchy): The hierarchy to transform.
+            index: Unused, the native hierarchy keeps its own typing index.
+
+        Returns:
+            dict: Mapping of "root", the field names and the struct name to the schema nodes, or None if
+                the fields are not found.
+
+        Raises:
+            ValueError: If the struct is named like one of its fields or "root", which regraph rejects as rule.
+        """
+        if struct_name == "root" or struct_name in mapping:
+            raise ValueError("Node with the id '{}' already exists in the right hand side of the rule".format(struct_name))
+
+        graph = hirarchy.get_graph("G")
+        start = time.perf_counter()
+        instance = {}
+        for key, value in mapping.items():
+            # Lists nested in a struct are mapped to the list itself, which types no node
+            nodes = [] if isinstance(value, (list, dict)) else hirarchy.get_typed_nodes("G", "S", value)
+            if not nodes or nodes[0] in instance.values():
+                instance = None
+                break
+            instance[key] = nodes[0]
+
+        # The fields need a common parent, which is no field itself
+        parents = []
+        if instance is not None:
+            nodes = list(instance.values())
+            if nodes:
+                parents = [parent for parent in graph.predecessors(nodes[0]) if parent not in nodes and all(
+                    graph.exists_edge(parent, node) for node in nodes[1:])]
+            else:
+                parents = [node for node in graph.nodes() if hirarchy.node_type("G", "M", node) == "ROOT"]
+        match_seconds = time.perf_counter() - start
+        if not parents:
+            self.metrics.on_rule("addHirarchy " + struct_name, "G", match_seconds, 0, 0, [])
+            return None
+
+        instance["root"] = parents[0]
+        self.check_typing(hirarchy, instance, mapping)
+        for key in mapping:
+            hirarchy.remove_edge("G", instance["root"], instance[key])
+        instance[struct_name] = hirarchy.add_node("G", struct_name, {"M": "STRUCT"})
+        hirarchy.add_edge("G", instance["root"], instance[struct_name])
+        for key in mapping:
+            hirarchy.add_edge("G", instance[struct_name], instance[key])
+        self.metrics.on_rule("addHirarchy " + struct_name, "G", match_seconds, len(parents), 1, [])
+        return instance
+
+    def check_typing(self, hirarchy, instance, mapping):
+        """
+        Checks the matched nodes against the typing that SDATransformation.add_hirarchy passes to the rewrite,
+        which regraph rejects if it differs from the current typing: the parent has to be the root annotation,
+        and the fields named after their annotation have to be structs.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy to transform.
+            instance (dict): Mapping of "root" and the field names to the schema nodes.
+            mapping (dict): Mapping of the target field names to their annotations.
+
+        Raises:
+            ValueError: If the typing of a matched node differs.
+        """
+        expected = [(instance["root"], "S", "root")]
+        for key, value in mapping.items():
+            expected.append((instance[key], "M", "STRUCT" if key == value else "FIELD"))
+        for node, typing_graph, node_type in expected:
+            if hirarchy.node_type("G", typing_graph, node) != node_type:
+                raise ValueError("The node '{}' is typed by '{}' in '{}', while it is typed by '{}' in the rule".format(
+                    node, hirarchy.node_type("G", typing_graph, node), typing_graph, node_type))
+
+    def add_flattening_operations(self, final_hirarchie):
+        """
+        Adds a selectField operation for every field of the schema.
+
+        Args:
+            final_hirarchie (SDANativeHierarchy): The final hierarchy.
+        """
+        start = time.perf_counter()
+        fields = final_hirarchie.get_typed_nodes("G", "M", "FIELD")
+        match_seconds = time.perf_counter() - start
+        for field in fields:
+            self.normalFormOperations.append(SDATransformOperation(
+                action="selectField",
+                field=field,
+            ))
+        self.metrics.on_rule("selectFields", "G", match_seconds, len(fields), len(fields), [])
+
+    def get_typing_index(self, hirarchy):
+        """
+        Returns None, as the native hierarchy keeps its own typing index.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy.
+        """
+        return None
+
+    def add_field_node(self, hirarchy, index, node, annotation):
+        """
+        Adds a field below the root of G, typed by its annotation.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy.
+            index: Unused, the native hierarchy keeps its own typing index.
+            node (str): Id of the field.
+            annotation (str): Node of the annotation graph S typing the field.
+        """
+        root = hirarchy.get_typed_nodes("G", "M", "ROOT")[0]
+        node = hirarchy.add_node("G", node, {"S": annotation, "M": "FIELD"})
+        hirarchy.add_edge("G", root, node)
+
+    def remove_field_node(self, hirarchy, index, node):
+        """
+        Removes a field from G.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy.
+            index: Unused, the native hierarchy keeps its own typing index.
+            node (str): Id of the field.
+        """
+        hirarchy.remove_node("G", node)
+
+    def remove_struct_node(self, hirarchy, index, node):
+        """
+        Removes a struct added by a restoration step with the node typing it in S, and connects its fields
+        with the root.
+
+        Args:
+            hirarchy (SDANativeHierarchy): The hierarchy.
+            index: Unused, the native hierarchy keeps its own typing index.
+            node (str): Id of the struct.
+        """
+        root = hirarchy.get_typed_nodes("G", "M", "ROOT")[0]
+        for field in hirarchy.get_graph("G").successors(node):
+            hirarchy.add_edge("G", root, field)
+        hirarchy.remove_node("S", hirarchy.node_type("G", "S", node))
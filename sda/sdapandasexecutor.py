@@ -0,0 +1,120 @@
+import time
+from .sdametrics import SDAMetrics
+
+
+class SDAPandasExecutor:
+    """
+    Executes the operations of an SDATransformation on a pandas DataFrame holding the fields of the normal form.
+    The nested structures are built column by column, without creating a Series or DataFrame per row.
+
+    Attributes:
+        normalFormOperations (list): Operations selecting the fields of the normal form.
+        transformOperations (list): Operations transforming the normal form to the target.
+        metrics (SDAMetrics): Hook receiving the timing of every operation.
+    """
+
+    def __init__(self, normalFormOperations, transformOperations, metrics=None):
+        """
+        Initializes the SDAPandasExecutor with the operations of a finished transformation.
+
+        Args:
+            normalFormOperations (list): List of `selectField` SDATransformOperations.
+            transformOperations (list): List of `renameNode`, `addHirarchy` and `nestList` SDATransformOperations.
+            metrics (SDAMetrics, optional): Hook receiving the timing of every operation. Defaults to None (discarded).
+        """
+        self.normalFormOperations = normalFormOperations
+        self.transformOperations = transformOperations
+        self.metrics = metrics if metrics is not None else SDAMetrics()
+
+    def get_select_columns(self):
+        """
+        Returns the column paths of the normal form fields, as used to select them from the source.
+
+        Returns:
+            list: List of column paths without the leading "root.".
+        """
+        columns_to_select = []
+        for operation in self.normalFormOperations:
+            columns_to_select.append(operation.field.replace("root.", ""))
+        return columns_to_select
+
+    def execute(self, flatten_df):
+        """
+        Applies the transformation operations to a pandas DataFrame of the normal form fields.
+
+        Args:
+            flatten_df (pandas.DataFrame): Data frame with one column per normal form field.
+
+        Returns:
+            pandas.DataFrame: Transformed data in the target structure.
+        """
+        for operation in self.transformOperations:
+            start = time.perf_counter()
+            if operation.action == "renameNode":
+                flatten_df = flatten_df.rename(columns={operation.field.split(".")[-1]: operation.rename})
+            elif operation.action == "addHirarchy":
+                flatten_df[operation.field] = self.create_nested_dicts(flatten_df, operation.connect)
+                flatten_df = flatten_df.drop(columns=operation.connect)
+            elif operation.action == "nestList":
+                flatten_df[operation.field] = self.create_nested_lists(flatten_df, operation.get_flatten_connect())
+                flatten_df = flatten_df.drop(columns=operation.get_flatten_connect())
+            self.metrics.on_operation(operation.action, operation.field, time.perf_counter() - start, len(flatten_df))
+        return flatten_df
+
+    def create_nested_dicts(self, df, columns_to_nest):
+        """
+        Creates a nested dictionary per row from the specified columns.
+
+        Args:
+            df (pandas.DataFrame): The data frame.
+            columns_to_nest (list): List of column names to nest.
+
+        Returns:
+            list: One dictionary per row.
+        """
+        values = [df[col].tolist() for col in columns_to_nest]
+        return [dict(zip(columns_to_nest, row)) for row in zip(*values)]
+
+    def create_nested_lists(self, df, columns_to_nest):
+        """
+        Creates a nested list of records per row from the specified array columns.
+
+        Args:
+            df (pandas.DataFrame): The data frame.
+            columns_to_nest (list): List of column names to nest.
+
+        Returns:
+            list: One list of dictionaries per row.
+        """
+        values = [df[col].tolist() for col in columns_to_nest]
+        return [self.zip_records(columns_to_nest, row) for row in zip(*values)]
+
+    def zip_records(self, columns, row):
+        """
+        Combines the arrays of one row into a list of records. Scalar values are repeated for every record.
+
+        Args:
+            columns (list): Names of the nested columns.
+            row (tuple): The values of the nested columns in one row.
+
+        Returns:
+            list: List of dictionaries.
+
+        Raises:
+            ValueError: If the arrays of the row differ in length.
+        """
+        arrays = []
+        length = None
+        for value in row:
+            if hasattr(value, "tolist"):
+                # numpy arrays and scalars
+                value = value.tolist()
+            if isinstance(value, (list, tuple)):
+                if length is not None and len(value) != length:
+                    raise ValueError("All arrays must be of the same length")
+                length = len(value)
+            arrays.append(value)
+        if length is None:
+            return []
+        arrays = [value if isinstance(value, (list, tuple)) else [value] * length for value in arrays]
+        return [dict(zip(columns, record)) for record in zip(*arrays)]
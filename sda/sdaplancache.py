@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import tempfile
+from .__version__ import __version__
+from .sdatransformoperation import SDATransformOperation
+
+# Version of the computed operations, increased whenever the planning yields different operations for the
+# same inputs, so plans cached by an older version are not served after an upgrade
+PLAN_FORMAT_VERSION = 2
+
+
+class SDAPlanCache:
+    """
+    Persistent cache for the operations computed by SDATransformation.
+    A plan only depends on the source schema and the source and target annotations, so repeated
+    runs with the same inputs can skip the graph rewriting and go straight to the data transformation.
+
+    Attributes:
+        cacheDir (str): Directory holding one JSON file per cached plan.
+        maxBytes (int): Upper bound for the total size of the cache directory. The least recently
+            used plans are evicted when the bound is exceeded.
+    """
+
+    def __init__(self, cacheDir, maxBytes=10 * 1024 * 1024):
+        """
+        Initializes the SDAPlanCache and creates the cache directory if required.
+
+        Args:
+            cacheDir (str): Directory to store the plans in.
+            maxBytes (int, optional): Maximal total size of the stored plans. Defaults to 10 MiB.
+        """
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def get_key(self, schemaJson, sourceAnnotation, targetAnnotation):
+        """
+        Computes the fingerprint of a plan from its inputs and the versions of the plan format and the library.
+        The keys of the source annotations are sorted, as their order does not change the plan. The order of the
+        target annotations is kept, as it is the order of the fields in the target structure.
+
+        Args:
+            schemaJson (str): JSON representation of the source schema, e.g. `StructType.json()`.
+            sourceAnnotation (dict): Source annotations.
+            targetAnnotation (dict): Target annotations.
+
+        Returns:
+            str: Hex digest identifying the plan.
+        """
+        digest = hashlib.sha256()
+        parts = (
+            str(PLAN_FORMAT_VERSION),
+            __version__,
+            schemaJson,
+            json.dumps(sourceAnnotation, separators=(",", ":"), sort_keys=True),
+            json.dumps(targetAnnotation, separators=(",", ":")),
+        )
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        """
+        Returns the path of the file storing the plan with the given key.
+
+        Args:
+            key (str): Plan fingerprint.
+
+        Returns:
+            str: Path of the plan file.
+        """
+        return os.path.join(self.cacheDir, key + ".json")
+
+    def load(self, key):
+        """
+        Loads a plan from the cache.
+
+        Args:
+            key (str): Plan fingerprint.
+
+        Returns:
+            tuple: (normalFormOperations, transformOperations) or None if the plan is not cached.
+        """
+        path = self.get_path(key)
+        try:
+            with open(path) as plan_file:
+                plan = json.load(plan_file)
+        except (OSError, ValueError):
+            return None
+
+        # Mark the plan as recently used, unless it was evicted by a concurrent store in the meantime
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return (
+            [SDATransformOperation.from_dict(op) for op in plan["normalFormOperations"]],
+            [SDATransformOperation.from_dict(op) for op in plan["transformOperations"]]
+        )
+
+    def store(self, key, normalFormOperations, transformOperations):
+        """
+        Stores a plan in the cache and evicts the least recently used plans if the cache is too large.
+
+        Args:
+            key (str): Plan fingerprint.
+            normalFormOperations (list): Operations selecting the fields of the normal form.
+            transformOperations (list): Operations transforming the normal form to the target.
+        """
+        plan = {
+            "normalFormOperations": [op.to_dict() for op in normalFormOperations],
+            "transformOperations": [op.to_dict() for op in transformOperations]
+        }
+
+        # Write atomically, so concurrent readers never see a partial plan
+        fd, tmp_path = tempfile.mkstemp(dir=self.cacheDir, suffix=".tmp")
+        with os.fdopen(fd, "w") as plan_file:
+            json.dump(plan, plan_file)
+        os.replace(tmp_path, self.get_path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used plans until the cache fits into `maxBytes`.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cacheDir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cacheDir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(os.path.join(self.cacheDir, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Removes all plans from the cache.
+        """
+        for name in os.listdir(self.cacheDir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.cacheDir, name))
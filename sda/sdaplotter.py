@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# matplotlib is not thread-safe, so the plots of all plotters are rendered by one shared worker
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the background worker rendering the plots, created on first use.
+
+    Returns:
+        ThreadPoolExecutor: The shared single worker.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sda-plot")
+        return _executor
+
+
+class SDAPlotter:
+    """
+    Renders the graphs of a hierarchy and executed rules for inspection.
+    With an output directory, the plots are written to PNG files by a background worker, so the planning
+    never waits on matplotlib. Without an output directory, the plots are shown interactively.
+
+    Attributes:
+        outputDir (str): Directory for the rendered files, or None to show the plots.
+        executor (ThreadPoolExecutor): Single background worker rendering the plots, shared by all plotters.
+        futures (list): Pending render jobs.
+        counter (int): Number of plots submitted so far, used to order the files.
+        lock (threading.Lock): Guards the counter and the pending jobs of a plotter shared by several integrations.
+    """
+
+    def __init__(self, outputDir=None):
+        """
+        Initializes the SDAPlotter and creates the output directory if required. If pyplot has not been
+        imported yet, an output directory selects matplotlib's non-interactive Agg backend, as GUI backends
+        like TkAgg or macosx fail outside of the main thread and require a display. A backend already in
+        use by the application is kept, and has to support rendering from the background worker.
+
+        Args:
+            outputDir (str, optional): Directory to write the plots to. Defaults to None (show the plots).
+        """
+        self.outputDir = outputDir
+        self.executor = None
+        self.futures = []
+        self.counter = 0
+        self.lock = threading.Lock()
+        if outputDir is not None:
+            os.makedirs(outputDir, exist_ok=True)
+            if "matplotlib.pyplot" not in sys.modules:
+                import matplotlib
+
+                matplotlib.use("Agg")
+            self.executor = get_executor()
+
+    def get_filename(self, name):
+        """
+        Returns a unique, ordered file name for a plot.
+
+        Args:
+            name (str): Name of the plot.
+
+        Returns:
+            str: Path of the plot file.
+        """
+        with self.lock:
+            self.counter += 1
+            return os.path.join(self.outputDir, "%03d_%s.png" % (self.counter, name))
+
+    def plot_hierarchy(self, hirarchy, phase, graph_ids=("G", "S", "M")):
+        """
+        Plots the graphs of a hierarchy. The graphs are copied, so the hierarchy can be rewritten
+        while the plots are rendered.
+
+        Args:
+            hirarchy (NXHierarchy): The hierarchy to plot.
+            phase (str): Name of the current phase, used in the file names.
+            graph_ids (tuple, optional): Ids of the graphs to plot. Defaults to ("G", "S", "M").
+        """
+        from regraph import NXGraph, plot_graph
+
+        for graph_id in graph_ids:
+            graph = hirarchy.get_graph(graph_id)
+            if not isinstance(graph, NXGraph):
+                # Graph of an SDANativeHierarchy
+                graph = graph.to_nxgraph()
+            if self.executor is None:
+                plot_graph(graph)
+            else:
+                filename = self.get_filename(phase + "_" + graph_id)
+                self.submit(plot_graph, NXGraph.copy(graph), filename)
+
+    def plot_rule(self, rule, name="rule"):
+        """
+        Plots an executed rule.
+
+        Args:
+            rule (Rule): The rule to plot.
+            name (str, optional): Name of the plot, used in the file name. Defaults to "rule".
+        """
+        from regraph import plot_rule
+
+        if self.executor is None:
+            plot_rule(rule)
+        else:
+            self.submit(plot_rule, rule, self.get_filename(name))
+
+    def submit(self, plot, item, filename):
+        """
+        Submits a plot to the background worker.
+
+        Args:
+            plot (callable): regraph plotting function.
+            item (NXGraph or Rule): The object to plot.
+            filename (str): Path of the plot file.
+        """
+        future = self.executor.submit(self.render, plot, item, filename)
+        with self.lock:
+            self.futures.append(future)
+
+    def render(self, plot, item, filename):
+        """
+        Renders a graph or rule into a file and releases the figures created by the plot. Figures of
+        the application are left open.
+
+        Args:
+            plot (callable): regraph plotting function.
+            item (NXGraph or Rule): The object to plot.
+            filename (str): Path of the plot file.
+        """
+        import matplotlib.pyplot as plt
+
+        figures = set(plt.get_fignums())
+        try:
+            plot(item, filename)
+        finally:
+            for figure in set(plt.get_fignums()) - figures:
+                plt.close(figure)
+
+    def wait(self):
+        """
+        Blocks until all pending plots are rendered.
+
+        Returns:
+            list: Exceptions raised while rendering.
+        """
+        with self.lock:
+            futures, self.futures = self.futures, []
+        errors = []
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+        return errors
+
+    def close(self):
+        """
+        Waits for the pending plots. The shared background worker keeps running for other plotters.
+
+        Returns:
+            list: Exceptions raised while rendering.
+        """
+        return self.wait()
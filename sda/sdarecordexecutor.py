@@ -0,0 +1,138 @@
+import time
+from .sdapandasexecutor import SDAPandasExecutor
+
+
+class SDARecordExecutor(SDAPandasExecutor):
+    """
+    Executes the operations of an SDATransformation on plain dictionaries. It is the in-process counterpart
+    of SDAPandasExecutor for small JSON payloads, which neither needs a Spark session nor a pandas DataFrame.
+
+    Attributes:
+        normalFormOperations (list): Operations selecting the fields of the normal form.
+        transformOperations (list): Operations transforming the normal form to the target.
+        metrics (SDAMetrics): Hook receiving the timing of every operation, if enabled.
+    """
+
+    def execute(self, records):
+        """
+        Applies the normal form selection and the transformation operations to a list of records.
+        The records are transformed one by one. If the metrics are enabled, every operation is applied
+        to all records in turn instead, so its timing can be reported.
+
+        Args:
+            records (list): List of parsed JSON objects in the source structure.
+
+        Returns:
+            list: List of dictionaries in the target structure.
+        """
+        paths = [column.split(".") for column in self.get_select_columns()]
+        if not self.metrics.enabled:
+            return [self.transform_record(self.select_record(record, paths)) for record in records]
+
+        rows = [self.select_record(record, paths) for record in records]
+        for operation in self.transformOperations:
+            start = time.perf_counter()
+            rows = [self.transform_record(row, (operation,)) for row in rows]
+            self.metrics.on_operation(operation.action, operation.field, time.perf_counter() - start, len(rows))
+        return rows
+
+    def select_record(self, record, paths):
+        """
+        Selects the normal form fields of a record. The columns are named after the last path segment.
+
+        Args:
+            record (dict): Parsed JSON object in the source structure.
+            paths (list): Split column paths of the normal form fields.
+
+        Returns:
+            dict: Mapping of column names to values.
+        """
+        row = {}
+        for path in paths:
+            row[path[-1]] = self.get_value(record, path)
+        return row
+
+    def get_value(self, value, path, start=0):
+        """
+        Resolves a field path in a parsed JSON value. Like in Spark, resolving a field of an array of
+        structs yields the array of the field values. Nested arrays are resolved with an explicit stack,
+        so the depth of the value is not bounded by the recursion limit.
+
+        Args:
+            value: Parsed JSON value.
+            path (list): Split field path.
+            start (int, optional): Index of the first path segment to resolve. Defaults to 0.
+
+        Returns:
+            The resolved value, or None if the path does not exist.
+        """
+        value, index = self.resolve_path(value, path, start)
+        if index == len(path):
+            return value
+
+        # Every entry holds the iterator over the items of an array, the index of the next path segment
+        # and the array of the resolved values
+        result = []
+        stack = [(iter(value), index, result)]
+        while stack:
+            items, index, values = stack[-1]
+            for item in items:
+                item, item_index = self.resolve_path(item, path, index)
+                if item_index == len(path):
+                    values.append(item)
+                else:
+                    nested = []
+                    values.append(nested)
+                    stack.append((iter(item), item_index, nested))
+                    break
+            else:
+                stack.pop()
+        return result
+
+    def resolve_path(self, value, path, start):
+        """
+        Resolves the segments of a field path until an array is reached.
+
+        Args:
+            value: Parsed JSON value.
+            path (list): Split field path.
+            start (int): Index of the first path segment to resolve.
+
+        Returns:
+            tuple: The resolved value and the index of the next path segment, which is `len(path)` if the path is
+                resolved completely or does not exist.
+        """
+        for index in range(start, len(path)):
+            if isinstance(value, list):
+                return value, index
+            if not isinstance(value, dict):
+                return None, len(path)
+            value = value.get(path[index])
+        return value, len(path)
+
+    def transform_record(self, row, operations=None):
+        """
+        Applies the transformation operations to the normal form fields of one record.
+
+        Args:
+            row (dict): Mapping of column names to values.
+            operations (list, optional): Operations to apply. Defaults to None (all transformation operations).
+
+        Returns:
+            dict: The record in the target structure.
+        """
+        for operation in self.transformOperations if operations is None else operations:
+            if operation.action == "renameNode":
+                old_name = operation.field.split(".")[-1]
+                if old_name in row:
+                    row = {(operation.rename if name == old_name else name): value for name, value in row.items()}
+            elif operation.action == "addHirarchy":
+                row[operation.field] = {col: row[col] for col in operation.connect}
+                for col in operation.connect:
+                    del row[col]
+            elif operation.action == "nestList":
+                connect = operation.get_flatten_connect()
+                row[operation.field] = self.zip_records(connect, tuple(row[col] for col in connect))
+                for col in connect:
+                    del row[col]
+        return row
@@ -0,0 +1,569 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .sdaintegration import SDAIntegration
+from .sdahierarchicalgraph import SDAHierarchicalGraph
+from .sdacodegenerator import SDACodeGenerator
+from .sdasparkexecutor import SDASparkExecutor
+from .sdametrics import SDAMetrics
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class SDAServiceError(Exception):
+    """
+    Error of a service request, answered with the given HTTP status.
+
+    Attributes:
+        status (int): HTTP status of the response.
+    """
+
+    def __init__(self, status, message):
+        """
+        Initializes the SDAServiceError.
+
+        Args:
+            status (int): HTTP status of the response.
+            message (str): Error message.
+        """
+        super().__init__(message)
+        self.status = status
+
+
+class SDAService:
+    """
+    Long-running local transformation service. The imports, the Spark session and the planned transformations
+    stay warm between requests, so a request only pays for the transformation of its records.
+
+    Annotations are registered under an ID, and a request names the IDs of its source and target annotations.
+    The plan of an annotation pair only depends on the annotations, so it is planned once from the schema
+    derived from the source annotations, compiled to a transform function and kept in an LRU bounded by the
+    size of the plans. Concurrent requests for the same plan are collected for `batchDelay` seconds and
+    transformed in one execution.
+
+    The service speaks HTTP/1.1 with JSON bodies on a TCP port or a Unix socket:
+        POST /transform               {"source": ID, "target": ID, "records": [...]} -> {"records": [...]}
+        PUT /annotations/ID           annotation -> {"annotation": ID}
+        GET /health                   -> {"status": "ok", "plans": ..., "planBytes": ...}
+
+    Attributes:
+        planner (str): Planner of the integrations, "regraph" or "native".
+        engine (str): "local" to transform with the compiled plans in-process, or "spark" to transform
+            with the warm Spark session.
+        annotations (dict): Registered annotations by ID.
+        annotationDir (str): Directory to load unknown annotation IDs from, as `<ID>.json`, or None.
+        plans (OrderedDict): Planned transformations by (source ID, target ID), least recently used first.
+        planBytes (int): Total size of the plans in `plans`.
+        maxPlanBytes (int): Upper bound for `planBytes`.
+        batchDelay (float): Seconds to wait for further requests before a batch is transformed.
+        maxBatchSize (int): Number of records that triggers the transformation of a batch without waiting.
+        planCache (SDAPlanCache): Optional persistent cache below the in-memory plans.
+        metrics (SDAMetrics): Hook receiving the timing of the planning and the batches.
+        hirarchicalGraph (SDAHierarchicalGraph): Holds the shared Spark session and derives the schemas.
+        executor (ThreadPoolExecutor): Workers planning and transforming, so the event loop keeps serving.
+    """
+
+    def __init__(self, planner="regraph", engine="local", annotationDir=None, maxPlanBytes=64 * 1024 * 1024,
+                 batchDelay=0.005, maxBatchSize=10000, planCache=None, metrics=None, workers=None, spark=None,
+                 sparkConf=None):
+        """
+        Initializes the SDAService without registered annotations.
+
+        Args:
+            planner (str, optional): "regraph" or "native", see SDAIntegration. Defaults to "regraph".
+            engine (str, optional): "local" or "spark". Defaults to "local".
+            annotationDir (str, optional): Directory with one `<ID>.json` file per annotation. Defaults to None.
+            maxPlanBytes (int, optional): Maximal total size of the plans held in memory. Defaults to 64 MiB.
+            batchDelay (float, optional): Seconds to collect concurrent requests into a batch. Defaults to 0.005.
+            maxBatchSize (int, optional): Maximal number of records collected into a batch. Defaults to 10000.
+            planCache (SDAPlanCache or str, optional): Persistent plan cache or its directory. Defaults to None.
+            metrics (SDAMetrics, optional): Hook receiving the timing of the phases. Defaults to None.
+            workers (int, optional): Number of worker threads. Defaults to None (ThreadPoolExecutor default).
+            spark (SparkSession, optional): Spark session of the "spark" engine. Defaults to None (created on start).
+            sparkConf (dict, optional): Configuration of the created Spark session. Defaults to None.
+        """
+        if engine not in ("local", "spark"):
+            raise ValueError("Unknown engine '{}'".format(engine))
+        self.planner = planner
+        self.engine = engine
+        self.annotations = {}
+        self.annotationDir = annotationDir
+        self.plans = OrderedDict()
+        self.planBytes = 0
+        self.maxPlanBytes = maxPlanBytes
+        self.batchDelay = batchDelay
+        self.maxBatchSize = maxBatchSize
+        self.planCache = planCache
+        self.metrics = metrics if metrics is not None else SDAMetrics()
+        self.hirarchicalGraph = SDAHierarchicalGraph(planner=planner, spark=spark, sparkConf=sparkConf)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sda-service")
+        self.planning = {}
+        self.batches = {}
+        self.connections = set()
+        self.server = None
+
+    def registerAnnotation(self, annotationId, annotation):
+        """
+        Registers an annotation under an ID. Plans of a replaced annotation are dropped.
+
+        Args:
+            annotationId (str): ID of the annotation.
+            annotation (dict): Source or target annotations.
+        """
+        if self.annotations.get(annotationId) != annotation:
+            for key in [key for key in self.plans if annotationId in key]:
+                self.drop_plan(key)
+        self.annotations[annotationId] = annotation
+
+    def get_annotation(self, annotationId):
+        """
+        Returns a registered annotation and loads it from the annotation directory on first use.
+
+        Args:
+            annotationId (str): ID of the annotation.
+
+        Returns:
+            dict: The annotation.
+
+        Raises:
+            SDAServiceError: If the annotation is unknown.
+        """
+        if annotationId in self.annotations:
+            return self.annotations[annotationId]
+        if self.annotationDir is not None and isinstance(annotationId, str) and annotationId \
+                and os.path.basename(annotationId) == annotationId and not annotationId.startswith("."):
+            path = os.path.join(self.annotationDir, annotationId + ".json")
+            if os.path.exists(path):
+                with open(path) as annotation_file:
+                    self.annotations[annotationId] = json.load(annotation_file)
+                return self.annotations[annotationId]
+        raise SDAServiceError(404, "Unknown annotation '{}'".format(annotationId))
+
+    async def get_plan(self, sourceId, targetId):
+        """
+        Returns the plan of an annotation pair. A missing plan is planned by a worker thread, concurrent
+        requests for the same pair wait for the same planning.
+
+        Args:
+            sourceId (str): ID of the source annotations.
+            targetId (str): ID of the target annotations.
+
+        Returns:
+            tuple: (normalFormOperations, transformOperations, transform function).
+        """
+        key = (sourceId, targetId)
+        if key in self.plans:
+            self.plans.move_to_end(key)
+            return self.plans[key][0]
+
+        sourceAnnotation = self.get_annotation(sourceId)
+        targetAnnotation = self.get_annotation(targetId)
+        planning = self.planning.get(key)
+        if planning is None:
+            loop = asyncio.get_running_loop()
+            planning = loop.run_in_executor(self.executor, self.plan, sourceAnnotation, targetAnnotation)
+            self.planning[key] = planning
+            planning.add_done_callback(lambda _: self.planning.pop(key, None))
+        plan, size = await asyncio.shield(planning)
+
+        # Keep the plan unless an annotation was replaced while it was planned
+        if key not in self.plans and self.annotations.get(sourceId) is sourceAnnotation \
+                and self.annotations.get(targetId) is targetAnnotation:
+            self.store_plan(key, plan, size)
+        return plan
+
+    def plan(self, sourceAnnotation, targetAnnotation):
+        """
+        Plans the transformation of an annotation pair and compiles it. Runs in a worker thread.
+
+        Args:
+            sourceAnnotation (dict): Source annotations.
+            targetAnnotation (dict): Target annotations.
+
+        Returns:
+            tuple: The plan as (normalFormOperations, transformOperations, transform function) and its size in bytes.
+        """
+        integration = SDAIntegration(planCache=self.planCache, metrics=self.metrics, planner=self.planner)
+        graph = integration.hirarchicalGraph
+        graph.addAnnotations(sourceAnnotation)
+        graph.addTargetAnnotations(targetAnnotation)
+        graph.readRecordSchema(graph.get_annotation_record_schema())
+        with self.metrics.phase("createHirarchy"):
+            graph.createHirarchy()
+        integration.doTransformation()
+
+        normalFormOperations = integration.transformation.normalFormOperations
+        transformOperations = integration.transformation.transformOperations
+        generator = SDACodeGenerator(normalFormOperations, transformOperations)
+        code = generator.get_records_code()
+        size = len(code) + len(json.dumps([op.to_dict() for op in normalFormOperations + transformOperations]))
+        return (normalFormOperations, transformOperations, generator.get_function("records")), size
+
+    def store_plan(self, key, plan, size):
+        """
+        Stores a plan and evicts the least recently used plans until the plans fit into `maxPlanBytes`.
+        The size of a plan is estimated by the size of its serialized operations and generated code.
+
+        Args:
+            key (tuple): (source ID, target ID).
+            plan (tuple): (normalFormOperations, transformOperations, transform function).
+            size (int): Size of the plan in bytes.
+        """
+        self.plans[key] = (plan, size)
+        self.planBytes += size
+        while self.planBytes > self.maxPlanBytes and len(self.plans) > 1:
+            self.drop_plan(next(iter(self.plans)))
+
+    def drop_plan(self, key):
+        """
+        Removes a plan from memory.
+
+        Args:
+            key (tuple): (source ID, target ID).
+        """
+        _, size = self.plans.pop(key)
+        self.planBytes -= size
+
+    async def transform(self, sourceId, targetId, records):
+        """
+        Transforms records with the plan of an annotation pair. The records are transformed together with
+        the records of concurrent requests for the same plan.
+
+        Args:
+            sourceId (str): ID of the source annotations.
+            targetId (str): ID of the target annotations.
+            records (list): Parsed JSON objects in the source structure.
+
+        Returns:
+            list: Dictionaries in the target structure.
+        """
+        plan = await self.get_plan(sourceId, targetId)
+        key = (sourceId, targetId)
+        loop = asyncio.get_running_loop()
+        batch = self.batches.get(key)
+        if batch is None or batch["plan"] is not plan:
+            if batch is not None:
+                self.flush(key)
+            batch = {"plan": plan, "requests": [], "size": 0, "timer": loop.call_later(self.batchDelay, self.flush, key)}
+            self.batches[key] = batch
+        future = loop.create_future()
+        batch["requests"].append((records, future))
+        batch["size"] += len(records)
+        if batch["size"] >= self.maxBatchSize:
+            self.flush(key)
+        return await future
+
+    def flush(self, key):
+        """
+        Starts the transformation of the collected batch of a plan.
+
+        Args:
+            key (tuple): (source ID, target ID).
+
+        Returns:
+            asyncio.Task: The transformation of the batch, or None if no batch was collected.
+        """
+        batch = self.batches.pop(key, None)
+        if batch is None:
+            return None
+        batch["timer"].cancel()
+        return asyncio.ensure_future(self.execute_batch(key, batch["plan"], batch["requests"]))
+
+    async def execute_batch(self, key, plan, requests):
+        """
+        Transforms the records of all requests of a batch in one execution and answers the requests. If the
+        execution fails, the requests are executed separately, so only the failing requests get the error.
+
+        Args:
+            key (tuple): (source ID, target ID).
+            plan (tuple): (normalFormOperations, transformOperations, transform function).
+            requests (list): List of (records, future) tuples.
+        """
+        loop = asyncio.get_running_loop()
+        records = [record for request_records, _ in requests for record in request_records]
+        try:
+            results = await loop.run_in_executor(self.executor, self.execute, key, plan, records)
+        except Exception as e:
+            if len(requests) == 1:
+                self.set_result(requests[0][1], error=e)
+                return
+            for request_records, future in requests:
+                try:
+                    self.set_result(future, await loop.run_in_executor(self.executor, self.execute, key, plan, request_records))
+                except Exception as request_error:
+                    self.set_result(future, error=request_error)
+            return
+
+        start = 0
+        for request_records, future in requests:
+            self.set_result(future, results[start:start + len(request_records)])
+            start += len(request_records)
+
+    def set_result(self, future, result=None, error=None):
+        """
+        Answers a request unless it was cancelled, e.g. because the client disconnected.
+
+        Args:
+            future (asyncio.Future): Future of the request.
+            result (list, optional): Transformed records. Defaults to None.
+            error (Exception, optional): Error of the transformation. Defaults to None.
+        """
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def execute(self, key, plan, records):
+        """
+        Transforms a batch of records with the configured engine. Runs in a worker thread.
+
+        Args:
+            key (tuple): (source ID, target ID).
+            plan (tuple): (normalFormOperations, transformOperations, transform function).
+            records (list): Parsed JSON objects in the source structure.
+
+        Returns:
+            list: Dictionaries in the target structure.
+        """
+        start = time.perf_counter()
+        if self.engine == "spark":
+            results = self.execute_spark(self.annotations[key[0]], plan, records)
+        else:
+            results = plan[2](records)
+        self.metrics.on_phase("executeBatch", time.perf_counter() - start)
+        return results
+
+    def execute_spark(self, sourceAnnotation, plan, records):
+        """
+        Transforms a batch of records with the warm Spark session, like SDAIntegration.transformSpark().
+
+        Args:
+            sourceAnnotation (dict): Source annotations, only the annotated fields are read.
+            plan (tuple): (normalFormOperations, transformOperations, transform function).
+            records (list): Parsed JSON objects in the source structure.
+
+        Returns:
+            list: Dictionaries in the target structure.
+        """
+        from pyspark.sql.types import StructType
+
+        graph = self.hirarchicalGraph
+        schema = graph.prune_schema(StructType.fromJson(graph.infer_record_schema(records)), sourceAnnotation)
+        lines = graph.spark.sparkContext.parallelize([json.dumps(record) for record in records])
+        df = graph.spark.read.schema(schema).json(lines)
+        rows = SDASparkExecutor(plan[0], plan[1]).execute(df).collect()
+        return [row.asDict(recursive=True) for row in rows]
+
+    async def dispatch(self, method, path, body):
+        """
+        Answers a request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Request path.
+            body (bytes): Request body.
+
+        Returns:
+            tuple: HTTP status and JSON payload of the response.
+        """
+        try:
+            if path == "/transform":
+                if method != "POST":
+                    raise SDAServiceError(405, "Use POST for /transform")
+                request = self.parse_body(body)
+                if not isinstance(request.get("source"), str) or not isinstance(request.get("target"), str):
+                    raise SDAServiceError(400, "The request requires the IDs of the 'source' and 'target' annotations")
+                if "record" in request:
+                    records = await self.transform(request.get("source"), request.get("target"), [request["record"]])
+                    return 200, {"record": records[0]}
+                if not isinstance(request.get("records"), list):
+                    raise SDAServiceError(400, "The request requires 'records' or 'record'")
+                return 200, {"records": await self.transform(request.get("source"), request.get("target"), request["records"])}
+            if path.startswith("/annotations/"):
+                if method != "PUT":
+                    raise SDAServiceError(405, "Use PUT for /annotations")
+                annotationId = path[len("/annotations/"):]
+                annotation = self.parse_body(body)
+                self.registerAnnotation(annotationId, annotation)
+                return 200, {"annotation": annotationId}
+            if path == "/health":
+                return 200, {"status": "ok", "plans": len(self.plans), "planBytes": self.planBytes}
+            raise SDAServiceError(404, "Unknown path '{}'".format(path))
+        except SDAServiceError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": "{}: {}".format(type(e).__name__, e)}
+
+    def parse_body(self, body):
+        """
+        Parses a JSON object from a request body.
+
+        Args:
+            body (bytes): Request body.
+
+        Returns:
+            dict: The parsed object.
+
+        Raises:
+            SDAServiceError: If the body is not a JSON object.
+        """
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            raise SDAServiceError(400, "Invalid JSON: {}".format(e))
+        if not isinstance(request, dict):
+            raise SDAServiceError(400, "The body must be a JSON object")
+        return request
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the HTTP/1.1 requests of a connection. Connections are kept alive unless the client closes them.
+
+        Args:
+            reader (asyncio.StreamReader): Reader of the connection.
+            writer (asyncio.StreamWriter): Writer of the connection.
+        """
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    await self.write_response(writer, 400, {"error": "Malformed request line"}, False)
+                    break
+                method, path, version = parts
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self.dispatch(method, path.split("?")[0], body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def write_response(self, writer, status, payload, keep_alive):
+        """
+        Writes a JSON response.
+
+        Args:
+            writer (asyncio.StreamWriter): Writer of the connection.
+            status (int): HTTP status.
+            payload (dict): Response body.
+            keep_alive (bool): Keep the connection open for further requests.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        head = "HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n".format(
+            status, STATUS_TEXT.get(status, ""), len(body), "keep-alive" if keep_alive else "close")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8765, path=None, plans=()):
+        """
+        Warms up the service and starts listening.
+
+        Args:
+            host (str, optional): Host to listen on. Defaults to "127.0.0.1".
+            port (int, optional): TCP port to listen on, 0 for a free port. Defaults to 8765.
+            path (str, optional): Path of a Unix socket to listen on instead of the TCP port. Defaults to None.
+            plans (iterable, optional): (source ID, target ID) pairs to plan before the first request. Defaults to ().
+
+        Returns:
+            asyncio.AbstractServer: The listening server.
+        """
+        loop = asyncio.get_running_loop()
+        if self.engine == "spark":
+            await loop.run_in_executor(self.executor, lambda: self.hirarchicalGraph.spark)
+        elif self.planner == "regraph":
+            await loop.run_in_executor(self.executor, self.hirarchicalGraph.get_meta_graph)
+        for sourceId, targetId in plans:
+            await self.get_plan(sourceId, targetId)
+
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None, plans=()):
+        """
+        Starts the service and serves until it is cancelled. The arguments are described in start().
+        """
+        await self.start(host, port, path, plans)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """
+        Stops listening, transforms the collected batches, closes the idle connections and stops the worker threads.
+        """
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        await asyncio.gather(*[self.flush(key) for key in list(self.batches)])
+        for writer in list(self.connections):
+            writer.close()
+        while self.connections:
+            await asyncio.sleep(0.01)
+        self.executor.shutdown(wait=False)
+
+
+def main(args=None):
+    """
+    Runs the service from the command line, e.g.
+    `python -m sda.sdaservice --annotations annotations/ --plan source:target --port 8765`.
+
+    Args:
+        args (list, optional): Command line arguments. Defaults to None (sys.argv).
+    """
+    parser = argparse.ArgumentParser(description="Semantic Data Abstraction transformation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="listen on a Unix socket instead of the TCP port")
+    parser.add_argument("--annotations", help="directory with one <ID>.json file per annotation")
+    parser.add_argument("--plan", action="append", default=[], metavar="SOURCE:TARGET",
+                        help="annotation pair to plan on start, can be repeated")
+    parser.add_argument("--planner", default="regraph", choices=("regraph", "native"))
+    parser.add_argument("--engine", default="local", choices=("local", "spark"))
+    parser.add_argument("--plan-cache", help="directory of a persistent plan cache")
+    parser.add_argument("--max-plan-bytes", type=int, default=64 * 1024 * 1024)
+    parser.add_argument("--batch-delay", type=float, default=0.005)
+    parser.add_argument("--max-batch-size", type=int, default=10000)
+    args = parser.parse_args(args)
+
+    planCache = None
+    if args.plan_cache:
+        from .sdaplancache import SDAPlanCache
+        planCache = SDAPlanCache(args.plan_cache)
+    service = SDAService(planner=args.planner, engine=args.engine, annotationDir=args.annotations,
+                         maxPlanBytes=args.max_plan_bytes, batchDelay=args.batch_delay,
+                         maxBatchSize=args.max_batch_size, planCache=planCache)
+    plans = [tuple(pair.split(":", 1)) for pair in args.plan]
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket, plans))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+class SDASparkExecutor:
+    """
+    Compiles the operations of an SDATransformation into native Spark column expressions.
+    The compiled plan is executed as a single select on the source DataFrame, so the data
+    stays distributed on the cluster instead of being collected to the driver.
+
+    Attributes:
+        normalFormOperations (list): Operations selecting the fields of the normal form.
+        transformOperations (list): Operations transforming the normal form to the target.
+    """
+
+    def __init__(self, normalFormOperations, transformOperations):
+        """
+        Initializes the SDASparkExecutor with the operations of a finished transformation.
+
+        Args:
+            normalFormOperations (list): List of `selectField` SDATransformOperations.
+            transformOperations (list): List of `renameNode`, `addHirarchy` and `nestList` SDATransformOperations.
+        """
+        self.normalFormOperations = normalFormOperations
+        self.transformOperations = transformOperations
+
+    def get_columns(self):
+        """
+        Compiles the operations into an ordered list of named column expressions.
+        The column naming and ordering follows the pandas implementation of SDAIntegration.transform().
+
+        Returns:
+            list: List of (name, pyspark.sql.Column) tuples.
+        """
+        from pyspark.sql import functions as F
+
+        columns = []
+
+        # Select the fields of the normal form
+        for operation in self.normalFormOperations:
+            path = operation.field.replace("root.", "")
+            columns.append((path.split(".")[-1], F.col(path)))
+
+        # Apply transformations based on operations
+        for operation in self.transformOperations:
+            if operation.action == "renameNode":
+                old_name = operation.field.split(".")[-1]
+                columns = [(operation.rename if name == old_name else name, column) for name, column in columns]
+            elif operation.action == "addHirarchy":
+                nested = self.get_named_columns(columns, operation.connect)
+                columns = self.set_column(columns, operation.field, F.struct(*nested), operation.connect)
+            elif operation.action == "nestList":
+                connect = operation.get_flatten_connect()
+                nested = self.get_named_columns(columns, connect)
+                columns = self.set_column(columns, operation.field, F.arrays_zip(*nested), connect)
+
+        return columns
+
+    def get_named_columns(self, columns, names):
+        """
+        Looks up columns by name and aliases them, so nested structures carry the column names as keys.
+
+        Args:
+            columns (list): List of (name, pyspark.sql.Column) tuples.
+            names (list): Names of the columns to look up.
+
+        Returns:
+            list: Aliased column expressions in the order of `names`.
+        """
+        lookup = dict(columns)
+        return [lookup[name].alias(name) for name in names]
+
+    def set_column(self, columns, name, column, drop):
+        """
+        Adds or replaces a column and removes the columns that were nested into it.
+
+        Args:
+            columns (list): List of (name, pyspark.sql.Column) tuples.
+            name (str): Name of the new column.
+            column (pyspark.sql.Column): Expression of the new column.
+            drop (list): Names of the columns to remove.
+
+        Returns:
+            list: Updated list of (name, pyspark.sql.Column) tuples.
+        """
+        if any(existing == name for existing, _ in columns):
+            columns = [(existing, column if existing == name else expr) for existing, expr in columns]
+        else:
+            columns = columns + [(name, column)]
+        return [(existing, expr) for existing, expr in columns if existing not in drop]
+
+    def execute(self, df):
+        """
+        Executes the compiled plan on a Spark DataFrame.
+
+        Args:
+            df (pyspark.sql.DataFrame): The source data frame.
+
+        Returns:
+            pyspark.sql.DataFrame: Distributed data frame in the target structure.
+        """
+        return df.select(*[column.alias(name) for name, column in self.get_columns()])
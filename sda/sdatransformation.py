@@ -1,7 +1,8 @@
 import json
-from regraph import NXGraph, Rule, NXHierarchy
-from regraph import plot_graph, plot_instance, plot_rule
+import time
+from .sdametrics import SDAMetrics
 from .sdatransformoperation import SDATransformOperation
+from .sdatypingindex import SDATypingIndex
 
 class SDATransformation:
     """
@@ -10,14 +11,20 @@ class SDATransformation:
     according to specific rules and operations.
     """
 
-    def __init__(self):
+    def __init__(self, metrics=None):
         """
         Initializes the SDATransformation class with empty lists
         for transformation operations, normalization operations, and executed rules.
+        The restoration steps of the target hierarchies are recorded by constructTargetHirarchies, so the plan
+        can be updated when the source schema evolves.
+
+        :param metrics: SDAMetrics hook receiving the metrics of every applied rule (default: None, metrics are discarded).
         """
         self.transformOperations = []
         self.normalFormOperations = []
         self.excecutedRules = []
+        self.restorationSteps = None
+        self.metrics = metrics if metrics is not None else SDAMetrics()
 
     def removeIrrelevantNodes(self, hirarchy):
         """
@@ -25,9 +32,14 @@ class SDATransformation:
 
         :param hirarchy: The hierarchy object to transform.
         """
-        rule = Rule.from_transform(hirarchy.get_graph("S"))
+        from regraph import NXGraph, Rule
+
+        # Matching the whole graph S would enumerate all its automorphisms, the node is anchored by its id
+        pattern = NXGraph()
+        pattern.add_node("DELETE")
+        rule = Rule.from_transform(pattern)
         rule.inject_remove_node("DELETE")
-        self.do_transformation(hirarchy, "S", rule, showoutput=False)
+        self.do_transformation(hirarchy, "S", rule, showoutput=False, name="removeIrrelevantNodes", instances=[{"DELETE": "DELETE"}])
 
     def removeHirarchies(self, hirarchy):
         """
@@ -36,33 +48,36 @@ class SDATransformation:
 
         :param hirarchy: The hierarchy object to transform.
         """
+        from regraph import NXGraph, Rule
+
         # Remove Structs and Lists
-        rule = Rule.from_transform(hirarchy.get_graph("M"))
+        M = hirarchy.get_graph("M")
+        rule = Rule.from_transform(M)
         rule.inject_remove_node("STRUCT")
         rule.inject_remove_node("ARRAY")
-        self.do_transformation(hirarchy, "M", rule, showoutput=False)
-
-        # Add Connection between Root and Fields
-        pattern2 = NXGraph()
-        pattern2.add_nodes_from(["ROOT", "FIELD"])
-        rule = Rule.from_transform(pattern2)
-        rule.inject_add_edge("ROOT", "FIELD")
-        
-        # Get potential Edges instances
-        instances = hirarchy.find_matching("G", rule.lhs)
-        self.excecutedRules.append(rule)
-
-        # Check if types are matching
-        for instance in instances:
-            valide_match = True
-            for key, value in instance.items():
-                for node in hirarchy.get_graph("G").nodes():
-                    if node == value and hirarchy.node_type("G", node)['M'] != key:
-                        valide_match = False
+        identity = {node: node for node in M.nodes()}
+        self.do_transformation(hirarchy, "M", rule, showoutput=False, name="removeStructsAndLists", instances=[identity])
 
-            # Transform valid matches
-            if valide_match:
-                rhs_instance = hirarchy.rewrite("G", rule, instance)
+        # Add Connection between Root and Fields, with one rewrite per root, the fields are numbered in the rule
+        index = SDATypingIndex(hirarchy, "G")
+        start = time.perf_counter()
+        roots = index.get_typed_nodes("ROOT", "M")
+        fields = index.get_typed_nodes("FIELD", "M")
+        match_seconds = time.perf_counter() - start
+        rewrites = 0
+        for root in roots:
+            pattern = NXGraph()
+            pattern.add_node("ROOT")
+            pattern.add_nodes_from(range(len(fields)))
+            rule = Rule.from_transform(pattern)
+            for field in range(len(fields)):
+                rule.inject_add_edge("ROOT", field)
+            self.excecutedRules.append(rule)
+            instance = dict(enumerate(fields))
+            instance["ROOT"] = root
+            rhs_instance = index.rewrite(rule, instance)
+            rewrites += len(fields)
+        self.metrics.on_rule("connectRootFields", "G", match_seconds, len(roots) * len(fields), rewrites, [])
 
     def constructTargetHirarchies(self, hirarchy, targetS):
         """
@@ -71,46 +86,185 @@ class SDATransformation:
         :param hirarchy: The hierarchy object to transform.
         :param targetS: The target schema to guide the transformation.
         """
+        from regraph import Rule
+
         # Restore Nestable Schema
-        rule = Rule.from_transform(hirarchy.get_graph("M"))
+        M = hirarchy.get_graph("M")
+        rule = Rule.from_transform(M)
         rule.inject_add_node("STRUCT")
         rule.inject_add_edge("STRUCT", "STRUCT")
         rule.inject_add_edge("ROOT", "STRUCT")
-        self.do_transformation(hirarchy, "M", rule, showoutput=False)
+        identity = {node: node for node in M.nodes()}
+        self.do_transformation(hirarchy, "M", rule, showoutput=False, name="restoreNestableSchema", instances=[identity])
 
         # Execute restoration steps
-        operations = self.get_transformation_steps(targetS, [])
-        operations.reverse()
-        for operation in operations:
-            hirarchy_name, mapping, type = operation
-            mapping = self.add_hirarchy(hirarchy_name, mapping, type, hirarchy)
-            if mapping != None:
-                self.add_transform_operation(operation, mapping, type)
+        self.add_target_hirarchies(hirarchy, targetS, SDATypingIndex(hirarchy, "G"))
         return None
 
-    def do_transformation(self, G, hirarchy, rule, showoutput=False):
+    def do_transformation(self, G, hirarchy, rule, showoutput=False, name=None, instances=None):
         """
-        Applies a transformation rule to a hierarchy.
+        Applies a transformation rule to a hierarchy. A failing rewrite stops the rule, the failure
+        is reported to the metrics hook.
 
         :param G: Graph object to apply the rule on.
         :param hirarchy: The hierarchy name where the rule will be applied.
         :param rule: The transformation rule to apply.
         :param showoutput: Boolean flag to display the output graph (default: False).
+        :param name: Name of the rule in the metrics (default: None, the hierarchy name).
+        :param instances: Instances of the rule (default: None, all instances of the left-hand side are matched).
         """
         self.excecutedRules.append(rule)
-        instances = G.find_matching(hirarchy, rule.lhs)
-        print("Apply Rule to: ", len(instances), " instances")
+        start = time.perf_counter()
+        if instances is None:
+            instances = G.find_matching(hirarchy, rule.lhs)
+        match_seconds = time.perf_counter() - start
         if showoutput:
+            from regraph import plot_rule
             plot_rule(rule)
+        rewrites = 0
+        errors = []
         try:
             for instance in instances:
                 rhs_instance = G.rewrite(hirarchy, rule, instance, strict=False)
+                rewrites += 1
         except Exception as e:
-            print()
+            errors.append("{}: {}".format(type(e).__name__, e))
+        self.metrics.on_rule(name or hirarchy, hirarchy, match_seconds, len(instances), rewrites, errors)
         if showoutput:
+            from regraph import plot_graph
             plot_graph(G.get_graph(hirarchy))
 
-    def add_hirarchy(self, struct_name, mapping, type, hirarchy):
+    def add_target_hirarchies(self, hirarchy, targetS, index=None):
+        """
+        Adds the structs and lists of the target schema, bottom-up in batches of independent steps,
+        and records the transform operations of every added hierarchy.
+
+        :param hirarchy: The hierarchy object to transform.
+        :param targetS: The target schema to guide the transformation.
+        :param index: Typing index of the graph G, kept up to date by the rewrites (default: None, builds a new index per batch).
+        """
+        operations = self.get_transformation_steps(targetS, [])
+        operations.reverse()
+        self.restorationSteps = []
+        for batch in self.get_construction_batches(operations):
+            mappings = self.add_hirarchies(batch, hirarchy, index)
+            for operation, mapping in zip(batch, mappings):
+                step = {"operation": operation, "instance": mapping, "operations": []}
+                if mapping != None:
+                    step["operations"] = self.add_transform_operation(operation, mapping, operation[2])
+                self.restorationSteps.append(step)
+
+    def get_construction_batches(self, operations):
+        """
+        Groups the restoration steps into batches that can be applied in one rewrite. A step is placed in
+        the level after its nested structs, so every level only depends on the previous ones. Within a level,
+        steps sharing a struct name or an annotation are split into consecutive batches, so they are matched
+        in the order of the steps. Steps regraph rejects as rule are kept in a batch of their own.
+
+        :param operations: Restoration steps (struct name, mapping, type), nested structs first.
+        :return: A list of batches, each a list of steps.
+        """
+        levels = []
+        struct_levels = {}
+        value_levels = {}
+        for operation in operations:
+            struct_name, mapping, type = operation
+            values = {value for value in mapping.values() if not isinstance(value, (list, dict))}
+            # Steps sharing a struct name or an annotation with an earlier step keep their order
+            level = struct_levels.get(struct_name, 0)
+            for value in values:
+                level = max(level, value_levels.get(value, 0))
+            for key, value in mapping.items():
+                if key == value and key in struct_levels:
+                    level = max(level, struct_levels[key] + 1)
+            struct_levels[struct_name] = level
+            for value in values:
+                value_levels[value] = level
+            while len(levels) <= level:
+                levels.append([])
+
+            batchable = struct_name != "root" and struct_name not in mapping
+            for batch in levels[level]:
+                if batchable and batch["batchable"] and struct_name not in batch["names"] \
+                        and not values & batch["values"]:
+                    break
+            else:
+                batch = {"batchable": batchable, "names": set(), "values": set(), "operations": []}
+                levels[level].append(batch)
+            batch["names"].add(struct_name)
+            batch["values"] |= values
+            batch["operations"].append(operation)
+        return [batch["operations"] for level in levels for batch in level]
+
+    def add_hirarchies(self, batch, hirarchy, index=None):
+        """
+        Adds the hierarchies of a batch of independent restoration steps with a single rewrite, so the
+        typing is propagated to S and M once per batch. The fields of every step are matched separately.
+        Steps whose match regraph would reject are added on their own, raising the error of the rewrite.
+
+        :param batch: Restoration steps (struct name, mapping, type) with disjoint struct names and annotations.
+        :param hirarchy: The hierarchy object to transform.
+        :param index: Typing index of the graph G, kept up to date by the rewrite (default: None, builds a new index).
+        :return: A list with the rewritten instance of every step, None for the steps without match.
+        """
+        from regraph import NXGraph, Rule
+
+        if index is None:
+            index = SDATypingIndex(hirarchy, "G")
+        if len(batch) == 1:
+            return [self.add_hirarchy(*batch[0], hirarchy, index)]
+
+        instances = []
+        combined = []
+        for position, (struct_name, mapping, type) in enumerate(batch):
+            instance, match_seconds, matches = self.find_hirarchy_instance(mapping, hirarchy, index)
+            if instance is not None and not self.is_valid_rhs_typing(instance, mapping, index):
+                instances.append(self.add_hirarchy(struct_name, mapping, type, hirarchy, index))
+                continue
+            instances.append(instance)
+            self.metrics.on_rule("addHirarchy " + struct_name, "G", match_seconds, matches, int(instance is not None), [])
+            if instance is not None:
+                combined.append(position)
+        if not combined:
+            return instances
+
+        # Combine the rules, the fields are numbered as their names may repeat between the steps
+        pattern = NXGraph()
+        pattern.add_node("root")
+        lhs_instance = {"root": instances[combined[0]]["root"]}
+        rhs_typing = {"S": {"root": "root"}, "M": {}}
+        fields = []
+        for position in combined:
+            for key, value in batch[position][1].items():
+                field = len(fields)
+                pattern.add_node(field)
+                pattern.add_edge("root", field)
+                lhs_instance[field] = instances[position][key]
+                rhs_typing["S"][field] = value
+                rhs_typing["M"][field] = "STRUCT" if key == value else "FIELD"
+                fields.append((position, key))
+
+        rule = Rule.from_transform(pattern)
+        for position in combined:
+            struct_name = batch[position][0]
+            rule.inject_add_node(struct_name)
+            rule.inject_add_edge("root", struct_name)
+            rhs_typing["M"][struct_name] = "STRUCT"
+        for field, (position, key) in enumerate(fields):
+            rule.inject_remove_edge("root", field)
+            rule.inject_add_edge(batch[position][0], field)
+        self.excecutedRules.append(rule)
+        rhs_instance = index.rewrite(rule, lhs_instance, rhs_typing=rhs_typing)
+
+        for field, (position, key) in enumerate(fields):
+            instances[position][key] = rhs_instance[field]
+        for position in combined:
+            struct_name = batch[position][0]
+            instances[position]["root"] = rhs_instance["root"]
+            instances[position][struct_name] = rhs_instance[struct_name]
+        return instances
+
+    def add_hirarchy(self, struct_name, mapping, type, hirarchy, index=None):
         """
         Adds a new hierarchy to the graph based on the provided mapping.
 
@@ -118,16 +272,15 @@ class SDATransformation:
         :param mapping: Mapping of fields to their corresponding types.
         :param type: Type of the new hierarchy (e.g., Struct or List).
         :param hirarchy: The hierarchy object to transform.
+        :param index: Typing index of the graph G, kept up to date by the rewrite (default: None, builds a new index).
         :return: The rewritten hierarchy instance.
         """
+        from regraph import Rule
+
+        if index is None:
+            index = SDATypingIndex(hirarchy, "G")
         # Create LHS Rule
-        pattern = NXGraph()
-        nodes = ["root"]
-        for key, value in mapping.items():
-            nodes.append(key)
-        pattern.add_nodes_from(nodes)
-        for field, value in mapping.items():
-            pattern.add_edge("root", field)
+        pattern = self.get_hirarchy_pattern(mapping)
 
         # Transform Graph to get RHS Rule
         rule = Rule.from_transform(pattern)
@@ -152,18 +305,76 @@ class SDATransformation:
                 rhs_typing["M"][key] = "FIELD"
         rhs_typing["M"][struct_name] = "STRUCT"
 
-        instances = hirarchy.find_matching("G", rule.lhs)
+        instance, match_seconds, matches = self.find_hirarchy_instance(mapping, hirarchy, index, pattern)
+        if instance is not None:
+            # Transform valid matches
+            rhs_instance = index.rewrite(rule, instance, rhs_typing=rhs_typing)
+            self.metrics.on_rule("addHirarchy " + struct_name, "G", match_seconds, matches, 1, [])
+            return rhs_instance
+        self.metrics.on_rule("addHirarchy " + struct_name, "G", match_seconds, matches, 0, [])
+
+    def get_hirarchy_pattern(self, mapping):
+        """
+        Creates the pattern of a new hierarchy: the root connected with the fields of the mapping.
+
+        :param mapping: Mapping of fields to their corresponding types.
+        :return: The pattern as NXGraph.
+        """
+        from regraph import NXGraph
+
+        pattern = NXGraph()
+        nodes = ["root"]
+        for key, value in mapping.items():
+            nodes.append(key)
+        pattern.add_nodes_from(nodes)
+        for field, value in mapping.items():
+            pattern.add_edge("root", field)
+        return pattern
+
+    def find_hirarchy_instance(self, mapping, hirarchy, index, pattern=None):
+        """
+        Finds the first instance of the fields of a new hierarchy, typed as in the mapping, in the graph G.
+        The fields are looked up by their annotation in the typing index and the root is their common parent,
+        only a mapping without annotated fields is matched as pattern.
+
+        :param mapping: Mapping of fields to their corresponding types.
+        :param hirarchy: The hierarchy object to transform.
+        :param index: Typing index of the graph G.
+        :param pattern: Pattern of the hierarchy (default: None, created from the mapping).
+        :return: A tuple of the instance or None, the wall time of the matching and the number of matches.
+        """
+        start = time.perf_counter()
+        if any(isinstance(value, (list, dict)) for value in mapping.values()):
+            # Lists nested in a struct are mapped to the list itself, which types no node
+            instances = []
+        elif mapping:
+            instances = index.find_star_matching("root", mapping, "S")
+        else:
+            if pattern is None:
+                pattern = self.get_hirarchy_pattern(mapping)
+            instances = hirarchy.find_matching("G", pattern)
+        match_seconds = time.perf_counter() - start
         for instance in instances:
-            valide_match = True
-            for key, value in instance.items():
-                for node in hirarchy.get_graph("G").nodes():
-                    if node == value and key in mapping.keys() and hirarchy.node_type("G", node)['S'] != mapping[key]:
-                        valide_match = False
+            if index.is_valid_instance(instance, "S", mapping):
+                return instance, match_seconds, len(instances)
+        return None, match_seconds, len(instances)
 
-            # Transform valid matches
-            if valide_match:
-                rhs_instance = hirarchy.rewrite("G", rule, instance, rhs_typing=rhs_typing)
-                return rhs_instance
+    def is_valid_rhs_typing(self, instance, mapping, index):
+        """
+        Checks if the typing of a new hierarchy is consistent with the typing of the matched nodes:
+        the parent has to be the root annotation, and the fields named after their annotation have to be structs.
+
+        :param instance: Instance of the hierarchy pattern in G.
+        :param mapping: Mapping of fields to their corresponding types.
+        :param index: Typing index of the graph G.
+        :return: True if regraph accepts the typing of the rewrite.
+        """
+        if index.node_type(instance["root"], "S") != "root":
+            return False
+        for key, value in mapping.items():
+            if index.node_type(instance[key], "M") != ("STRUCT" if key == value else "FIELD"):
+                return False
+        return True
 
     def create_operation_mapping(self, sub):
         """
@@ -191,27 +402,34 @@ class SDATransformation:
         else:
             return sub
 
-    def get_transformation_steps(self, annotation, operations=[]):
+    def get_transformation_steps(self, annotation, operations=None):
         """
         Retrieves the steps required to transform a hierarchy based on the provided annotation.
+        The steps of a hierarchy are followed by the steps of its nested hierarchies, depth-first. The nested
+        hierarchies are visited with an explicit stack, so the depth of the annotation is not bounded by the
+        recursion limit.
 
         :param annotation: The annotation defining the transformation.
-        :param operations: List to accumulate transformation steps (default: empty list).
+        :param operations: List to accumulate transformation steps (default: new list).
         :return: A list of transformation steps.
         """
-        for key, value in annotation.items():
-            if "dict" in str(type(value)):
-                operations.append((key, self.create_operation_mapping(value), "dict"))
-            elif "list" in str(type(value)):
-                operations.append((key, self.create_operation_mapping(value), "list"))
-
-        # Get Nested Hierarchies
-        for key, value in annotation.items():
-            if "dict" in str(type(value)):
-                self.get_transformation_steps(value, operations)
-            elif "list" in str(type(value)):
-                if "dict" in str(type(value[0])):
-                    self.get_transformation_steps(value[0], operations)
+        if operations is None:
+            operations = []
+        stack = [annotation]
+        while stack:
+            annotation = stack.pop()
+            nested = []
+            for key, value in annotation.items():
+                if "dict" in str(type(value)):
+                    operations.append((key, self.create_operation_mapping(value), "dict"))
+                    nested.append(value)
+                elif "list" in str(type(value)):
+                    operations.append((key, self.create_operation_mapping(value), "list"))
+                    if "dict" in str(type(value[0])):
+                        nested.append(value[0])
+
+            # Get Nested Hierarchies, pushed in reverse to be visited in order
+            stack.extend(reversed(nested))
         return operations
 
     def add_flattening_operations(self, final_hirarchie):
@@ -220,20 +438,20 @@ class SDATransformation:
 
         :param final_hirarchie: The final hierarchy to flatten.
         """
-        pattern3 = NXGraph()
-        pattern3.add_nodes_from(["FIELD"])
-        instances = final_hirarchie.find_matching("G", pattern3)
+        # Every node of G is an instance of the single node pattern FIELD, the typing selects the fields
+        start = time.perf_counter()
+        index = SDATypingIndex(final_hirarchie, "G")
+        instances = [{"FIELD": node} for node in final_hirarchie.get_graph("G").nodes()]
+        match_seconds = time.perf_counter() - start
+        selected = 0
         for instance in instances:
-            valide_match = True
-            for key, value in instance.items():
-                for node in final_hirarchie.get_graph("G").nodes():
-                    if node == value and final_hirarchie.node_type("G", node)['M'] != key:
-                        valide_match = False
-            if valide_match:
+            if index.is_valid_instance(instance, "M"):
                 self.normalFormOperations.append(SDATransformOperation(
                     action="selectField",
                     field=instance['FIELD'],
                 ))
+                selected += 1
+        self.metrics.on_rule("selectFields", "G", match_seconds, len(instances), selected, [])
 
     def add_transform_operation(self, operation, mapping, type):
         """
@@ -242,9 +460,11 @@ class SDATransformation:
         :param operation: The operation details (new hierarchy, connection nodes, type).
         :param mapping: Mapping of fields for the operation.
         :param type: Type of the transformation (e.g., dict or list).
+        :return: The added operations.
         """
         new_hirarchy, connect_nodes, type = operation
         connectedFields = []
+        start = len(self.transformOperations)
 
         # Rename Nodes
         for node_name, semantic_annotation in connect_nodes.items():
@@ -269,3 +489,154 @@ class SDATransformation:
                 field=new_hirarchy,
                 connect=connectedFields
             ))
+        return self.transformOperations[start:]
+
+    def add_source_fields(self, hirarchy, fields, schemaNodes=None):
+        """
+        Adds annotated fields of an evolved source schema to a planned hierarchy. The fields are connected
+        with the root and selected, and the restoration steps that did not find all their fields are retried.
+        The operations are ordered as in a plan computed from scratch: the transform operations in the order
+        of the restoration steps, and the selected fields in the order of the source schema.
+
+        :param hirarchy: The planned hierarchy object.
+        :param fields: List of (node id, annotation) tuples of the added fields.
+        :param schemaNodes: Ids of the nodes of the source schema graph in schema order (default: None, the added fields are selected last).
+        """
+        index = self.get_typing_index(hirarchy)
+        for node, annotation in fields:
+            self.add_field_node(hirarchy, index, node, annotation)
+            self.normalFormOperations.append(SDATransformOperation(
+                action="selectField",
+                field=node,
+            ))
+        for step in self.restorationSteps:
+            if step["instance"] is None:
+                struct_name, mapping, type = step["operation"]
+                instance = self.add_hirarchy(struct_name, mapping, type, hirarchy, index)
+                if instance is not None:
+                    step["instance"] = instance
+                    step["operations"] = self.add_transform_operation(step["operation"], instance, type)
+
+        # The retried steps appended their operations, restore the order of the steps
+        self.transformOperations = [operation for step in self.restorationSteps for operation in step["operations"]]
+        if schemaNodes is not None:
+            position = {node: index for index, node in enumerate(schemaNodes)}
+            self.normalFormOperations.sort(key=lambda operation: position.get(operation.field, len(position)))
+
+    def remove_source_fields(self, hirarchy, nodes):
+        """
+        Removes fields of an evolved source schema from a planned hierarchy. The structs containing a field
+        are removed with their parents, as their restoration steps would not find all their fields anymore,
+        and their operations are dropped from the plan.
+
+        :param hirarchy: The planned hierarchy object.
+        :param nodes: Ids of the removed fields.
+        """
+        index = self.get_typing_index(hirarchy)
+        removed = set()
+        for node in nodes:
+            self.undo_restoration_steps(hirarchy, index, node, removed)
+            self.remove_field_node(hirarchy, index, node)
+        nodes = set(nodes)
+        self.normalFormOperations = [operation for operation in self.normalFormOperations if operation.field not in nodes]
+        self.transformOperations = [operation for operation in self.transformOperations if id(operation) not in removed]
+
+    def undo_restoration_steps(self, hirarchy, index, node, removed):
+        """
+        Undoes the restoration steps which moved a node into a struct, starting with the outermost struct.
+        The fields of an undone struct are connected with the root again, as if the step had not found them.
+
+        :param hirarchy: The planned hierarchy object.
+        :param index: Typing index of the graph G.
+        :param node: Id of the node in G.
+        :param removed: Set collecting the ids of the dropped operations.
+        """
+        for step in self.restorationSteps:
+            instance = step["instance"]
+            if instance is None:
+                continue
+            struct_name, mapping, type = step["operation"]
+            if any(instance[key] == node for key in mapping):
+                removed.update(id(operation) for operation in step["operations"])
+                step["instance"] = None
+                step["operations"] = []
+                self.undo_restoration_steps(hirarchy, index, instance[struct_name], removed)
+                self.remove_struct_node(hirarchy, index, instance[struct_name])
+
+    def get_typing_index(self, hirarchy):
+        """
+        Returns a typing index of the graph G for the incremental updates of the plan.
+
+        :param hirarchy: The hierarchy object.
+        :return: The SDATypingIndex of the graph G.
+        """
+        return SDATypingIndex(hirarchy, "G")
+
+    def add_field_node(self, hirarchy, index, node, annotation):
+        """
+        Adds a field below the root of G, typed by its annotation.
+
+        :param hirarchy: The hierarchy object.
+        :param index: Typing index of the graph G.
+        :param node: Id of the field.
+        :param annotation: Node of the annotation graph S typing the field.
+        """
+        from regraph import NXGraph, Rule
+
+        pattern = NXGraph()
+        pattern.add_node("root")
+        rule = Rule.from_transform(pattern)
+        rule.inject_add_node(node)
+        rule.inject_add_edge("root", node)
+        self.excecutedRules.append(rule)
+        root = index.get_typed_nodes("ROOT", "M")[0]
+        index.rewrite(rule, {"root": root}, rhs_typing={"S": {node: annotation}, "M": {node: "FIELD"}})
+
+    def remove_field_node(self, hirarchy, index, node):
+        """
+        Removes a field from G.
+
+        :param hirarchy: The hierarchy object.
+        :param index: Typing index of the graph G.
+        :param node: Id of the field.
+        """
+        from regraph import NXGraph, Rule
+
+        pattern = NXGraph()
+        pattern.add_node("field")
+        rule = Rule.from_transform(pattern)
+        rule.inject_remove_node("field")
+        self.excecutedRules.append(rule)
+        index.rewrite(rule, {"field": node})
+
+    def remove_struct_node(self, hirarchy, index, node):
+        """
+        Removes a struct added by a restoration step and connects its fields with the root. The node typing
+        the struct in S is removed as well, so the struct can be restored under its name again.
+
+        :param hirarchy: The hierarchy object.
+        :param index: Typing index of the graph G.
+        :param node: Id of the struct.
+        """
+        from regraph import NXGraph, Rule
+
+        fields = list(hirarchy.get_graph("G").successors(node))
+        pattern = NXGraph()
+        pattern.add_node("root")
+        pattern.add_nodes_from(range(len(fields)))
+        rule = Rule.from_transform(pattern)
+        for field in range(len(fields)):
+            rule.inject_add_edge("root", field)
+        self.excecutedRules.append(rule)
+        instance = dict(enumerate(fields))
+        instance["root"] = index.get_typed_nodes("ROOT", "M")[0]
+        index.rewrite(rule, instance)
+
+        annotation = index.node_type(node, "S")
+        pattern = NXGraph()
+        pattern.add_node("struct")
+        rule = Rule.from_transform(pattern)
+        rule.inject_remove_node("struct")
+        self.excecutedRules.append(rule)
+        hirarchy.rewrite("S", rule, {"struct": annotation})
+        index.refresh()
@@ -36,6 +36,38 @@ class SDATransformOperation:
             fcon.append(connect.split(".")[-1])
         return fcon
 
+    def to_dict(self):
+        """
+        Returns a JSON serializable dictionary representation of the SDATransformOperation instance.
+
+        Returns:
+            dict: A dictionary with the `action`, `field`, `connect`, and `rename` attributes.
+        """
+        return {
+            "action": self.action,
+            "field": self.field,
+            "connect": self.connect,
+            "rename": self.rename
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a SDATransformOperation instance from its dictionary representation.
+
+        Args:
+            data (dict): A dictionary as returned by `to_dict`.
+
+        Returns:
+            SDATransformOperation: The restored operation.
+        """
+        return cls(
+            action=data["action"],
+            field=data["field"],
+            connect=data.get("connect"),
+            rename=data.get("rename")
+        )
+
     def __str__(self):
         """
         Returns a string representation of the SDATransformOperation instance.
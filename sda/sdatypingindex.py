@@ -0,0 +1,165 @@
+import itertools
+
+
+class SDATypingIndex:
+    """
+    Index of the typing of one graph of a NXHierarchy by its direct successors (e.g. G→S and G→M).
+    The typings are kept as plain dictionaries, so the type of a node is looked up in constant time
+    instead of scanning all nodes of the graph, and so are the nodes of a type. Rewrites of the indexed
+    graph have to go through `rewrite` to keep the index up to date.
+
+    Attributes:
+        hirarchy (NXHierarchy): The indexed hierarchy.
+        graph_id (str): Id of the indexed graph. Defaults to "G".
+        types (dict): Mapping from successor graph id to a dict of node -> type.
+        typed_nodes (dict): Mapping from successor graph id to a dict of type -> dict of typed nodes.
+    """
+
+    def __init__(self, hirarchy, graph_id="G"):
+        """
+        Initializes the SDATypingIndex and builds the index for all successors of the graph.
+
+        Args:
+            hirarchy (NXHierarchy): The hierarchy to index.
+            graph_id (str, optional): Id of the graph to index. Defaults to "G".
+        """
+        self.hirarchy = hirarchy
+        self.graph_id = graph_id
+        self.types = {}
+        self.typed_nodes = {}
+        self.refresh()
+
+    def refresh(self):
+        """
+        Rebuilds the index from the typings stored in the hierarchy.
+        """
+        self.types = {}
+        self.typed_nodes = {}
+        for successor in self.hirarchy.successors(self.graph_id):
+            self.types[successor] = {}
+            self.typed_nodes[successor] = {}
+            for node, node_type in self.hirarchy.get_typing(self.graph_id, successor).items():
+                self.set_type(node, successor, node_type)
+
+    def set_type(self, node, typing_graph, node_type):
+        """
+        Sets the type of a node in the index, None removes the node from the index.
+
+        Args:
+            node (str): Node of the indexed graph.
+            typing_graph (str): Id of the typing graph (e.g. "S" or "M").
+            node_type (str): The type of the node or None.
+        """
+        previous = self.types[typing_graph].pop(node, None)
+        if previous is not None:
+            nodes = self.typed_nodes[typing_graph][previous]
+            del nodes[node]
+            if not nodes:
+                del self.typed_nodes[typing_graph][previous]
+        if node_type is not None:
+            self.types[typing_graph][node] = node_type
+            self.typed_nodes[typing_graph].setdefault(node_type, {})[node] = None
+
+    def node_type(self, node, typing_graph):
+        """
+        Returns the type of a node in a typing graph.
+
+        Args:
+            node (str): Node of the indexed graph.
+            typing_graph (str): Id of the typing graph (e.g. "S" or "M").
+
+        Returns:
+            str: The type of the node or None if the node is not typed.
+        """
+        return self.types[typing_graph].get(node)
+
+    def get_typed_nodes(self, node_type, typing_graph):
+        """
+        Returns the nodes of the indexed graph with a type.
+
+        Args:
+            node_type (str): Node of the typing graph.
+            typing_graph (str): Id of the typing graph (e.g. "S" or "M").
+
+        Returns:
+            list: The typed nodes, in the order of the typing.
+        """
+        return list(self.typed_nodes[typing_graph].get(node_type, ()))
+
+    def find_star_matching(self, center, types, typing_graph):
+        """
+        Finds the instances of a star pattern, a center connected to typed leaves, anchored on the typing:
+        every leaf is resolved to the nodes of its type and the center to their common predecessors. The
+        time is proportional to the typed nodes instead of the embeddings of the star in the whole graph.
+
+        Args:
+            center (str): Pattern node of the center, which is not typed.
+            types (dict): Type per leaf of the pattern.
+            typing_graph (str): Id of the typing graph (e.g. "S" or "M").
+
+        Returns:
+            list: The instances, mapping the pattern nodes to nodes of the indexed graph.
+        """
+        graph = self.hirarchy.get_graph(self.graph_id)
+        leaves = list(types)
+        candidates = [self.get_typed_nodes(types[leaf], typing_graph) for leaf in leaves]
+        instances = []
+        for nodes in itertools.product(*candidates):
+            if len(set(nodes)) < len(nodes):
+                continue
+            for parent in graph.predecessors(nodes[0]):
+                if parent not in nodes and all(graph.exists_edge(parent, node) for node in nodes[1:]):
+                    instance = {center: parent}
+                    instance.update(zip(leaves, nodes))
+                    instances.append(instance)
+        return instances
+
+    def is_valid_instance(self, instance, typing_graph, types=None):
+        """
+        Checks if the nodes of a matched instance have the expected types.
+
+        Args:
+            instance (dict): Mapping of pattern nodes to nodes of the indexed graph.
+            typing_graph (str): Id of the typing graph (e.g. "S" or "M").
+            types (dict, optional): Expected type per pattern node. Pattern nodes without an expected type
+                are not checked. Defaults to None, meaning the pattern nodes are named after their types.
+
+        Returns:
+            bool: True if all checked nodes have the expected type.
+        """
+        graph = self.hirarchy.get_graph(self.graph_id)
+        typing = self.types[typing_graph]
+        for key, value in instance.items():
+            if types is None:
+                expected = key
+            elif key in types:
+                expected = types[key]
+            else:
+                continue
+            if value in graph.nodes() and typing.get(value) != expected:
+                return False
+        return True
+
+    def rewrite(self, rule, instance, **kwargs):
+        """
+        Rewrites the indexed graph and updates the index for the affected nodes.
+
+        Args:
+            rule (Rule): The rule to apply.
+            instance (dict): Instance of the left-hand side of the rule in the indexed graph.
+            **kwargs: Further arguments for `NXHierarchy.rewrite` (e.g. `rhs_typing`).
+
+        Returns:
+            dict: Instance of the right-hand side of the rule in the rewritten graph.
+        """
+        rhs_instance = self.hirarchy.rewrite(self.graph_id, rule, instance, **kwargs)
+
+        for node in rule.removed_nodes():
+            for typing_graph in self.types:
+                self.set_type(instance[node], typing_graph, None)
+
+        for typing_graph in self.types:
+            mapping = self.hirarchy.get_typing(self.graph_id, typing_graph)
+            for node in rhs_instance.values():
+                self.set_type(node, typing_graph, mapping.get(node))
+        return rhs_instance
@@ -34,6 +34,9 @@ setup(
         'pyspark==3.5.1',
         'py4j==0.10.9.7'
     ],
+    extras_require={
+        'arrow': ['pyarrow']
+    },
     dependency_links=[
         'git+ssh://git@github.com/JanChristianRedlich/ReGraph.git#egg=ReGraph-2.0.5'
     ],
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+from sda import SDAIntegration
+
+SOURCE_ANNOTATION = {"a": "A", "b": "B", "s": {"c": "C", "d": "D"}, "l": [{"x": "X", "y": "Y"}]}
+TARGET_ANNOTATION = {"g": {"ta": "A", "td": "D"}, "h": {"tb": "B", "tc": "C"}, "items": [{"x": "X", "y": "Y"}]}
+SOURCES = {
+    "full": {"a": 1, "b": 2, "s": {"c": 3, "d": 4}, "l": [{"x": 5, "y": 6}]},
+    "withoutStructField": {"a": 1, "b": 2, "s": {"c": 3}, "l": [{"x": 5, "y": 6}]},
+    "withoutListField": {"a": 1, "b": 2, "s": {"c": 3, "d": 4}, "l": [{"x": 5}]},
+}
+
+
+class SDAIntegrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.write("source_annotation", SOURCE_ANNOTATION)
+        self.write("target_annotation", TARGET_ANNOTATION)
+        for name, record in SOURCES.items():
+            self.write(name, [record])
+
+    def write(self, name, data):
+        with open(self.path(name), "w") as file:
+            json.dump(data, file)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name + ".json")
+
+    def plan(self, planner, source, update=None):
+        sda = SDAIntegration(planner=planner)
+        sda.loadSource(self.path(source), self.path("source_annotation"), engine="local")
+        sda.loadTargetAnnotation(self.path("target_annotation"))
+        sda.doTransformation()
+        if update is not None:
+            sda.updateSource(self.path(update), engine="local")
+        transformation = sda.transformation
+        return ([repr(vars(operation)) for operation in transformation.normalFormOperations],
+                [repr(vars(operation)) for operation in transformation.transformOperations],
+                sda.transformRecords())
+
+    def test_updateSource_plans_like_a_fresh_plan(self):
+        for planner in ("regraph", "native"):
+            expected = self.plan(planner, "full")
+            for previous in ("withoutStructField", "withoutListField"):
+                with self.subTest(planner=planner, previous=previous):
+                    normalForm, transform, records = self.plan(planner, previous, update="full")
+                    self.assertEqual(normalForm, expected[0])
+                    self.assertEqual(transform, expected[1])
+                    self.assertEqual([list(record) for record in records], [list(record) for record in expected[2]])
+                    self.assertEqual(records, expected[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
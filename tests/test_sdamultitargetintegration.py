@@ -0,0 +1,36 @@
+import os
+import unittest
+
+from sda import SDAIntegration, SDAMultiTargetIntegration
+
+TESTFILES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example", "testfiles")
+
+
+class SDAMultiTargetIntegrationTest(unittest.TestCase):
+
+    def load(self, integration):
+        integration.loadSource(os.path.join(TESTFILES, "source.json"), os.path.join(TESTFILES, "source_annotation.json"), engine="local")
+        return integration
+
+    def test_doTransformation_after_adding_a_target(self):
+        for planner in ("regraph", "native"):
+            with self.subTest(planner=planner):
+                single = self.load(SDAIntegration(planner=planner))
+                single.loadTargetAnnotation(os.path.join(TESTFILES, "target_annotation.json"))
+                single.doTransformation()
+                expected = single.transformRecords()
+
+                sda = self.load(SDAMultiTargetIntegration(planner=planner))
+                sda.loadTargetAnnotation(os.path.join(TESTFILES, "target_annotation.json"), name="a")
+                sda.doTransformation()
+                sda.loadTargetAnnotation(os.path.join(TESTFILES, "target_annotation.json"), name="b")
+                sda.doTransformation()
+                self.assertEqual(sda.transformRecords(), {"a": expected, "b": expected})
+
+                # Planning again without changes yields the same results
+                sda.doTransformation()
+                self.assertEqual(sda.transformRecords(), {"a": expected, "b": expected})
+
+
+if __name__ == "__main__":
+    unittest.main()